@@ -7,6 +7,8 @@ from pydantic_settings import BaseSettings
 from functools import lru_cache
 import os
 
+from app.startup import constructing
+
 
 class Settings(BaseSettings):
     """Application settings"""
@@ -29,6 +31,8 @@ class Settings(BaseSettings):
     # Server settings
     HOST: str = "0.0.0.0"
     PORT: int = 8000
+    API_WORKERS: int = 1  # Processes forked by python -m app.serve; they share the disk cache, rate limits and metrics
+    WORKER_METRICS_INTERVAL: float = 1.0  # Seconds between each worker publishing its metrics for /metrics
     ENVIRONMENT: str = "development"
     
     # CORS
@@ -41,11 +45,131 @@ class Settings(BaseSettings):
     
     # Cache Settings
     REDIS_URL: str | None = None
-    CACHE_TTL_HOURS: int = 24
+    CACHE_TTL_HOURS: int = 24  # TTL for cache namespaces without an entry in CACHE_TTLS
+    CACHE_ENABLED: bool = True
+    CACHE_DIR: str = "data/cache"  # Disk tier; survives restarts
+    CACHE_TTLS: str = "search=3600,pages=21600,answers=21600"  # Seconds per namespace
+    CACHE_MEMORY_LIMITS_MB: str = "search=32,pages=32,llm=32,answers=32"
+    CACHE_DISK_LIMITS_MB: str = "search=256,pages=512,llm=256,answers=256"  # 0 keeps a namespace off disk
+    CACHE_REDIS_NAMESPACES: str = "search,llm,answers"  # Shared through REDIS_URL when it is set
+    CACHE_DISK_MIN_BYTES: int = 4096  # Larger values go to disk at once, smaller ones when evicted from memory
+    CACHE_DISK_INDEX_SLOTS: int = 65536  # Entries per namespace index on disk
+    CACHE_FRESHNESS_TTLS: str = "realtime=300,news=1800,reference=86400"  # Seconds per query freshness class; "general" keeps the namespace TTL
+    CACHE_STALE_GRACE: str = "realtime=120,news=900,general=3600,reference=21600"  # Stale search results and answers are served this long past their TTL while being refreshed
+    LLM_CACHE_ENABLED: bool = True  # Identical prompts to the same model reuse the previous output
+    
+    # Database Settings
+    DATABASE_URL: str | None = None  # Postgres connection string; SQLite is used when unset
+    SQLITE_PATH: str = "data/research_assistant.db"
+    DATABASE_POOL_MIN_SIZE: int = 1
+    DATABASE_POOL_MAX_SIZE: int = 10
+    
+    # Background job settings
+    JOB_WORKERS: int = 2  # In-process job workers; 0 leaves jobs to `python -m app.worker`
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_LEASE_SECONDS: float = 300.0  # Running jobs without a heartbeat for this long are requeued
+    JOB_MAX_ATTEMPTS: int = 3
+    
+    # Query history settings
+    HISTORY_ENABLED: bool = True
+    HISTORY_BATCH_SIZE: int = 100  # Rows per batched insert
+    HISTORY_FLUSH_INTERVAL: float = 1.0  # Longest a recorded query waits before being written
+    HISTORY_MAX_QUEUE: int = 10000  # Pending rows kept in memory; newer entries are dropped beyond this
+    
+    # Cache warmer settings (frequent queries replayed at startup and periodically)
+    CACHE_WARM_ENABLED: bool = True
+    CACHE_WARM_TOP_N: int = 50  # Most frequent queries replayed per cycle
+    CACHE_WARM_WINDOW_HOURS: float = 24.0  # History window the top queries are taken from
+    CACHE_WARM_INTERVAL: float = 900.0  # Seconds between cycles
+    CACHE_WARM_STARTUP_DELAY: float = 5.0
+    CACHE_WARM_RATE: str = "20/60"  # Warmed queries/seconds; keeps warming well inside provider quotas
+    CACHE_WARM_MAX_IN_FLIGHT: int = 2  # Warming pauses while more live requests are in flight, or any are queued
+    CACHE_WARM_BUSY_TIMEOUT: float = 60.0  # A cycle stops after waiting this long for live traffic to calm down
+    
+    # Answer index settings (reuse of past answers for near-repeat questions)
+    ANSWER_INDEX_ENABLED: bool = True
+    ANSWER_INDEX_MAX_DOCUMENTS: int = 50000
+    ANSWER_INDEX_LOAD_LIMIT: int = 20000  # History rows indexed at startup
+    ANSWER_INDEX_REUSE_SIMILARITY: float = 0.85  # Return the prior answer at or above this similarity
+    ANSWER_INDEX_REUSE_MAX_AGE: float = 21600.0  # Seconds a prior answer may be returned as is
+    ANSWER_INDEX_SEED_CONTAINMENT: float = 0.75  # Use the prior answer as context instead of searching...
+    ANSWER_INDEX_SEED_COVERAGE: float = 0.75  # ...and the old question covers most of the new one...
+    ANSWER_INDEX_SEED_SIMILARITY: float = 0.3  # ...when the new question adds little to the old one
+    ANSWER_INDEX_SEED_MAX_AGE: float = 86400.0
+    
+    # Semantic cache settings (paraphrased queries answered from cache)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    # The vectors take DIM x MAX_ENTRIES x 4 bytes per worker (20 MiB by default)
+    SEMANTIC_CACHE_DIM: int = 1024  # Hashed feature buckets per query vector
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 5000  # Least recently used answers are evicted beyond this
+    SEMANTIC_CACHE_THRESHOLD: float = 0.88  # Cosine similarity needed to return a cached answer
+    SEMANTIC_CACHE_TTL: float = 21600.0
+    SEMANTIC_CACHE_AUDIT_MARGIN: float = 0.1  # Near misses this close to the threshold are audited too
+    SEMANTIC_CACHE_AUDIT_PATH: str | None = None  # JSON-lines audit log; in-memory only when unset
     
     # Search settings
     MAX_SEARCH_RESULTS: int = 10
     SEARCH_TIMEOUT: int = 30
+    SERPER_URL: str = "https://google.serper.dev/search"
+    DUCKDUCKGO_URLS: str = "https://duckduckgo.com/html/,https://html.duckduckgo.com/html/,https://duckduckgo.com/lite/"  # Tried in order
+    WIKIPEDIA_SUMMARY_URL: str = "https://en.wikipedia.org/api/rest_v1/page/summary/"
+    SEARCH_CASSETTE: str | None = None  # gzip JSON-lines file provider responses are recorded to or replayed from
+    SEARCH_CASSETTE_MODE: str = "replay"  # "record" or "replay"
+    SEARCH_CASSETTE_SPEED: float = 1.0  # Replayed response times are scaled by this; 0 replays at once
+    
+    # Request deadline settings
+    REQUEST_DEADLINE_SECONDS: float = 25.0  # Default budget; the frontend aborts at 30s
+    MAX_REQUEST_DEADLINE_SECONDS: float = 120.0  # Upper bound for client-requested budgets
+    CHAIN_MIN_BUDGET: float = 8.0  # Budget the tools leave for the final chain call
+    CHAIN_TIMEOUT: float = 60.0  # Longest single chain call when no request deadline applies
+    JOB_DEADLINE_SECONDS: float = 600.0  # Default budget for background jobs
+    
+    # Admission control settings
+    ADMISSION_MAX_CONCURRENCY: int = 8  # Requests processed at once per worker
+    ADMISSION_MAX_QUEUE: int = 32  # Requests allowed to wait for a slot
+    ADMISSION_LATENCY_SLO: float = 25.0  # Shed requests whose estimated latency exceeds this
+    ADMISSION_PATHS: str = "/api/query,/api/query/batch"
+    # Long-lived streams get their own service time estimate, and the SLO bounds only their wait to start
+    ADMISSION_STREAMING_PATHS: str = "/api/query/batch"
+    
+    # Rate limit settings (per client; "path=requests/seconds", POST only)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: str = "/api/query=30/60,/api/query/batch=5/60,/api/jobs=10/60,/api/calculate/batch=10/60"
+    RATE_LIMIT_MAX_KEYS: int = 100000  # Clients tracked by the in-process or shared-memory limiter
+    RATE_LIMIT_API_KEYS: str = ""  # Comma-separated X-API-Key values limited per key; other callers are limited per IP
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0  # Proxies appending to X-Forwarded-For; 0 ignores the header (direct clients), render.yaml sets 1
+    
+    # Readiness settings (/ready turns green once warmup has finished; /health is liveness only)
+    WARMUP_STEPS: str = "database,caches,chains"  # Add "model" to run one synthetic query through a stand-in chat model
+    WARMUP_TIMEOUT: float = 60.0  # Per step; failed steps are retried while the instance stays unready
+    WARMUP_RETRY_INTERVAL: float = 10.0
+    
+    # Shutdown settings (python -m app.serve)
+    SHUTDOWN_DRAIN_DELAY: float = 0.0  # Seconds /ready reports draining before new connections are refused
+    SHUTDOWN_GRACE_PERIOD: float = 20.0  # In-flight requests and streams get this long to finish; Render stops waiting at 30s
+    SHUTDOWN_FLUSH_TIMEOUT: float = 5.0  # Longest wait for background cache refreshes before the caches are closed
+    
+    # Admin settings
+    ADMIN_TOKEN: str | None = None  # X-Admin-Token value for /admin endpoints and request profiling; unset disables them
+    PROFILE_MAX_STORED: int = 20  # Most recent request profiles kept for download
+    PROFILE_TOP_FUNCTIONS: int = 40  # Functions listed in a profile summary
+    MEMORY_TRACE_FRAMES: int = 10  # Stack frames kept per traced allocation
+    MEMORY_TOP_ALLOCATIONS: int = 25  # Allocation sites listed per snapshot diff
+    MEMORY_FOOTPRINT_MAX_OBJECTS: int = 500000  # Objects visited per singleton footprint
+    
+    # Response compression settings
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller complete bodies are sent uncompressed
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4  # Low qualities keep brotli fast enough for per-request use
+    
+    # Tool execution settings
+    SEARCH_TOOL_TIMEOUT: float = 25.0  # Per-tool timeout for web search
+    MATH_TOOL_TIMEOUT: float = 15.0  # Per-tool timeout for calculations
+    TOOL_DEADLINE: float = 30.0  # Shared deadline for all tools of one query
+    MAX_BATCH_EXPRESSIONS: int = 10000  # Largest batch accepted by the batch calculator
+    MAX_BATCH_QUERIES: int = 100  # Largest batch accepted by /api/query/batch
+    BATCH_MAX_CONCURRENCY: int = 4  # Default concurrent chain calls per batch group
+    BATCH_CONCURRENCY_LIMIT: int = 16  # Largest max_concurrency a batch request may ask for
     
     @staticmethod
     def get_current_time() -> str:
@@ -65,7 +189,8 @@ def get_settings() -> Settings:
 
 
 # Create settings instance
-settings = get_settings()
+with constructing("settings"):
+    settings = get_settings()
 
 # Validate required settings
 if not settings.GOOGLE_API_KEY:
@@ -1,14 +1,70 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.routes import query_router
+from app.routes import query_router, jobs_router, admin_router
+from app.services.database import database
+from app.services.job_queue import job_workers
+from app.services.history_store import history_store
+from app.services.answer_index import answer_index
+from app.services.semantic_cache import semantic_cache
+from app.services.cache import tiered_cache
+from app.services.cache_warmer import cache_warmer
+from app.services.metrics import metrics
+from app.services.admission import AdmissionMiddleware, admission_controller
+from app.services.rate_limiter import RateLimitMiddleware, rate_limiter
+from app.config import settings
+from app.services.compression import CompressionMiddleware
+from app.services.profiling import ProfilingMiddleware, profile_store
+from app.services.readiness import readiness
+from app.services.serialization import FastJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import os
+import sys
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: query history writer and background job workers
+    try:
+        await history_store.start()
+        if settings.ANSWER_INDEX_ENABLED and history_store.running:
+            await answer_index.load(history_store)
+        await job_workers.start()
+    except Exception as e:
+        # Queries are still answered without the database; /ready reports it as unavailable
+        print(f"Database unavailable at startup, running without query history and jobs: {e}")
+    cache_warmer.start()
+    # Warmup runs in the background; /ready reports when it is done
+    readiness.start()
+    yield
+    # Shutdown: in-flight requests have finished or used up SHUTDOWN_GRACE_PERIOD (python -m app.serve);
+    # running jobs go back on the queue for the next worker
+    await readiness.stop()
+    await cache_warmer.stop()
+    await job_workers.stop()
+    # Write-behind work: background cache refreshes, then queued history rows
+    unfinished = await tiered_cache.drain(settings.SHUTDOWN_FLUSH_TIMEOUT)
+    if unfinished:
+        print(f"Shutdown: {unfinished} cache refreshes still running after {settings.SHUTDOWN_FLUSH_TIMEOUT:g}s, dropped")
+    await history_store.stop()
+    await database.close()
+    await rate_limiter.close()
+    # The search service is imported on first use; close its provider connections if it was
+    search_module = sys.modules.get("app.services.enhanced_search_service")
+    if search_module is not None:
+        search_module.enhanced_search_service.close()
+    tiered_cache.close()
 
 app = FastAPI(
     title="AI Research Assistant API",
     description="AI-powered research assistant with LangChain integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Response compression (brotli/gzip) for JSON and streamed NDJSON
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware - Allow all origins for deployment
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +74,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admission control - shed load early instead of letting every request time out
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
+# Per-client rate limits - checked before admission so abusive clients never take a slot
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
+# On-demand profiling of admin requests - added last so it wraps every other layer
+app.add_middleware(ProfilingMiddleware, store=profile_store)
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -26,7 +92,8 @@ async def root():
         "status": "running",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready"
     }
 
 # Health check endpoint
@@ -38,4 +105,36 @@ async def health_check():
         "version": "1.0.0"
     }
 
+# Readiness probe - 503 until warmup has finished, so load balancers only route to warm instances
+@app.get("/ready")
+async def readiness_check():
+    return FastJSONResponse(status_code=200 if readiness.ready else 503, content=readiness.state())
+
+# Metrics endpoint
+@app.get("/metrics")
+async def get_metrics():
+    return metrics.snapshot()
+
+# Admission control state
+@app.get("/admission")
+async def get_admission_state():
+    return admission_controller.state()
+
+# Tiered cache statistics per namespace
+@app.get("/cache")
+async def get_cache_stats():
+    return await asyncio.to_thread(tiered_cache.stats)
+
+# Cache warmer state and last cycle
+@app.get("/cache/warmer")
+async def get_cache_warmer_state():
+    return cache_warmer.state()
+
+# Semantic cache stats and hit-quality audit log
+@app.get("/semantic-cache")
+async def get_semantic_cache_state(limit: int = 50):
+    return {**semantic_cache.stats(), "audit": list(semantic_cache.audit)[-limit:]}
+
 app.include_router(query_router.router, prefix="/api")
+app.include_router(jobs_router.router, prefix="/api")
+app.include_router(admin_router.router, prefix="/admin")
@@ -1,5 +1,21 @@
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from app.config import settings
 
 class QueryRequest(BaseModel):
     query: str
     options: dict = {}
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    options: dict = {}
+    max_concurrency: Optional[int] = Field(None, ge=1, le=settings.BATCH_CONCURRENCY_LIMIT)
+
+class BatchCalculationRequest(BaseModel):
+    expressions: List[str]
+
+class JobRequest(BaseModel):
+    query: str
+    options: dict = {}
+    mode: Literal["query", "parallel"] = "query"
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response
+from app.config import settings
+from app.services.admin import is_admin
+from app.services.memory_diagnostics import memory_report, memory_tracer
+from app.services.profiling import profile_store
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+def _get_profile(profile_id: str):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return profile
+
+# Recent request profiles, newest first
+@router.get("/profiles")
+async def list_profiles():
+    return {"profiles": profile_store.list()}
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, sort: str = "cumulative", limit: Optional[int] = None):
+    try:
+        return _get_profile(profile_id).summary(limit, sort)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown sort key {sort}")
+
+# Binary pstats file, e.g. for `python -m pstats` or snakeviz
+@router.get("/profiles/{profile_id}/download")
+async def download_profile(profile_id: str):
+    return Response(
+        content=_get_profile(profile_id).dump(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+    )
+
+# Process memory, gc state and object footprints of the service singletons
+@router.get("/memory")
+async def get_memory_report(max_objects: Optional[int] = None):
+    return await asyncio.to_thread(memory_report, max_objects)
+
+@router.post("/memory/tracing/start")
+async def start_memory_tracing(frames: Optional[int] = None):
+    return memory_tracer.start(frames)
+
+@router.post("/memory/tracing/stop")
+async def stop_memory_tracing():
+    return memory_tracer.stop()
+
+# Top allocation sites grown since the previous snapshot, or since tracing started
+@router.get("/memory/snapshot")
+async def get_memory_snapshot(compare_to: Literal["previous", "baseline"] = "previous",
+                              group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+                              limit: Optional[int] = None):
+    try:
+        return await asyncio.to_thread(memory_tracer.snapshot, compare_to, group_by, limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException
+from app.models.request_models import JobRequest
+from app.services.job_queue import job_queue
+from app.services.serialization import FastJSONResponse
+
+router = APIRouter()
+
+@router.post("/jobs", status_code=202)
+async def submit_job(req: JobRequest):
+    try:
+        job = await job_queue.submit(req.mode, req.query, req.options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    json_response = FastJSONResponse(
+        status_code=202,
+        content={"status": job["status"], "job_id": job["id"], "status_url": f"/api/jobs/{job['id']}"}
+    )
+    json_response.headers["Access-Control-Allow-Origin"] = "*"
+    json_response.headers["Location"] = f"/api/jobs/{job['id']}"
+    return json_response
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    json_response = FastJSONResponse(content={
+        "job_id": job["id"],
+        "status": job["status"],
+        "mode": job["kind"],
+        "query": job["query"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"],
+        "error": job["error"]
+    })
+    json_response.headers["Access-Control-Allow-Origin"] = "*"
+    return json_response
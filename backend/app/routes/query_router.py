@@ -1,24 +1,114 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
-from app.models.request_models import QueryRequest
-from app.services.langchain_service import run_agent
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+import asyncio
+from app.config import settings
+from app.models.request_models import QueryRequest, BatchQueryRequest, BatchCalculationRequest
+from app.services.deadline import DEADLINE_HEADER, Deadline, deadline_scope
+from app.services.langchain_service import run_agent, run_agent_batch, calculate_math_batch
+from app.services.metrics import metrics
+from app.services.serialization import FastJSONResponse, dumps
 
 router = APIRouter()
 
+# Non-standard status (nginx convention) for requests whose client went away
+CLIENT_CLOSED_REQUEST = 499
+
+class ClientDisconnected(Exception):
+    """The HTTP client closed the connection before the response was ready"""
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # Once the body has been read, the next ASGI message is http.disconnect
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def run_until_disconnected(request: Request, coro, deadline: Deadline, route: str):
+    """
+    Run a request's work, cancelling the whole task tree if the client disconnects
+    
+    Cancelling the task cancels awaited search tasks and chain calls; the
+    deadline is expired too, so search threads stop before their next provider.
+    """
+    work = asyncio.create_task(coro)
+    watcher = asyncio.create_task(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        if work.done():
+            return work.result()
+        deadline.cancel()
+        work.cancel()
+        await asyncio.gather(work, return_exceptions=True)
+        metrics.increment("requests_cancelled_total", route=route, reason="client_disconnect")
+        raise ClientDisconnected()
+    finally:
+        watcher.cancel()
+        if not work.done():
+            # The endpoint itself was cancelled (e.g. server shutdown)
+            deadline.cancel()
+            work.cancel()
+
 @router.options("/query")
 async def options_query():
-    response = JSONResponse(content={"status": "ok"})
+    response = FastJSONResponse(content={"status": "ok"})
     response.headers["Access-Control-Allow-Origin"] = "*"
     response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
     response.headers["Access-Control-Allow-Headers"] = "*"
     return response
 
 @router.post("/query")
-async def query_research(req: QueryRequest):
+async def query_research(req: QueryRequest, request: Request):
+    deadline = Deadline.from_request(req.options, request.headers.get(DEADLINE_HEADER))
     try:
-        response = await run_agent(req.query, req.options)
+        with deadline_scope(deadline):
+            response = await run_until_disconnected(request, run_agent(req.query, req.options), deadline, "/api/query")
         result = {"status": "ok", **response}
-        json_response = JSONResponse(content=result)
+        json_response = FastJSONResponse(content=result)
+        json_response.headers["Access-Control-Allow-Origin"] = "*"
+        return json_response
+    except ClientDisconnected:
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/query/batch")
+async def query_research_batch(req: BatchQueryRequest, request: Request):
+    if len(req.queries) > settings.MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(req.queries)} queries (max {settings.MAX_BATCH_QUERIES})"
+        )
+    
+    deadline = Deadline.from_request(req.options, request.headers.get(DEADLINE_HEADER))
+    
+    async def ndjson_lines():
+        # The body is streamed after the endpoint returns, so the deadline is scoped here
+        with deadline_scope(deadline):
+            try:
+                async for result in run_agent_batch(req.queries, req.options, req.max_concurrency):
+                    yield dumps(result) + b"\n"
+            except asyncio.CancelledError:
+                # StreamingResponse cancels the body when the client disconnects
+                deadline.cancel()
+                metrics.increment("requests_cancelled_total", route="/api/query/batch", reason="client_disconnect")
+                raise
+    
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+@router.post("/calculate/batch")
+async def calculate_batch(req: BatchCalculationRequest):
+    if len(req.expressions) > settings.MAX_BATCH_EXPRESSIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(req.expressions)} expressions (max {settings.MAX_BATCH_EXPRESSIONS})"
+        )
+    try:
+        results = await calculate_math_batch(req.expressions)
+        json_response = FastJSONResponse(content={"status": "ok", "count": len(results), "results": results})
         json_response.headers["Access-Control-Allow-Origin"] = "*"
         return json_response
     except Exception as e:
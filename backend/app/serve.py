@@ -0,0 +1,178 @@
+"""
+API server process with graceful shutdown.
+
+    python -m app.serve
+    API_WORKERS=4 python -m app.serve
+
+Runs the API under uvicorn. On SIGTERM (or Ctrl+C) the instance first
+reports itself as draining on /ready, keeps serving for SHUTDOWN_DRAIN_DELAY
+seconds so load balancers stop routing to it, then refuses new connections
+and gives in-flight queries and streams SHUTDOWN_GRACE_PERIOD seconds to
+finish. The lifespan shutdown then flushes the write-behind queues (cache
+refreshes, query history) and closes the connection pools. A second signal
+skips the drain delay; a third exits at once.
+
+With API_WORKERS above 1 the parent imports the app, builds the chains and
+freezes the heap before forking that many workers onto one listening socket,
+so the workers share those pages instead of each loading them. The workers
+share the disk cache (every value is written through to it), rate limits
+(a shared memory table) and metrics (summed on /metrics). In-process L1
+caches, the semantic cache and the answer index stay per worker. The parent
+forwards shutdown signals and replaces workers that die.
+"""
+import argparse
+import gc
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import traceback
+from typing import Dict
+
+import uvicorn
+
+from app.config import settings
+from app.services.metrics import metrics
+from app.services.readiness import readiness
+
+
+class GracefulServer(uvicorn.Server):
+    """uvicorn server that drains before it stops accepting connections"""
+
+    def __init__(self, config: uvicorn.Config, drain_delay: float):
+        super().__init__(config)
+        self.drain_delay = drain_delay
+
+    def handle_exit(self, sig, frame) -> None:
+        # Runs as a signal handler: only flags are set here
+        if self.should_exit:
+            self.force_exit = True
+        elif readiness.draining or self.drain_delay <= 0:
+            readiness.drain()
+            self.should_exit = True
+        else:
+            readiness.drain()
+            timer = threading.Timer(self.drain_delay, self._stop_accepting)
+            timer.daemon = True
+            timer.start()
+
+    def _stop_accepting(self) -> None:
+        self.should_exit = True
+
+
+def load_shared_state() -> None:
+    """
+    Build the immutable state in the parent, before forking
+
+    Imports the modules a single process defers to the first request and
+    composes the chains. gc.freeze then moves everything allocated so far out
+    of the collector's reach, so collections in the workers do not write to
+    (and so copy) the shared pages.
+    """
+    import app.services.enhanced_search_service  # noqa: F401
+    from app.services.readiness import build_chains
+
+    build_chains()
+    gc.collect()
+    gc.freeze()
+
+
+class WorkerSupervisor:
+    """Forks GracefulServer workers onto one listening socket and replaces any that die"""
+
+    def __init__(self, config: uvicorn.Config, workers: int, drain_delay: float):
+        self.config = config
+        self.workers = workers
+        self.drain_delay = drain_delay
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+
+    def run(self) -> None:
+        sock = self.config.bind_socket()
+        metrics_dir = tempfile.mkdtemp(prefix="api-metrics-")
+        metrics.share(metrics_dir)
+        start = time.perf_counter()
+        load_shared_state()
+        print(f"Shared state loaded in {time.perf_counter() - start:.2f}s; starting {self.workers} workers")
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self.handle_exit)
+        try:
+            for _ in range(self.workers):
+                self._spawn(sock)
+            while self.children:
+                time.sleep(0.5)
+                self._reap(sock)
+        finally:
+            sock.close()
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+    def handle_exit(self, sig, frame) -> None:
+        """Pass shutdown signals on; each worker drains and flushes on its own"""
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self, sock) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return
+        code = 1
+        try:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, signal.SIG_DFL)
+            metrics.start_publishing(settings.WORKER_METRICS_INTERVAL)
+            GracefulServer(self.config, self.drain_delay).run(sockets=[sock])
+            metrics.stop_publishing()
+            code = 0
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(code)
+
+    def _reap(self, sock) -> None:
+        for pid, started in list(self.children.items()):
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if not finished:
+                continue
+            del self.children[pid]
+            try:
+                os.remove(os.path.join(metrics.shared_dir, f"{pid}.json"))
+            except FileNotFoundError:
+                pass
+            if self.stopping:
+                continue
+            print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; starting a new one")
+            if time.monotonic() - started < 1.0:
+                time.sleep(1.0)  # Do not fork in a tight loop when workers fail at startup
+            self._spawn(sock)
+
+
+def serve(app, host: str, port: int, workers: int = 1, **options) -> None:
+    """Run app until a shutdown signal, with the configured drain delay and grace period"""
+    config = uvicorn.Config(app, host=host, port=port,
+                            timeout_graceful_shutdown=settings.SHUTDOWN_GRACE_PERIOD, **options)
+    if workers > 1:
+        WorkerSupervisor(config, workers, settings.SHUTDOWN_DRAIN_DELAY).run()
+    else:
+        GracefulServer(config, settings.SHUTDOWN_DRAIN_DELAY).run()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the AI Research Assistant API")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    args = parser.parse_args()
+
+    from app.main import app
+
+    serve(app, args.host, args.port, settings.API_WORKERS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""
+Admin access for AI Research Assistant
+Admin endpoints and admin-only request options need ADMIN_TOKEN in the
+X-Admin-Token header; they are disabled while ADMIN_TOKEN is unset
+"""
+import hmac
+from typing import Optional
+
+from app.config import settings
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """Whether token is the configured admin token (constant-time comparison)"""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
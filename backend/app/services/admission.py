@@ -0,0 +1,191 @@
+"""
+Admission control for AI Research Assistant
+Bounds in-flight work and sheds load early, with Retry-After, when the
+queue is full or the estimated wait would break the latency SLO
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+from app.config import settings
+from .metrics import metrics
+
+# Route classes: a streamed response holds its slot far longer than one answer
+REQUEST = "request"
+STREAM = "stream"
+
+
+class AdmissionRejected(Exception):
+    """A request was shed instead of queued"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Concurrency limiter with a bounded wait queue.
+
+    Service time is tracked per route class as an exponentially weighted
+    moving average, so minute-long streams do not inflate the estimate for
+    single answers. The expected wait of a newly queued request is roughly
+    (requests ahead / concurrency) * average service time of the requests
+    holding the slots. A request is shed when its wait plus its own service
+    time would exceed the SLO; for a stream only the wait to start counts.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, latency_slo: float, ewma_alpha: float = 0.2):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.latency_slo = latency_slo
+        self.ewma_alpha = ewma_alpha
+        self.in_flight = 0
+        self.queued = 0
+        self.service_times: Dict[str, float] = {}
+        self._holders: Dict[str, int] = {}  # In-flight requests per route class
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def _slot_time(self) -> float:
+        """Average service time of the requests holding slots, i.e. how often a slot frees up"""
+        holders = sum(self._holders.values())
+        if not holders:
+            return 0.0
+        return sum(count * self.service_times.get(route_class, 0.0)
+                   for route_class, count in self._holders.items()) / holders
+
+    def _latency_budget(self, route_class: str) -> float:
+        """Time a request of this class spends in its slot that counts towards the SLO"""
+        return 0.0 if route_class == STREAM else self.service_times.get(route_class, 0.0)
+
+    def estimated_wait(self) -> float:
+        """Expected queueing delay for a request arriving now"""
+        if self.in_flight < self.max_concurrency:
+            return 0.0
+        return (self.queued + 1) / self.max_concurrency * self._slot_time()
+
+    def _retry_after(self, wait: float) -> int:
+        return max(1, math.ceil(wait or self._slot_time() or 1.0))
+
+    def _reject(self, status_code: int, reason: str, wait: float) -> AdmissionRejected:
+        self.rejected_total += 1
+        metrics.increment("admission_rejected_total", reason=reason)
+        return AdmissionRejected(status_code, reason, self._retry_after(wait))
+
+    @asynccontextmanager
+    async def admit(self, route_class: str = REQUEST) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of a request
+
+        Args:
+            route_class: REQUEST, STREAM or another class with its own service time estimate
+
+        Raises:
+            AdmissionRejected: 429 when the wait queue is full, 503 when the
+            estimated latency exceeds the SLO or the queued wait runs out
+        """
+        if self.in_flight >= self.max_concurrency:
+            wait = self.estimated_wait()
+            if self.queued >= self.max_queue:
+                raise self._reject(429, "queue_full", wait)
+            if wait + self._latency_budget(route_class) > self.latency_slo:
+                raise self._reject(503, "latency_slo", wait)
+
+        self.queued += 1
+        try:
+            # A queued request may wait only as long as the SLO still allows
+            await asyncio.wait_for(self._slots.acquire(), max(self.latency_slo - self._latency_budget(route_class), 0.1))
+        except asyncio.TimeoutError:
+            raise self._reject(503, "queue_timeout", self.estimated_wait())
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self._holders[route_class] = self._holders.get(route_class, 0) + 1
+        self.admitted_total += 1
+        self._publish()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            average = self.service_times.get(route_class)
+            self.service_times[route_class] = (elapsed if average is None else
+                                               self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * average)
+            self._holders[route_class] -= 1
+            self.in_flight -= 1
+            self._slots.release()
+            self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission_in_flight", self.in_flight)
+        metrics.set_gauge("admission_queued", self.queued)
+
+    def state(self) -> Dict[str, Any]:
+        """Current controller state, for the /admission endpoint"""
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "latency_slo": self.latency_slo,
+            "avg_service_time": {route_class: round(seconds, 4) for route_class, seconds in self.service_times.items()},
+            "estimated_wait": round(self.estimated_wait(), 4),
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+def _path_set(paths: str) -> Set[str]:
+    return {path.strip() for path in paths.split(",") if path.strip()}
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying an AdmissionController to selected routes"""
+
+    def __init__(self, app, controller: AdmissionController, paths: Optional[str] = None,
+                 streaming_paths: Optional[str] = None):
+        self.app = app
+        self.controller = controller
+        self.paths = _path_set(paths or settings.ADMISSION_PATHS)
+        self.streaming_paths = _path_set(settings.ADMISSION_STREAMING_PATHS if streaming_paths is None
+                                         else streaming_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        route_class = STREAM if scope["path"] in self.streaming_paths else REQUEST
+        try:
+            async with self.controller.admit(route_class):
+                await self.app(scope, receive, send)
+        except AdmissionRejected as rejection:
+            await self._send_rejection(send, rejection)
+
+    async def _send_rejection(self, send, rejection: AdmissionRejected) -> None:
+        body = ('{"status": "error", "detail": "Server is busy (%s). Please retry later."}' % rejection.reason).encode()
+        await send({
+            "type": "http.response.start",
+            "status": rejection.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejection.retry_after).encode()),
+                (b"access-control-allow-origin", b"*"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+# Global admission controller
+admission_controller = AdmissionController(
+    settings.ADMISSION_MAX_CONCURRENCY,
+    settings.ADMISSION_MAX_QUEUE,
+    settings.ADMISSION_LATENCY_SLO
+)
@@ -0,0 +1,232 @@
+"""
+Local full-text answer index for AI Research Assistant
+An in-process BM25 inverted index over past questions, answers and their
+search snippets. Near-repeat questions can reuse a fresh prior answer, or
+seed the chain context with it, without calling the search providers
+"""
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from app.config import settings
+from .history_store import normalize_query
+
+REUSED_CHAIN = "Answer Index"
+# Answers that are not indexed: cheap to recompute, or copies of an indexed answer
+UNINDEXED_CHAINS = frozenset({"Local Calculator", REUSED_CHAIN})
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me of on or please
+tell that the this to was what when where which who why will with you your
+""".split())
+# Stopwords for ranking, but they decide what is asked: "when" and "who" about
+# the same subject are different questions
+INTERROGATIVES = frozenset("how what when where which who whom whose why".split())
+# Auxiliaries that put a question in the past or future ("who was" vs "who is"); present otherwise
+TENSES = {"was": "past", "were": "past", "did": "past", "had": "past", "will": "future", "would": "future"}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords; a trailing plural 's' is dropped"""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def question_signature(text: str) -> Tuple[FrozenSet[str], str, Tuple[str, ...]]:
+    """
+    What a question asks, beyond its bag of words: its question words, its
+    tense and its terms in order, as "100 EUR to USD" is not "100 USD to EUR"
+    """
+    words = _TOKEN.findall(text.lower())
+    tense = next((TENSES[word] for word in words if word in TENSES), "present")
+    return frozenset(word for word in words if word in INTERROGATIVES), tense, tuple(tokenize(text))
+
+
+@dataclass
+class IndexedAnswer:
+    """One past question with its answer and the context it was built from"""
+    doc_id: int
+    query: str
+    answer: str
+    context: str
+    chain_used: Optional[str]
+    tools_used: List[str]
+    created_at: float
+    question_terms: FrozenSet[str]
+    signature: Tuple[FrozenSet[str], str, Tuple[str, ...]]
+    term_counts: Dict[str, int] = field(repr=False)
+    length: int = 0
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+@dataclass
+class AnswerMatch:
+    entry: IndexedAnswer
+    score: float  # BM25 score over question, answer and context
+    similarity: float  # IDF-weighted overlap between the query and the stored question
+    containment: float  # IDF-weighted share of the stored question found in the query
+    coverage: float = 1.0  # IDF-weighted share of the query found in the stored question
+    same_question: bool = True  # Same question words, tense and terms in the same order
+
+    def reusable(self, max_age: Optional[float] = None) -> bool:
+        """Close and fresh enough to return the prior answer as is; max_age tightens the configured age"""
+        return (self.same_question
+                and self.similarity >= settings.ANSWER_INDEX_REUSE_SIMILARITY
+                and self.entry.age <= min(settings.ANSWER_INDEX_REUSE_MAX_AGE, max_age or math.inf))
+
+    def seedable(self, max_age: Optional[float] = None) -> bool:
+        """Related and fresh enough to stand in for a web search"""
+        return (self.containment >= settings.ANSWER_INDEX_SEED_CONTAINMENT
+                and self.coverage >= settings.ANSWER_INDEX_SEED_COVERAGE
+                and self.similarity >= settings.ANSWER_INDEX_SEED_SIMILARITY
+                and self.entry.age <= min(settings.ANSWER_INDEX_SEED_MAX_AGE, max_age or math.inf))
+
+
+class AnswerIndex:
+    """
+    BM25 inverted index updated incrementally as queries are answered.
+
+    BM25 ranks candidates over the full document; the reuse and seed
+    decisions use IDF-weighted overlaps with the stored question, which
+    unlike raw BM25 scores are bounded to [0, 1]. A prior answer is reused
+    only when both questions have the same terms in the same order, question
+    words (who, when, why...) and tense, since a bag of words cannot tell
+    "EUR to USD" from "USD to EUR". It seeds the context when each question
+    contains most of the other. Only the latest answer per
+    normalized question is kept, and the oldest documents are evicted once
+    max_documents is reached.
+    """
+
+    def __init__(self, max_documents: int, k1: float = 1.5, b: float = 0.75):
+        self.max_documents = max_documents
+        self.k1 = k1
+        self.b = b
+        self._docs: "OrderedDict[int, IndexedAnswer]" = OrderedDict()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._by_question: Dict[str, int] = {}
+        self._total_length = 0
+        self._next_id = 0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, query: str, answer: str, context: str = "", chain_used: Optional[str] = None,
+            tools_used: Optional[List[str]] = None, created_at: Optional[float] = None) -> int:
+        """Index one answered question, replacing any older answer to the same question"""
+        key = normalize_query(query)
+        if key in self._by_question:
+            self.remove(self._by_question[key])
+
+        terms = tokenize(f"{query}\n{answer}\n{context}")
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+
+        doc_id = self._next_id
+        self._next_id += 1
+        self._docs[doc_id] = IndexedAnswer(
+            doc_id, query, answer, context, chain_used, list(tools_used or []),
+            created_at or time.time(), frozenset(tokenize(query)), question_signature(query), counts, len(terms)
+        )
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+        self._by_question[key] = doc_id
+        self._total_length += len(terms)
+
+        while len(self._docs) > self.max_documents:
+            self.remove(next(iter(self._docs)))
+        return doc_id
+
+    def remove(self, doc_id: int) -> None:
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        for term in entry.term_counts:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        key = normalize_query(entry.query)
+        if self._by_question.get(key) == doc_id:
+            del self._by_question[key]
+        self._total_length -= entry.length
+
+    def _idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._docs) - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 10) -> List[AnswerMatch]:
+        """Best matches for a query, highest similarity first"""
+        terms = set(tokenize(query))
+        if not terms or not self._docs:
+            return []
+        avg_length = self._total_length / len(self._docs) or 1.0
+        idf = {term: self._idf(term) for term in terms}
+        signature = question_signature(query)
+        query_weight = sum(idf.values())
+
+        scores: Dict[int, float] = {}
+        for term in terms:
+            for doc_id, tf in self._postings.get(term, {}).items():
+                length_norm = 1 - self.b + self.b * self._docs[doc_id].length / avg_length
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+
+        candidates = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        matches = []
+        for doc_id, score in candidates:
+            entry = self._docs[doc_id]
+            question_terms = entry.question_terms
+            weights = {term: idf.get(term) or self._idf(term) for term in terms | question_terms}
+            shared = sum(weights[term] for term in terms & question_terms)
+            union = sum(weights.values())
+            stored = sum(weights[term] for term in question_terms)
+            matches.append(AnswerMatch(entry, score, shared / union if union else 0.0,
+                                       shared / stored if stored else 0.0,
+                                       shared / query_weight if query_weight else 0.0,
+                                       signature == entry.signature))
+        matches.sort(key=lambda match: (match.similarity, match.score), reverse=True)
+        return matches
+
+    def best_match(self, query: str) -> Optional[AnswerMatch]:
+        matches = self.search(query)
+        return matches[0] if matches else None
+
+    async def load(self, history_store, limit: Optional[int] = None) -> int:
+        """Build the index from stored history, oldest first so newer answers win"""
+        rows = await history_store.recent(limit or settings.ANSWER_INDEX_LOAD_LIMIT)
+        for row in reversed(rows):
+            if row["partial"] or not row.get("answer") or row.get("chain_used") in UNINDEXED_CHAINS:
+                continue
+            # Answers built on a reused context are only as fresh as that context
+            created_at = (row.get("providers") or {}).get("seeded_from") or row["created_at"]
+            self.add(row["query"], row["answer"], row.get("context") or "", row.get("chain_used"),
+                     row.get("tools_used"), created_at)
+        self.loaded = True
+        return len(self._docs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._docs),
+            "terms": len(self._postings),
+            "loaded": self.loaded,
+        }
+
+
+# Global answer index
+answer_index = AnswerIndex(settings.ANSWER_INDEX_MAX_DOCUMENTS)
@@ -0,0 +1,787 @@
+"""
+Tiered cache for AI Research Assistant
+One get/set API over an in-process LRU (L1), an on-disk store with a
+memory-mapped index that survives restarts and is shared by the worker
+processes of a host (L2) and, when REDIS_URL is set, Redis shared by every
+worker and instance (L3). Each namespace has its own TTL and size caps.
+Entries written with set_fresh can be served stale for a grace window while
+they are refreshed in the background (stale-while-revalidate)
+"""
+import asyncio
+import contextvars
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.startup import constructing
+from .metrics import metrics
+from .serialization import dumps, loads
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; the disk tier then only locks within the process
+    fcntl = None
+
+NAMESPACES = ("search", "pages", "llm", "answers")
+
+# Disk index: header (magic, slot count, used slots), then fixed-size slots
+_INDEX_MAGIC = b"RACIDX01"
+_HEADER = struct.Struct("<8sQQ8x")
+# key digest, data offset, record length, unused, expires_at
+_SLOT = struct.Struct("<16sQI4xd")
+# Data record header: key length, value length, expires_at; followed by key and value bytes
+_RECORD = struct.Struct("<IId")
+_EMPTY_DIGEST = bytes(16)
+
+# Set inside background refreshes, where stale entries count as misses
+_revalidating: contextvars.ContextVar[bool] = contextvars.ContextVar("cache_revalidating", default=False)
+
+
+@contextmanager
+def revalidating() -> Iterator[None]:
+    """Treat stale entries as misses within the block, so results are built from current data"""
+    token = _revalidating.set(True)
+    try:
+        yield
+    finally:
+        _revalidating.reset(token)
+
+
+def cache_key(*parts: Any) -> str:
+    """Build a cache key from several parts"""
+    return "\x1f".join(str(part) for part in parts)
+
+
+def _digest(key: str) -> bytes:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    # An all-zero digest marks an empty slot
+    return digest if digest != _EMPTY_DIGEST else b"\x01" + digest[1:]
+
+
+def parse_namespace_values(spec: str) -> Dict[str, float]:
+    """Parse "search=3600,pages=21600" into namespace -> value"""
+    values = {}
+    for rule in spec.split(","):
+        if rule.strip():
+            name, _, value = rule.partition("=")
+            values[name.strip()] = float(value)
+    return values
+
+
+@dataclass
+class Namespace:
+    name: str
+    ttl: float
+    memory_bytes: int
+    disk_bytes: int  # 0 disables the disk tier
+    redis: bool
+
+
+def build_namespaces() -> Dict[str, Namespace]:
+    ttls = parse_namespace_values(settings.CACHE_TTLS)
+    memory = parse_namespace_values(settings.CACHE_MEMORY_LIMITS_MB)
+    disk = parse_namespace_values(settings.CACHE_DISK_LIMITS_MB)
+    redis_names = {name.strip() for name in settings.CACHE_REDIS_NAMESPACES.split(",")}
+    return {
+        name: Namespace(
+            name,
+            ttls.get(name, settings.CACHE_TTL_HOURS * 3600),
+            int(memory.get(name, 32) * 1024 * 1024),
+            int(disk.get(name, 0) * 1024 * 1024),
+            name in redis_names
+        )
+        for name in NAMESPACES
+    }
+
+
+class MemoryTier:
+    """LRU of deserialized values bounded by their serialized size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # digest -> (value, expires_at, size, already on disk)
+        self._entries: "OrderedDict[bytes, Tuple[Any, float, int, bool]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: bytes, now: float) -> Optional[Tuple[Any, float]]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        value, expires_at = entry[0], entry[1]
+        if expires_at <= now:
+            self.delete(digest)
+            return None
+        self._entries.move_to_end(digest)
+        return value, expires_at
+
+    def set(self, digest: bytes, value: Any, expires_at: float, size: int,
+            on_disk: bool = False) -> List[Tuple[bytes, Any, float, int, bool]]:
+        """Store a value; returns the entries evicted to make room"""
+        self.delete(digest)
+        self._entries[digest] = (value, expires_at, size, on_disk)
+        self.bytes += size
+        evicted = []
+        while self.bytes > self.max_bytes and self._entries:
+            old_digest, old_entry = self._entries.popitem(last=False)
+            self.bytes -= old_entry[2]
+            evicted.append((old_digest, *old_entry))
+        return evicted
+
+    def delete(self, digest: bytes) -> None:
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+
+class DiskTier:
+    """
+    Append-only data file plus a memory-mapped open-addressing index.
+
+    The index maps key digests to record offsets, so a lookup is a few
+    probes in the mapped index and one pread. Records are never rewritten in
+    place; when the data file or the index fills up, live entries are
+    compacted into fresh files that replace the old ones atomically. Other
+    processes notice the replacement by inode and reopen.
+    """
+
+    def __init__(self, directory: str, name: str, max_bytes: int, slots: int):
+        self.max_bytes = max_bytes
+        self.slots = slots
+        self.index_path = os.path.join(directory, f"{name}.idx")
+        self.data_path = os.path.join(directory, f"{name}.dat")
+        self.lock_path = os.path.join(directory, f"{name}.lock")
+        self._lock = threading.RLock()
+        self._file_lock = _FileLock(self.lock_path)
+        self._index: Optional[mmap.mmap] = None
+        self._index_fd: Optional[int] = None
+        self._data_fd: Optional[int] = None
+        self._inode: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self) -> None:
+        self._close_files()
+        with self._file_lock:
+            if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) != self._index_size(self.slots):
+                self._create(self.index_path, self.data_path, [])
+            self._index_fd = os.open(self.index_path, os.O_RDWR)
+            self._data_fd = os.open(self.data_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            self._index = mmap.mmap(self._index_fd, 0)
+            self._inode = os.fstat(self._index_fd).st_ino
+
+    def _index_size(self, slots: int) -> int:
+        return _HEADER.size + slots * _SLOT.size
+
+    def _create(self, index_path: str, data_path: str, records: List[Tuple[bytes, bytes, float]]) -> None:
+        """Write a fresh index and data file holding the given (digest, value, expires_at) records"""
+        index = bytearray(self._index_size(self.slots))
+        _HEADER.pack_into(index, 0, _INDEX_MAGIC, self.slots, len(records))
+        offset = 0
+        with open(data_path, "wb") as data_file:
+            for digest, value, expires_at in records:
+                record = _RECORD.pack(len(digest), len(value), expires_at) + digest + value
+                data_file.write(record)
+                slot = self._probe(index, digest)
+                _SLOT.pack_into(index, _HEADER.size + slot * _SLOT.size, digest, offset, len(record), expires_at)
+                offset += len(record)
+        with open(index_path, "wb") as index_file:
+            index_file.write(index)
+
+    def _probe(self, index, digest: bytes) -> int:
+        """Slot holding digest, or the first empty slot on its probe sequence"""
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        for step in range(self.slots):
+            slot = (start + step) % self.slots
+            position = _HEADER.size + slot * _SLOT.size
+            stored = bytes(index[position:position + 16])
+            if stored == digest or stored == _EMPTY_DIGEST:
+                return slot
+        raise RuntimeError("cache index is full")
+
+    def _check_replaced(self) -> None:
+        try:
+            replaced = os.stat(self.index_path).st_ino != self._inode
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            self._open()
+
+    def get(self, digest: bytes, now: float) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            self._check_replaced()
+            position = _HEADER.size + self._probe(self._index, digest) * _SLOT.size
+            stored, offset, length, expires_at = _SLOT.unpack_from(self._index, position)
+            if stored != digest or expires_at <= now:
+                return None
+            record = os.pread(self._data_fd, length, offset)
+            if len(record) != length:
+                return None
+            key_length, value_length, _ = _RECORD.unpack_from(record)
+            start = _RECORD.size
+            if record[start:start + key_length] != digest:
+                return None
+            return record[start + key_length:start + key_length + value_length], expires_at
+
+    def set(self, digest: bytes, value: bytes, expires_at: float) -> None:
+        record = _RECORD.pack(len(digest), len(value), expires_at) + digest + value
+        with self._lock, self._file_lock:
+            self._check_replaced()
+            offset = os.lseek(self._data_fd, 0, os.SEEK_END)
+            if offset + len(record) > self.max_bytes or self._used_slots() > self.slots * 0.7:
+                self._compact(len(record))
+                offset = os.lseek(self._data_fd, 0, os.SEEK_END)
+            os.write(self._data_fd, record)
+            slot = self._probe(self._index, digest)
+            position = _HEADER.size + slot * _SLOT.size
+            if self._index[position:position + 16] == _EMPTY_DIGEST:
+                _HEADER.pack_into(self._index, 0, _INDEX_MAGIC, self.slots, self._used_slots() + 1)
+            _SLOT.pack_into(self._index, position, digest, offset, len(record), expires_at)
+
+    def _used_slots(self) -> int:
+        return _HEADER.unpack_from(self._index, 0)[2]
+
+    def _live_entries(self, now: float) -> List[Tuple[bytes, int, int, float]]:
+        entries = []
+        for slot in range(self.slots):
+            digest, offset, length, expires_at = _SLOT.unpack_from(self._index, _HEADER.size + slot * _SLOT.size)
+            if digest != _EMPTY_DIGEST and expires_at > now:
+                entries.append((digest, offset, length, expires_at))
+        return entries
+
+    def _compact(self, incoming: int) -> None:
+        """Rewrite live entries, longest-lived first, into half the byte and slot budget"""
+        now = time.time()
+        entries = sorted(self._live_entries(now), key=lambda entry: entry[3], reverse=True)
+        budget = self.max_bytes // 2 - incoming
+        kept, total = [], 0
+        for digest, offset, length, expires_at in entries:
+            if total + length > budget or len(kept) >= self.slots // 2:
+                break
+            record = os.pread(self._data_fd, length, offset)
+            key_length, value_length, _ = _RECORD.unpack_from(record)
+            start = _RECORD.size + key_length
+            kept.append((digest, record[start:start + value_length], expires_at))
+            total += length
+        self._create(self.index_path + ".tmp", self.data_path + ".tmp", kept)
+        os.replace(self.data_path + ".tmp", self.data_path)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        metrics.increment("cache_disk_compactions_total")
+        self._open_unlocked()
+
+    def _open_unlocked(self) -> None:
+        self._close_files()
+        self._index_fd = os.open(self.index_path, os.O_RDWR)
+        self._data_fd = os.open(self.data_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._index = mmap.mmap(self._index_fd, 0)
+        self._inode = os.fstat(self._index_fd).st_ino
+
+    def warm(self) -> int:
+        """Fault the index and data file into the page cache, so first reads skip the disk; live entries"""
+        with self._lock:
+            self._check_replaced()
+            live = len(self._live_entries(time.time()))  # Touches every index page
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(self._data_fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            return live
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._check_replaced()
+            return {
+                "bytes": os.fstat(self._data_fd).st_size,
+                "entries": self._used_slots(),
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock, self._file_lock:
+            self._create(self.index_path + ".tmp", self.data_path + ".tmp", [])
+            os.replace(self.data_path + ".tmp", self.data_path)
+            os.replace(self.index_path + ".tmp", self.index_path)
+            self._open_unlocked()
+
+    def _close_files(self) -> None:
+        if self._index is not None:
+            self._index.close()
+        for fd in (self._index_fd, self._data_fd):
+            if fd is not None:
+                os.close(fd)
+        self._index = self._index_fd = self._data_fd = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.flush()
+            self._close_files()
+
+
+class _FileLock:
+    """
+    Exclusive advisory lock shared by every process using the cache directory.
+    Re-entrant within its owner, which already serializes threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = None
+        self.depth = 0
+
+    def __enter__(self):
+        self.depth += 1
+        if self.depth == 1 and fcntl is not None:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0 and self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+class RedisTier:
+    """Values shared by every worker and instance; expiry is left to Redis"""
+
+    def __init__(self, url: str, prefix: str = "cache:"):
+        import redis  # Only needed when REDIS_URL is configured
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, namespace: str, digest: bytes) -> Optional[Tuple[bytes, float]]:
+        key = self.prefix + namespace + ":" + digest.hex()
+        pipe = self.client.pipeline()
+        pipe.get(key)
+        pipe.pttl(key)
+        data, ttl_ms = pipe.execute()
+        if data is None or ttl_ms is None or ttl_ms <= 0:
+            return None
+        return data, time.time() + ttl_ms / 1000
+
+    def set(self, namespace: str, digest: bytes, data: bytes, ttl: float) -> None:
+        self.client.set(self.prefix + namespace + ":" + digest.hex(), data, px=max(int(ttl * 1000), 1))
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class _Flight:
+    """One running producer call shared by every caller waiting on the same key"""
+
+    def __init__(self, task: asyncio.Task, background: bool):
+        self.task = task
+        self.background = background
+        self.waiters = 0
+
+
+class TieredCache:
+    """
+    Unified cache over memory, disk and Redis.
+
+    Reads go L1 -> L2 -> L3 and promote hits to the faster tiers, keeping the
+    remaining TTL. Writes go to memory and, when the namespace uses them, to
+    Redis; values of at least CACHE_DISK_MIN_BYTES (pages, long answers) are
+    written to disk at once, smaller ones only when they are evicted from
+    memory (demotion). The sync methods are for worker threads (search);
+    coroutines should use aget/aset, which keep disk and Redis I/O off the
+    event loop.
+
+    set_fresh/get_fresh add stale-while-revalidate on top: the stored value
+    is fresh for its TTL and kept for a grace window after that, during
+    which callers serve it as stale and start a refresh. Refreshes and
+    concurrent misses of one key share a single producer call.
+    """
+
+    def __init__(self, namespaces: Dict[str, Namespace], directory: Optional[str], redis_url: Optional[str],
+                 disk_min_bytes: int, index_slots: int):
+        self.namespaces = namespaces
+        self.disk_min_bytes = disk_min_bytes
+        self._locks = {name: threading.Lock() for name in namespaces}
+        self._memory = {name: MemoryTier(ns.memory_bytes) for name, ns in namespaces.items()}
+        self._disk: Dict[str, DiskTier] = {}
+        if directory:
+            for name, ns in namespaces.items():
+                if ns.disk_bytes > 0:
+                    try:
+                        self._disk[name] = DiskTier(directory, name, ns.disk_bytes, index_slots)
+                    except OSError as e:
+                        print(f"Disk cache for {name} unavailable: {e}")
+        self._redis: Optional[RedisTier] = None
+        if redis_url and any(ns.redis for ns in namespaces.values()):
+            try:
+                self._redis = RedisTier(redis_url)
+            except ImportError:
+                print("REDIS_URL is set but the redis package is not installed; caching without Redis")
+        self._stats = {name: dict.fromkeys(
+            ("l1_hits", "l2_hits", "l3_hits", "misses", "sets", "evictions", "demotions", "promotions", "errors",
+             "stale", "refreshes", "coalesced"), 0
+        ) for name in namespaces}
+        self._flights: Dict[Tuple[str, str], _Flight] = {}
+        self._thread_refreshes: Set[Tuple[str, str]] = set()
+        self._flight_lock = threading.Lock()
+
+    def _namespace(self, namespace: str) -> Namespace:
+        try:
+            return self.namespaces[namespace]
+        except KeyError:
+            raise ValueError(f"Unknown cache namespace: {namespace}")
+
+    def _count(self, namespace: str, stat: str) -> None:
+        self._stats[namespace][stat] += 1
+
+    def _get_memory(self, namespace: str, digest: bytes, now: float) -> Optional[Any]:
+        with self._locks[namespace]:
+            entry = self._memory[namespace].get(digest, now)
+        if entry is not None:
+            self._count(namespace, "l1_hits")
+            metrics.increment("cache_requests_total", namespace=namespace, outcome="l1")
+            return entry[0]
+        return None
+
+    def _get_lower(self, namespace: str, digest: bytes, now: float) -> Optional[Any]:
+        """Disk then Redis lookup, promoting hits into the faster tiers"""
+        ns = self.namespaces[namespace]
+        found, tier = None, None
+        disk = self._disk.get(namespace)
+        try:
+            if disk is not None:
+                found, tier = disk.get(digest, now), "l2"
+            if found is None and self._redis is not None and ns.redis:
+                found, tier = self._redis.get(namespace, digest), "l3"
+                if found is not None and disk is not None and len(found[0]) >= self.disk_min_bytes:
+                    disk.set(digest, found[0], found[1])
+        except Exception as e:
+            print(f"Cache read failed for {namespace}: {e}")
+            self._count(namespace, "errors")
+            found = None
+        if found is None:
+            self._count(namespace, "misses")
+            metrics.increment("cache_requests_total", namespace=namespace, outcome="miss")
+            return None
+
+        data, expires_at = found
+        value = loads(data)
+        on_disk = tier == "l2" or (disk is not None and len(data) >= self.disk_min_bytes)
+        with self._locks[namespace]:
+            evicted = self._memory[namespace].set(digest, value, expires_at, len(data), on_disk)
+        self._count(namespace, f"{tier}_hits")
+        self._count(namespace, "promotions")
+        metrics.increment("cache_requests_total", namespace=namespace, outcome=tier)
+        self._demote(namespace, evicted)
+        return value
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Cached value, or None when missing or expired"""
+        self._namespace(namespace)
+        digest, now = _digest(key), time.time()
+        value = self._get_memory(namespace, digest, now)
+        return value if value is not None else self._get_lower(namespace, digest, now)
+
+    async def aget(self, namespace: str, key: str) -> Optional[Any]:
+        self._namespace(namespace)
+        digest, now = _digest(key), time.time()
+        value = self._get_memory(namespace, digest, now)
+        if value is not None:
+            return value
+        if namespace not in self._disk and not (self._redis and self.namespaces[namespace].redis):
+            self._count(namespace, "misses")
+            metrics.increment("cache_requests_total", namespace=namespace, outcome="miss")
+            return None
+        return await asyncio.to_thread(self._get_lower, namespace, digest, now)
+
+    def _set_memory(self, namespace: str, key: str, value: Any, ttl: Optional[float]):
+        ns = self._namespace(namespace)
+        ttl = ns.ttl if ttl is None else ttl
+        digest, data = _digest(key), dumps(value)
+        expires_at = time.time() + ttl
+        on_disk = namespace in self._disk and len(data) >= self.disk_min_bytes
+        with self._locks[namespace]:
+            evicted = self._memory[namespace].set(digest, value, expires_at, len(data), on_disk)
+        self._count(namespace, "sets")
+        return digest, data, expires_at, ttl, evicted
+
+    def _set_lower(self, namespace: str, digest: bytes, data: bytes, expires_at: float, ttl: float,
+                   evicted: List[Tuple[bytes, Any, float, int, bool]]) -> None:
+        try:
+            disk = self._disk.get(namespace)
+            if disk is not None and len(data) >= self.disk_min_bytes:
+                disk.set(digest, data, expires_at)
+            if self._redis is not None and self.namespaces[namespace].redis:
+                self._redis.set(namespace, digest, data, ttl)
+        except Exception as e:
+            print(f"Cache write failed for {namespace}: {e}")
+            self._count(namespace, "errors")
+        self._demote(namespace, evicted)
+
+    def _demote(self, namespace: str, evicted: List[Tuple[bytes, Any, float, int, bool]]) -> None:
+        """Move values evicted from memory to disk, unless they are there already"""
+        self._stats[namespace]["evictions"] += len(evicted)
+        disk = self._disk.get(namespace)
+        if disk is None:
+            return
+        now = time.time()
+        for digest, value, expires_at, size, on_disk in evicted:
+            if on_disk or expires_at <= now:
+                continue
+            try:
+                disk.set(digest, dumps(value), expires_at)
+                self._count(namespace, "demotions")
+            except Exception as e:
+                print(f"Cache demotion failed for {namespace}: {e}")
+                self._count(namespace, "errors")
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Cache a JSON-serializable value; ttl defaults to the namespace TTL"""
+        if value is None:
+            return
+        digest, data, expires_at, ttl, evicted = self._set_memory(namespace, key, value, ttl)
+        self._set_lower(namespace, digest, data, expires_at, ttl, evicted)
+
+    async def aset(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if value is None:
+            return
+        digest, data, expires_at, ttl, evicted = self._set_memory(namespace, key, value, ttl)
+        large = namespace in self._disk and len(data) >= self.disk_min_bytes
+        shared = self._redis is not None and self.namespaces[namespace].redis
+        demote = namespace in self._disk and any(not entry[4] for entry in evicted)
+        if large or shared or demote:
+            await asyncio.to_thread(self._set_lower, namespace, digest, data, expires_at, ttl, evicted)
+        else:
+            self._stats[namespace]["evictions"] += len(evicted)
+
+    def _unwrap(self, namespace: str, entry: Any) -> Optional[Tuple[Any, bool]]:
+        if not isinstance(entry, dict) or "fresh_until" not in entry:
+            return None
+        stale = entry["fresh_until"] <= time.time()
+        if stale:
+            if _revalidating.get():
+                # A refresh must not be built from other stale entries
+                return None
+            self._count(namespace, "stale")
+            metrics.increment("cache_stale_total", namespace=namespace)
+        return entry["value"], stale
+
+    def _envelope(self, namespace: str, value: Any, ttl: Optional[float], grace: float) -> Tuple[Dict[str, Any], float]:
+        ttl = self._namespace(namespace).ttl if ttl is None else ttl
+        return {"value": value, "fresh_until": time.time() + ttl}, ttl + grace
+
+    def get_fresh(self, namespace: str, key: str) -> Optional[Tuple[Any, bool]]:
+        """Value stored by set_fresh and whether it is past its TTL (but within its grace window)"""
+        return self._unwrap(namespace, self.get(namespace, key))
+
+    async def aget_fresh(self, namespace: str, key: str) -> Optional[Tuple[Any, bool]]:
+        return self._unwrap(namespace, await self.aget(namespace, key))
+
+    def set_fresh(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, grace: float = 0.0) -> None:
+        """Cache a value that is fresh for ttl seconds and may be served stale for grace seconds more"""
+        if value is None:
+            return
+        envelope, lifetime = self._envelope(namespace, value, ttl, grace)
+        self.set(namespace, key, envelope, lifetime)
+
+    async def aset_fresh(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None,
+                         grace: float = 0.0) -> None:
+        if value is None:
+            return
+        envelope, lifetime = self._envelope(namespace, value, ttl, grace)
+        await self.aset(namespace, key, envelope, lifetime)
+
+    def _start_flight(self, namespace: str, key: str, producer: Callable[[], Awaitable[Any]],
+                      background: bool) -> _Flight:
+        flight_key = (namespace, key)
+        if background:
+            async def run():
+                _revalidating.set(True)
+                return await producer()
+            # An empty context: the refresh is not bound to the deadline of the request that started it
+            task = asyncio.get_running_loop().create_task(run(), context=contextvars.Context())
+            self._count(namespace, "refreshes")
+        else:
+            task = asyncio.get_running_loop().create_task(producer())
+        flight = _Flight(task, background)
+        self._flights[flight_key] = flight
+        task.add_done_callback(lambda done: self._end_flight(flight_key, flight))
+        return flight
+
+    def _end_flight(self, flight_key: Tuple[str, str], flight: _Flight) -> None:
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+        task = flight.task
+        error = None if task.cancelled() else task.exception()
+        if flight.background:
+            outcome = "cancelled" if task.cancelled() else "error" if error else "ok"
+            if error:
+                print(f"Cache refresh failed for {flight_key[0]}: {error}")
+            metrics.increment("cache_refreshes_total", namespace=flight_key[0], outcome=outcome)
+
+    def _coalesce(self, namespace: str) -> None:
+        self._count(namespace, "coalesced")
+        metrics.increment("cache_coalesced_total", namespace=namespace)
+
+    async def single_flight(self, namespace: str, key: str, producer: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await producer(), sharing one call among concurrent callers for the same key
+
+        A running background refresh of the key is joined as well. When the
+        last waiting caller is cancelled (its client went away), a foreground
+        call is cancelled with it.
+        """
+        self._namespace(namespace)
+        flight = self._flights.get((namespace, key))
+        if flight is None:
+            flight = self._start_flight(namespace, key, producer, background=False)
+        else:
+            self._coalesce(namespace)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.background and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def refresh(self, namespace: str, key: str, producer: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Run producer() in the background to replace a stale entry; producer stores the new value
+
+        Nothing is started when a call for the key is already running
+        (single flight). Returns whether a refresh was started.
+        """
+        self._namespace(namespace)
+        if (namespace, key) in self._flights:
+            self._coalesce(namespace)
+            return False
+        self._start_flight(namespace, key, producer, background=True)
+        return True
+
+    def refresh_in_thread(self, namespace: str, key: str, producer: Callable[[], Any]) -> bool:
+        """refresh for blocking producers, called from worker threads (search)"""
+        self._namespace(namespace)
+        flight_key = (namespace, key)
+        with self._flight_lock:
+            if flight_key in self._thread_refreshes:
+                self._coalesce(namespace)
+                return False
+            self._thread_refreshes.add(flight_key)
+        self._count(namespace, "refreshes")
+
+        def run():
+            outcome = "ok"
+            try:
+                _revalidating.set(True)
+                producer()
+            except Exception as e:
+                print(f"Cache refresh failed for {namespace}: {e}")
+                outcome = "error"
+            finally:
+                with self._flight_lock:
+                    self._thread_refreshes.discard(flight_key)
+            metrics.increment("cache_refreshes_total", namespace=namespace, outcome=outcome)
+
+        threading.Thread(target=run, name=f"cache-refresh-{namespace}", daemon=True).start()
+        return True
+
+    def clear(self, namespace: str) -> None:
+        """Drop a namespace from memory and disk (Redis entries expire on their own)"""
+        self._namespace(namespace)
+        with self._locks[namespace]:
+            self._memory[namespace].clear()
+        if namespace in self._disk:
+            self._disk[namespace].clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, eviction and size statistics per namespace and tier"""
+        result = {}
+        for name, ns in self.namespaces.items():
+            counts = dict(self._stats[name])
+            hits = counts["l1_hits"] + counts["l2_hits"] + counts["l3_hits"]
+            memory = self._memory[name]
+            result[name] = {
+                **counts,
+                "hit_rate": round(hits / (hits + counts["misses"]), 4) if hits + counts["misses"] else 0.0,
+                "ttl": ns.ttl,
+                "memory": {"entries": len(memory), "bytes": memory.bytes, "max_bytes": memory.max_bytes},
+                "disk": self._disk[name].stats() if name in self._disk else None,
+                "redis": self._redis is not None and ns.redis,
+            }
+        return result
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Wait for running refreshes (tasks and threads) to store their results, at most timeout seconds
+
+        Returns the number still running; those are cancelled (tasks) or
+        abandoned (daemon threads) when the process exits.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._flight_lock:
+                running = len(self._flights) + len(self._thread_refreshes)
+            if not running or time.monotonic() >= deadline:
+                return running
+            await asyncio.sleep(0.05)
+
+    def warm(self) -> Dict[str, Any]:
+        """Load the disk tiers into the page cache and connect to Redis, ahead of the first request"""
+        result: Dict[str, Any] = {"disk_entries": {name: disk.warm() for name, disk in self._disk.items()}}
+        if self._redis is not None:
+            try:
+                result["redis"] = bool(self._redis.client.ping())
+            except Exception as e:
+                # Reads and writes fall back to the local tiers while Redis is down
+                result["redis"] = False
+                result["redis_error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    def close(self) -> None:
+        """Demote everything still only in memory to disk, so it survives the restart"""
+        for name, disk in self._disk.items():
+            with self._locks[name]:
+                memory = self._memory[name]
+                entries = [(digest, *entry) for digest, entry in memory._entries.items()]
+                memory.clear()
+            self._demote(name, entries)
+            self._stats[name]["evictions"] -= len(entries)
+            disk.close()
+        if self._redis is not None:
+            self._redis.close()
+
+
+def create_cache() -> TieredCache:
+    namespaces = build_namespaces()
+    if not settings.CACHE_ENABLED:
+        # Nothing is kept: zero-byte memory tiers and no disk or Redis
+        for ns in namespaces.values():
+            ns.memory_bytes, ns.disk_bytes, ns.redis = 0, 0, False
+    # Worker processes on one host (API_WORKERS) only see each other's values on disk, so all are written there
+    disk_min_bytes = 0 if settings.API_WORKERS > 1 else settings.CACHE_DISK_MIN_BYTES
+    return TieredCache(
+        namespaces,
+        settings.CACHE_DIR if settings.CACHE_ENABLED else None,
+        settings.REDIS_URL,
+        disk_min_bytes,
+        settings.CACHE_DISK_INDEX_SLOTS
+    )
+
+
+# Global tiered cache
+with constructing("tiered_cache"):
+    tiered_cache = create_cache()
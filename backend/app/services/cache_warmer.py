@@ -0,0 +1,136 @@
+"""
+Cache warmer for AI Research Assistant
+Replays the most frequent recent queries from the history at startup and
+then periodically, so a deploy does not start from cold caches. Warming runs
+one query at a time, within its own rate limit, and pauses while live
+traffic needs the capacity
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from .admission import AdmissionController, admission_controller
+from .history_store import HistoryStore, history_store
+from .langchain_service import langchain_service
+from .metrics import metrics
+from .rate_limiter import RateLimit, parse_rate, rate_limiter
+
+
+class CacheWarmer:
+    """Low-priority background replay of top queries through search and the chains"""
+
+    def __init__(self, store: HistoryStore, admission: AdmissionController, limiter, rate: RateLimit,
+                 top_n: int, window: float, interval: float, max_in_flight: int, busy_timeout: float):
+        self.store = store
+        self.admission = admission
+        self.limiter = limiter
+        self.rate = rate
+        self.top_n = top_n
+        self.window = window
+        self.interval = interval
+        self.max_in_flight = max_in_flight
+        self.busy_timeout = busy_timeout
+        self.last_cycle: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is None and settings.CACHE_WARM_ENABLED and self.store.running:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Stop warming; a query being warmed is abandoned"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    def _busy(self) -> bool:
+        return self.admission.queued > 0 or self.admission.in_flight > self.max_in_flight
+
+    async def _wait_for_capacity(self) -> bool:
+        """Wait until live traffic leaves room; False when it does not within busy_timeout"""
+        waited = 0.0
+        while self._busy():
+            if waited >= self.busy_timeout:
+                return False
+            await asyncio.sleep(1.0)
+            waited += 1.0
+        return True
+
+    async def _wait_for_rate(self) -> None:
+        """Take one slot of the warming rate limit, shared by all workers of a host (and all hosts with REDIS_URL)"""
+        while True:
+            decision = await self.limiter.check("cache-warmer", self.rate)
+            if decision.allowed:
+                return
+            await asyncio.sleep(decision.retry_after)
+
+    async def warm(self) -> Dict[str, Any]:
+        """One pass over the top queries; returns a per-outcome count"""
+        # Local calculations are not cached, so there is nothing to warm
+        rows = await self.store.top_queries(self.top_n, time.time() - self.window, ["Local Calculator"])
+        counts = {"queries": len(rows), "fresh": 0, "warmed": 0, "failed": 0, "busy": 0}
+        failures = 0
+        start = time.perf_counter()
+        for position, row in enumerate(rows):
+            if not await self._wait_for_capacity():
+                # Live traffic needs the capacity; the rest waits for the next cycle
+                counts["busy"] = len(rows) - position
+                metrics.increment("cache_warm_queries_total", len(rows) - position, outcome="busy")
+                break
+            await self._wait_for_rate()
+            try:
+                outcome = await langchain_service.warm_answer(row["query"])
+            except Exception as e:
+                print(f"Cache warming failed for {row['query']!r}: {e}")
+                outcome = "failed"
+            counts[outcome] += 1
+            metrics.increment("cache_warm_queries_total", outcome=outcome)
+            # Repeated failures usually mean the providers are throttling; back off until the next cycle
+            failures = failures + 1 if outcome == "failed" else 0
+            if failures >= 3:
+                break
+        counts["seconds"] = round(time.perf_counter() - start, 2)
+        counts["finished_at"] = time.time()
+        self.last_cycle = counts
+        print(f"Cache warm cycle: {counts}")
+        return counts
+
+    async def _loop(self) -> None:
+        await asyncio.sleep(settings.CACHE_WARM_STARTUP_DELAY)
+        while True:
+            try:
+                await self.warm()
+            except Exception as e:
+                print(f"Cache warm cycle failed: {e}")
+                metrics.increment("cache_warm_errors_total")
+            await asyncio.sleep(self.interval)
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.CACHE_WARM_ENABLED,
+            "running": self.running,
+            "top_n": self.top_n,
+            "interval": self.interval,
+            "last_cycle": self.last_cycle,
+        }
+
+
+# Global cache warmer
+cache_warmer = CacheWarmer(
+    history_store,
+    admission_controller,
+    rate_limiter,
+    parse_rate(settings.CACHE_WARM_RATE),
+    settings.CACHE_WARM_TOP_N,
+    settings.CACHE_WARM_WINDOW_HOURS * 3600,
+    settings.CACHE_WARM_INTERVAL,
+    settings.CACHE_WARM_MAX_IN_FLIGHT,
+    settings.CACHE_WARM_BUSY_TIMEOUT
+)
@@ -2,13 +2,55 @@
 LangChain Chains for AI Research Assistant
 Implements various chains for different types of queries and tasks
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Sequence
 # LLMChain is deprecated in newer versions, using the new LCEL approach
 from langchain_core.runnables import RunnablePassthrough, RunnableParallel, Runnable
 from langchain_core.prompts import PromptTemplate, ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.caches import BaseCache
+from langchain_core.globals import set_llm_cache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+from app.config import settings
+from app.startup import constructing
+from .cache import TieredCache, cache_key, tiered_cache
 from .llm_config import llm_config
 
+class TieredLLMCache(BaseCache):
+    """LangChain LLM cache stored in the "llm" namespace of the tiered cache"""
+    
+    def __init__(self, cache: TieredCache):
+        self.cache = cache
+    
+    def _key(self, prompt: str, llm_string: str) -> str:
+        return cache_key(llm_string, prompt)
+    
+    def _encode(self, generations: Sequence[Generation]) -> List[Dict[str, Any]]:
+        return [{"text": generation.text, "chat": isinstance(generation, ChatGeneration)} for generation in generations]
+    
+    def _decode(self, value: Optional[List[Dict[str, Any]]]) -> Optional[List[Generation]]:
+        if value is None:
+            return None
+        return [
+            ChatGeneration(message=AIMessage(content=item["text"])) if item["chat"] else Generation(text=item["text"])
+            for item in value
+        ]
+    
+    def lookup(self, prompt: str, llm_string: str) -> Optional[List[Generation]]:
+        return self._decode(self.cache.get("llm", self._key(prompt, llm_string)))
+    
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.cache.set("llm", self._key(prompt, llm_string), self._encode(return_val))
+    
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[List[Generation]]:
+        return self._decode(await self.cache.aget("llm", self._key(prompt, llm_string)))
+    
+    async def aupdate(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        await self.cache.aset("llm", self._key(prompt, llm_string), self._encode(return_val))
+    
+    def clear(self, **kwargs: Any) -> None:
+        self.cache.clear("llm")
+
 class ResearchChains:
     """Collection of LangChain chains for research tasks"""
     
@@ -149,6 +191,12 @@ Please extract and organize the most relevant information:""")
         """Get search result processing chain"""
         return self.search_processing_template | self.llm | StrOutputParser()
 
+# Identical prompts to the same model are served from the tiered cache
+if settings.CACHE_ENABLED and settings.LLM_CACHE_ENABLED:
+    set_llm_cache(TieredLLMCache(tiered_cache))
+
 # Global chain instances
-research_chains = ResearchChains()
-tool_chains = ToolChains()
+with constructing("research_chains"):
+    research_chains = ResearchChains()
+with constructing("tool_chains"):
+    tool_chains = ToolChains()
@@ -0,0 +1,152 @@
+"""
+Response compression for AI Research Assistant
+Negotiates brotli or gzip from Accept-Encoding; complete bodies are compressed
+above a size threshold, streamed bodies (NDJSON) chunk by chunk with a flush
+after each chunk so clients still see every line as soon as it is ready
+"""
+import zlib
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:  # Brotli is optional; gzip is always available
+        brotli = None
+
+COMPRESSIBLE_TYPES = (b"application/json", b"application/x-ndjson", b"text/")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick brotli or gzip from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Incremental compressor with an explicit flush point per chunk"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+        else:
+            # wbits 16+ produces a gzip container
+            self._zlib = zlib.compressobj(settings.GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.flush() if flush else b"")
+        out = self._zlib.compress(data)
+        return out + (self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing JSON and NDJSON responses"""
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        encoding = negotiate_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressingResponder:
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send = None
+        self.start_message = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    def _headers_for(self, start_headers: List[Tuple[bytes, bytes]], length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        headers = [(k, v) for k, v in start_headers if k.lower() not in (b"content-length", b"vary")]
+        vary = [v for k, v in start_headers if k.lower() == b"vary"]
+        headers.append((b"content-encoding", self.encoding.encode()))
+        headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        return headers
+
+    async def send_wrapper(self, message):
+        if message["type"] == "http.response.start":
+            headers = list(message.get("headers", []))
+            content_type = next((v for k, v in headers if k.lower() == b"content-type"), b"")
+            already_encoded = any(k.lower() == b"content-encoding" for k, _ in headers)
+            self.passthrough = already_encoded or not content_type.startswith(COMPRESSIBLE_TYPES)
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # Wait for the first body chunk to decide between whole-body and streaming compression
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if not more_body:
+                if len(body) < self.minimum_size:
+                    await self.send(start)
+                    await self.send(message)
+                    return
+                compressor = _Compressor(self.encoding)
+                compressed = compressor.compress(body, flush=False) + compressor.finish()
+                start["headers"] = self._headers_for(start.get("headers", []), len(compressed))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+            self.compressor = _Compressor(self.encoding)
+            start["headers"] = self._headers_for(start.get("headers", []), None)
+            await self.send(start)
+
+        if self.compressor is None:
+            await self.send(message)
+            return
+        if more_body:
+            chunk = self.compressor.compress(body, flush=True)
+        else:
+            chunk = self.compressor.compress(body, flush=False) + self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
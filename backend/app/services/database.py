@@ -0,0 +1,148 @@
+"""
+Database access for AI Research Assistant
+SQLite (default, local file) or Postgres (when DATABASE_URL is configured) behind one async API
+"""
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.config import settings
+
+_PLACEHOLDER = re.compile(r"\?")
+
+
+class Database:
+    """
+    Minimal async database wrapper.
+
+    SQL is written with '?' placeholders; they are rewritten to $1, $2, ...
+    for Postgres. SQLite calls run in a worker thread on one shared
+    connection in WAL mode, so several processes can use the same file.
+    Postgres uses an asyncpg connection pool.
+    """
+
+    def __init__(self, url: Optional[str] = None, sqlite_path: Optional[str] = None):
+        self.url = url
+        self.sqlite_path = sqlite_path
+        self.dialect = "postgres" if url and url.startswith(("postgres://", "postgresql://")) else "sqlite"
+        if self.dialect == "sqlite" and url and url.startswith("sqlite:///"):
+            self.sqlite_path = url[len("sqlite:///"):]
+        self._pool = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._connect_lock = asyncio.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._pool is not None or self._conn is not None
+
+    async def connect(self) -> None:
+        """Open the pool or connection; safe to call more than once"""
+        async with self._connect_lock:
+            if self.connected:
+                return
+            if self.dialect == "postgres":
+                import asyncpg  # Only needed when Postgres is configured
+                self._pool = await asyncpg.create_pool(
+                    self.url,
+                    min_size=settings.DATABASE_POOL_MIN_SIZE,
+                    max_size=settings.DATABASE_POOL_MAX_SIZE
+                )
+            else:
+                self._conn = await asyncio.to_thread(self._open_sqlite)
+
+    def _open_sqlite(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.sqlite_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.sqlite_path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def close(self) -> None:
+        """Close the pool or connection"""
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await asyncio.to_thread(conn.close)
+
+    def _postgres_sql(self, sql: str) -> str:
+        counter = iter(range(1, sql.count("?") + 1))
+        return _PLACEHOLDER.sub(lambda _: f"${next(counter)}", sql)
+
+    def _sqlite_call(self, method: str, sql: str, args: Any):
+        with self._lock:
+            if method == "executemany":
+                self._conn.execute("BEGIN")
+                try:
+                    self._conn.executemany(sql, args)
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+                return None
+            if method == "script":
+                self._conn.executescript(sql)
+                return None
+            cursor = self._conn.execute(sql, args)
+            if method == "fetchone":
+                # Drain the cursor so UPDATE ... RETURNING statements complete
+                rows = cursor.fetchall()
+                return dict(rows[0]) if rows else None
+            if method == "fetchall":
+                return [dict(row) for row in cursor.fetchall()]
+            return cursor.rowcount
+
+    async def execute(self, sql: str, *args: Any) -> Any:
+        """Execute a statement; returns the affected row count on SQLite"""
+        await self.connect()
+        if self.dialect == "postgres":
+            return await self._pool.execute(self._postgres_sql(sql), *args)
+        return await asyncio.to_thread(self._sqlite_call, "execute", sql, args)
+
+    async def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> None:
+        """Execute a statement for every row in one transaction"""
+        await self.connect()
+        rows = list(rows)
+        if not rows:
+            return
+        if self.dialect == "postgres":
+            await self._pool.executemany(self._postgres_sql(sql), rows)
+        else:
+            await asyncio.to_thread(self._sqlite_call, "executemany", sql, rows)
+
+    async def fetchone(self, sql: str, *args: Any) -> Optional[Dict[str, Any]]:
+        """Fetch a single row as a dict"""
+        await self.connect()
+        if self.dialect == "postgres":
+            row = await self._pool.fetchrow(self._postgres_sql(sql), *args)
+            return dict(row) if row is not None else None
+        return await asyncio.to_thread(self._sqlite_call, "fetchone", sql, args)
+
+    async def fetchall(self, sql: str, *args: Any) -> List[Dict[str, Any]]:
+        """Fetch all rows as dicts"""
+        await self.connect()
+        if self.dialect == "postgres":
+            rows = await self._pool.fetch(self._postgres_sql(sql), *args)
+            return [dict(row) for row in rows]
+        return await asyncio.to_thread(self._sqlite_call, "fetchall", sql, args)
+
+    async def executescript(self, sql: str) -> None:
+        """Run several ';'-separated statements, e.g. schema DDL"""
+        await self.connect()
+        if self.dialect == "postgres":
+            async with self._pool.acquire() as conn:
+                await conn.execute(sql)
+        else:
+            await asyncio.to_thread(self._sqlite_call, "script", sql, None)
+
+
+# Global database instance
+database = Database(settings.DATABASE_URL, settings.SQLITE_PATH)
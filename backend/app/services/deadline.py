@@ -0,0 +1,115 @@
+"""
+Per-request deadlines for AI Research Assistant
+A deadline is set once per request and read by every stage (routing, search
+providers, tools, chain invocation) through a context variable, so each
+stage can size its timeout from the remaining budget
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Mapping, Optional
+
+from app.config import settings
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage is started after the request budget is used up"""
+
+
+class Deadline:
+    """A point in time by which a request must finish"""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.cancelled = False
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (0 once expired or cancelled)"""
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def timeout(self, cap: Optional[float] = None, reserve: float = 0.0) -> float:
+        """
+        Timeout for a stage, sized from the remaining budget
+
+        Args:
+            cap: The stage's own maximum timeout
+            reserve: Budget to keep back for later stages; never reserves more than half of what is left
+
+        Returns:
+            Seconds the stage may take
+        """
+        remaining = self.remaining()
+        available = max(remaining - reserve, remaining / 2)
+        return min(cap, available) if cap is not None else available
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded if there is no budget left for a stage"""
+        if self.expired:
+            raise DeadlineExceeded(f"Request deadline of {self.budget:.1f}s exceeded before {stage}")
+
+    def cancel(self) -> None:
+        """Expire the deadline immediately, e.g. because the client went away"""
+        self.cancelled = True
+
+    @classmethod
+    def from_request(cls, options: Optional[Mapping[str, Any]] = None,
+                     header_value: Optional[str] = None) -> "Deadline":
+        """
+        Build the deadline for a request
+
+        The budget comes from options["timeout"] (seconds) or options["timeout_ms"],
+        then the X-Request-Timeout header (seconds), then REQUEST_DEADLINE_SECONDS.
+        It is capped at MAX_REQUEST_DEADLINE_SECONDS.
+        """
+        options = options or {}
+        seconds = None
+        try:
+            if options.get("timeout") is not None:
+                seconds = float(options["timeout"])
+            elif options.get("timeout_ms") is not None:
+                seconds = float(options["timeout_ms"]) / 1000
+            elif header_value:
+                seconds = float(header_value)
+        except (TypeError, ValueError):
+            seconds = None
+        if seconds is None or seconds <= 0:
+            seconds = settings.REQUEST_DEADLINE_SECONDS
+        return cls(min(seconds, settings.MAX_REQUEST_DEADLINE_SECONDS))
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being processed, if any (also visible in asyncio.to_thread workers)"""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Make a deadline current for everything called inside the block"""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def stage_timeout(cap: float, reserve: float = 0.0) -> float:
+    """Timeout for a stage: its own cap, shortened to the remaining request budget"""
+    deadline = current_deadline()
+    return deadline.timeout(cap, reserve) if deadline else cap
+
+
+def deadline_expired() -> bool:
+    deadline = current_deadline()
+    return deadline is not None and deadline.expired
@@ -8,8 +8,13 @@ import urllib.parse
 import re
 import json
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from app.config import settings
+from app.startup import constructing
+from .cache import cache_key, tiered_cache
+from .freshness import Freshness, freshness_for
+from .http_cassette import search_session
+from .deadline import deadline_expired, stage_timeout
 
 class EnhancedSearchService:
     """Enhanced search service with multiple providers and fallbacks"""
@@ -18,6 +23,28 @@ class EnhancedSearchService:
         self.serper_api_key = os.getenv("SERPER_API_KEY")
         self.timeout = 10
         self.max_results = settings.MAX_SEARCH_RESULTS
+        self.session = search_session()  # Keeps provider connections alive; records or replays a cassette when configured
+    
+    def close(self) -> None:
+        """Close the pooled provider connections"""
+        self.session.close()
+    
+    def _request_timeout(self, cap: float) -> float:
+        """HTTP timeout for one provider call, bounded by the remaining request budget"""
+        return max(stage_timeout(cap), 0.1)
+    
+    def _get_page(self, url: str, params: Optional[Dict[str, str]] = None,
+                  headers: Optional[Dict[str, str]] = None, timeout_cap: float = 15,
+                  ttl: Optional[float] = None) -> Tuple[int, str]:
+        """GET a page through the page cache; only successful responses are cached"""
+        key = cache_key(url, json.dumps(params or {}, sort_keys=True))
+        cached = tiered_cache.get("pages", key)
+        if cached is not None:
+            return 200, cached
+        response = self.session.get(url, params=params, headers=headers, timeout=self._request_timeout(timeout_cap))
+        if response.status_code == 200:
+            tiered_cache.set("pages", key, response.text, ttl)
+        return response.status_code, response.text
     
     def search_with_serper(self, query: str) -> str:
         """
@@ -27,7 +54,7 @@ class EnhancedSearchService:
             return "Serper API key not configured. Please set SERPER_API_KEY environment variable."
         
         try:
-            url = "https://google.serper.dev/search"
+            url = settings.SERPER_URL
             
             payload = json.dumps({
                 "q": query,
@@ -39,7 +66,7 @@ class EnhancedSearchService:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.post(url, headers=headers, data=payload, timeout=self.timeout)
+            response = self.session.post(url, headers=headers, data=payload, timeout=self._request_timeout(self.timeout))
             
             if response.status_code == 200:
                 data = response.json()
@@ -88,11 +115,7 @@ class EnhancedSearchService:
         """
         try:
             # Try multiple DuckDuckGo endpoints
-            endpoints = [
-                "https://duckduckgo.com/html/",
-                "https://html.duckduckgo.com/html/",
-                "https://duckduckgo.com/lite/"
-            ]
+            endpoints = [url.strip() for url in settings.DUCKDUCKGO_URLS.split(",") if url.strip()]
             
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -105,13 +128,17 @@ class EnhancedSearchService:
             }
             
             for endpoint in endpoints:
+                if deadline_expired():
+                    return "DuckDuckGo search unavailable. Request deadline exceeded."
                 try:
                     params = {"q": query}
-                    response = requests.get(endpoint, params=params, headers=headers, timeout=15)
+                    # Result pages go stale as fast as the query's search results
+                    status_code, text = self._get_page(endpoint, params, headers, timeout_cap=15,
+                                                       ttl=freshness_for(query).ttl)
                     
-                    if response.status_code == 200:
-                        return self._parse_duckduckgo_results(response.text, query)
-                    elif response.status_code == 202:
+                    if status_code == 200:
+                        return self._parse_duckduckgo_results(text, query)
+                    elif status_code == 202:
                         # Skip this endpoint and try next
                         continue
                     
@@ -165,12 +192,12 @@ class EnhancedSearchService:
         """
         try:
             # Search for Wikipedia pages
-            search_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{urllib.parse.quote(query)}"
+            search_url = f"{settings.WIKIPEDIA_SUMMARY_URL}{urllib.parse.quote(query)}"
             
-            response = requests.get(search_url, timeout=10)
+            status_code, text = self._get_page(search_url, timeout_cap=10)
             
-            if response.status_code == 200:
-                data = response.json()
+            if status_code == 200:
+                data = json.loads(text)
                 title = data.get('title', '').strip()
                 extract = data.get('extract', '').strip()
                 
@@ -179,7 +206,7 @@ class EnhancedSearchService:
                 else:
                     return f"No Wikipedia article found for '{query}'."
             else:
-                return f"Wikipedia API error: HTTP {response.status_code}"
+                return f"Wikipedia API error: HTTP {status_code}"
                 
         except Exception as e:
             return f"Wikipedia fallback error: {str(e)}"
@@ -187,7 +214,23 @@ class EnhancedSearchService:
     def perform_enhanced_search(self, query: str) -> Dict[str, Any]:
         """
         Perform search with multiple fallbacks and comprehensive error handling
+        
+        Successful results are cached per query in the "search" cache namespace,
+        for as long as the query's freshness class allows. Stale results within
+        the grace window are returned at once and refreshed in the background.
         """
+        key = cache_key(" ".join(query.lower().split()))
+        freshness = freshness_for(query)
+        cached = tiered_cache.get_fresh("search", key)
+        if cached is not None:
+            results, stale = cached
+            if stale:
+                tiered_cache.refresh_in_thread("search", key, lambda: self._search_providers(query, key, freshness))
+            return {**results, "cached": True, "stale": stale}
+        return self._search_providers(query, key, freshness)
+    
+    def _search_providers(self, query: str, key: str, freshness: Freshness) -> Dict[str, Any]:
+        """Query the providers in priority order and cache the first successful result"""
         search_results = {
             "query": query,
             "results": "",
@@ -205,6 +248,9 @@ class EnhancedSearchService:
         ]
         
         for provider_name, search_func in providers:
+            if deadline_expired():
+                print(f"Search deadline exceeded before {provider_name}")
+                break
             search_results["providers_attempted"].append(provider_name)
             
             try:
@@ -231,11 +277,14 @@ class EnhancedSearchService:
         if not search_results["success"]:
             search_results["error"] = f"All search providers failed. Attempted: {', '.join(search_results['providers_attempted'])}"
             search_results["results"] = f"I am unable to provide you with the latest information because all search services are currently unavailable. The error indicates that search request processing could not be completed.\n\nTo get the latest information, I recommend checking reputable sources directly or trying again later."
+        else:
+            tiered_cache.set_fresh("search", key, search_results, freshness.ttl, freshness.grace)
         
         return search_results
 
 # Global service instance
-enhanced_search_service = EnhancedSearchService()
+with constructing("enhanced_search_service"):
+    enhanced_search_service = EnhancedSearchService()
 
 def perform_web_search(query: str) -> str:
     """
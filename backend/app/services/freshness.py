@@ -0,0 +1,55 @@
+"""
+Query freshness classes for AI Research Assistant
+Time-sensitive queries ("today", "latest", "news") are cached briefly and
+encyclopedic ones for long; each class also has a grace window during which
+a stale cached answer is still served while it is refreshed in the background
+"""
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from app.config import settings
+from .cache import parse_namespace_values
+
+# Checked in order, so a time-sensitive term wins over a reference phrase in the same query
+# ("what is the price of gold" is realtime); the first class whose pattern matches wins
+_CLASS_PATTERNS = (
+    ("realtime", re.compile(
+        r"\b(today|tonight|now|right now|this morning|live|breaking|prices?|priced|cost of|exchange rates?|"
+        r"quotes?|scores?|weather|forecast|temperature)\b"
+    )),
+    ("news", re.compile(
+        r"\b(latest|news|current|currently|recent|recently|newest|update|updates|this week|this month|this year|"
+        r"yesterday|announced|rates?|standings|rankings?)\b"
+    )),
+    ("reference", re.compile(
+        r"\b(who was|define|definition|meaning of|history of|explain|how does|when was)\b"
+    )),
+)
+
+FRESHNESS_CLASSES = ("realtime", "news", "general", "reference")
+
+
+@dataclass(frozen=True)
+class Freshness:
+    name: str
+    ttl: Optional[float]  # None keeps the namespace TTL
+    grace: float
+
+
+def classify_query(query: str) -> str:
+    """Freshness class of a query, from the same vocabulary the router uses"""
+    query_lower = query.lower()
+    for name, pattern in _CLASS_PATTERNS:
+        if pattern.search(query_lower):
+            return name
+    return "general"
+
+
+_TTLS = parse_namespace_values(settings.CACHE_FRESHNESS_TTLS)
+_GRACE = parse_namespace_values(settings.CACHE_STALE_GRACE)
+
+
+def freshness_for(query: str) -> Freshness:
+    name = classify_query(query)
+    return Freshness(name, _TTLS.get(name), _GRACE.get(name, 0.0))
@@ -0,0 +1,199 @@
+"""
+Query/answer history for AI Research Assistant
+Records every answered query with its routing decision, providers, timings
+and answer. Writes go through a write-behind queue and are inserted in
+batches, so the request path never waits on the database
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config import settings
+from .database import Database, database
+from .metrics import metrics
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_history (
+    id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    normalized_query TEXT NOT NULL,
+    chain_used TEXT,
+    route TEXT,
+    tools_used TEXT,
+    providers TEXT,
+    timings TEXT,
+    answer TEXT,
+    context TEXT,
+    partial INTEGER NOT NULL DEFAULT 0,
+    created_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_query_history_created ON query_history (created_at);
+CREATE INDEX IF NOT EXISTS idx_query_history_normalized ON query_history (normalized_query);
+"""
+
+_INSERT = (
+    "INSERT INTO query_history (id, query, normalized_query, chain_used, route, tools_used, providers, "
+    "timings, answer, context, partial, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+JSON_COLUMNS = ("route", "tools_used", "providers", "timings")
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form used to group repeated queries"""
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+
+class HistoryStore:
+    """Write-behind store for query history"""
+
+    def __init__(self, db: Database, batch_size: int, flush_interval: float, max_queue: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: List[tuple] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._schema_ready = False
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None
+
+    @property
+    def pending(self) -> int:
+        return len(self._queue)
+
+    async def init_schema(self) -> None:
+        if not self._schema_ready:
+            await self.db.executescript(HISTORY_SCHEMA)
+            self._schema_ready = True
+
+    async def start(self) -> None:
+        """Start the background flusher"""
+        if self._flusher is not None or not settings.HISTORY_ENABLED:
+            return
+        await self.init_schema()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Stop the flusher after writing everything still queued"""
+        if self._flusher is None:
+            return
+        flusher, self._flusher = self._flusher, None
+        flusher.cancel()
+        await asyncio.gather(flusher, return_exceptions=True)
+        await self.flush()
+
+    def record(self, query: str, answer: str, chain_used: Optional[str] = None,
+               route: Optional[Dict[str, Any]] = None, tools_used: Optional[List[str]] = None,
+               providers: Optional[Dict[str, Any]] = None, timings: Optional[Dict[str, float]] = None,
+               context: Optional[str] = None, partial: bool = False) -> None:
+        """
+        Queue one answered query for writing; never blocks or touches the database
+
+        When the queue is full the entry is dropped and counted in
+        history_dropped_total rather than slowing the request down.
+        """
+        if not self.running:
+            return
+        if len(self._queue) >= self.max_queue:
+            metrics.increment("history_dropped_total")
+            return
+        self._queue.append((
+            uuid.uuid4().hex,
+            query,
+            normalize_query(query),
+            chain_used,
+            json.dumps(route or {}),
+            json.dumps(tools_used or []),
+            json.dumps(providers or {}),
+            json.dumps(timings or {}),
+            answer,
+            context,
+            1 if partial else 0,
+            time.time(),
+        ))
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Write everything queued so far; returns the number of rows written"""
+        if self._flush_lock is None:
+            return 0
+        written = 0
+        async with self._flush_lock:
+            while self._queue:
+                batch, self._queue = self._queue[:self.batch_size], self._queue[self.batch_size:]
+                start = time.perf_counter()
+                try:
+                    await self.db.executemany(_INSERT, batch)
+                except Exception as e:
+                    # Keep the rows for the next attempt unless that would exceed the queue bound
+                    print(f"History flush failed: {e}")
+                    metrics.increment("history_flush_errors_total")
+                    self._queue = (batch + self._queue)[:self.max_queue]
+                    break
+                written += len(batch)
+                metrics.increment("history_rows_written_total", len(batch))
+                metrics.observe("history_flush_seconds", time.perf_counter() - start)
+        return written
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent history rows, newest first"""
+        await self.init_schema()
+        rows = await self.db.fetchall(
+            "SELECT * FROM query_history ORDER BY created_at DESC LIMIT ?", limit
+        )
+        return [self._decode(row) for row in rows]
+
+    async def top_queries(self, limit: int = 50, since: Optional[float] = None,
+                          exclude_chains: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """
+        Most frequently asked queries since a time, most frequent first
+
+        Returns:
+            list: normalized_query, query (one original spelling), hits and last_seen per query
+        """
+        await self.init_schema()
+        exclude_chains = list(exclude_chains)
+        exclusion = ""
+        if exclude_chains:
+            exclusion = f" AND COALESCE(chain_used, '') NOT IN ({', '.join('?' * len(exclude_chains))})"
+        return await self.db.fetchall(
+            "SELECT normalized_query, MAX(query) AS query, COUNT(*) AS hits, MAX(created_at) AS last_seen "
+            f"FROM query_history WHERE created_at >= ? AND partial = 0{exclusion} "
+            "GROUP BY normalized_query ORDER BY hits DESC, last_seen DESC LIMIT ?",
+            since or 0.0, *exclude_chains, limit
+        )
+
+    def _decode(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        entry = dict(row)
+        for column in JSON_COLUMNS:
+            entry[column] = json.loads(entry[column]) if entry.get(column) else None
+        entry["partial"] = bool(entry.get("partial"))
+        return entry
+
+
+# Global history store
+history_store = HistoryStore(
+    database,
+    settings.HISTORY_BATCH_SIZE,
+    settings.HISTORY_FLUSH_INTERVAL,
+    settings.HISTORY_MAX_QUEUE
+)
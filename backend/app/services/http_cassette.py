@@ -0,0 +1,197 @@
+"""
+Record/replay HTTP cassettes for the search providers
+A requests transport adapter that either records every response the search
+service receives (status, headers, body and elapsed time) into a gzip-compressed
+JSON-lines cassette, or replays them from one, optionally sleeping for the
+recorded time scaled by a factor. Replayed searches then see the same pages on
+every run, which keeps parser benchmarks and latency tests stable.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+from collections import deque
+from datetime import timedelta
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from app.config import settings
+
+CASSETTE_VERSION = 1
+MODES = ("record", "replay")
+
+# Response headers kept in a cassette; the rest (cookies, dates, tracing ids) change on every call
+_KEPT_HEADERS = ("content-type", "content-language", "retry-after")
+_PROVIDER_SETTINGS = ("SERPER_URL", "DUCKDUCKGO_URLS", "WIKIPEDIA_SUMMARY_URL")
+
+
+def interaction_key(method: str, url: str, body: Any = None) -> str:
+    """Match requests by method, URL with sorted query parameters and a digest of the body"""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha1(body).hexdigest()[:16] if body else ""
+    return f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}?{query} {digest}"
+
+
+def _check_version(header: Dict[str, Any], path: str) -> None:
+    if header["version"] != CASSETTE_VERSION:
+        raise ValueError(f"Unsupported cassette version {header['version']} in {path}")
+
+
+def _read_timeout(timeout: Any) -> Optional[float]:
+    if isinstance(timeout, tuple):
+        return timeout[1]
+    return timeout
+
+
+class Cassette:
+    """Interactions of one cassette file, grouped by request key"""
+
+    def __init__(self, path: str, settings: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.settings = settings or {}  # Provider settings at recording time, kept in the file header
+        self.interactions: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.replayed: Dict[str, int] = {}
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> "Cassette":
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if "version" in entry:
+                    _check_version(entry, self.path)
+                    self.settings = entry.get("settings", {})
+                    continue
+                self.interactions.setdefault(entry["key"], deque()).append(entry)
+        return self
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.interactions.values())
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Add a recorded interaction; each one is written at once, so an interrupted recording keeps what it has"""
+        with self._lock:
+            new_file = not self.interactions and not os.path.exists(self.path)
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                if new_file:
+                    header = {"version": CASSETTE_VERSION, "recorded_at": time.time(), "settings": self.settings}
+                    f.write(json.dumps(header) + "\n")
+                f.write(json.dumps(entry) + "\n")
+            self.interactions.setdefault(entry["key"], deque()).append(entry)
+
+    def next(self, key: str) -> Optional[Dict[str, Any]]:
+        """The next recorded response for key; repeated requests cycle through the recordings"""
+        with self._lock:
+            entries = self.interactions.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            entry = entries[0]
+            entries.rotate(-1)
+            self.replayed[key] = self.replayed.get(key, 0) + 1
+            return entry
+
+
+class CassetteAdapter(HTTPAdapter):
+    """
+    Transport adapter recording to or replaying from a cassette
+
+    speed scales replayed timings: 1.0 replays at the recorded pace, 0 at once.
+    A request without a recording fails with ConnectionError, as if the
+    provider were down, so the search fallbacks behave as they would live.
+    """
+
+    def __init__(self, cassette: Cassette, mode: str = "replay", speed: float = 1.0, **kwargs):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}")
+        super().__init__(**kwargs)
+        self.cassette = cassette
+        self.mode = mode
+        self.speed = speed
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, timeout=None,
+             verify=True, cert=None, proxies=None) -> requests.Response:
+        key = interaction_key(request.method, request.url, request.body)
+        if self.mode == "record":
+            start = time.perf_counter()
+            response = super().send(request, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+            self.cassette.append(self._record(key, request, response, time.perf_counter() - start))
+            return response
+
+        entry = self.cassette.next(key)
+        if entry is None:
+            raise requests.exceptions.ConnectionError(f"No recorded response for {request.method} {request.url}",
+                                                      request=request)
+        delay = entry["elapsed"] * self.speed
+        read_timeout = _read_timeout(timeout)
+        if read_timeout is not None and delay > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.exceptions.ReadTimeout(f"Replayed response took {delay:.2f}s", request=request)
+        if delay > 0:
+            time.sleep(delay)
+        return self._response(entry, request, delay)
+
+    @staticmethod
+    def _record(key: str, request: requests.PreparedRequest, response: requests.Response,
+                elapsed: float) -> Dict[str, Any]:
+        return {
+            "key": key,
+            "method": request.method,
+            "url": request.url,
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers},
+            "encoding": response.encoding,
+            "body": response.content.decode(response.encoding or "utf-8", errors="replace"),
+            "elapsed": round(elapsed, 4),
+        }
+
+    @staticmethod
+    def _response(entry: Dict[str, Any], request: requests.PreparedRequest, delay: float) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = entry["encoding"] or "utf-8"
+        response._content = entry["body"].encode(response.encoding, errors="replace")
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        response.elapsed = timedelta(seconds=delay)
+        return response
+
+
+def cassette_session(path: str, mode: str = "replay", speed: float = 1.0,
+                     recorded_settings: Optional[Dict[str, Any]] = None) -> Tuple[requests.Session, Cassette]:
+    """A session whose HTTP and HTTPS traffic goes through a cassette"""
+    cassette = Cassette(path, recorded_settings)
+    if mode == "replay":
+        cassette.load()
+    adapter = CassetteAdapter(cassette, mode, speed)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session, cassette
+
+
+def search_session() -> requests.Session:
+    """HTTP session for the search providers; through SEARCH_CASSETTE when it is set"""
+    if settings.SEARCH_CASSETTE:
+        # Replays only match when the provider URLs are the recorded ones
+        recorded = {name: getattr(settings, name) for name in _PROVIDER_SETTINGS}
+        session, cassette = cassette_session(settings.SEARCH_CASSETTE, settings.SEARCH_CASSETTE_MODE,
+                                             settings.SEARCH_CASSETTE_SPEED, recorded)
+        if cassette.settings and cassette.settings != recorded:
+            print(f"Warning: search provider settings differ from those cassette {settings.SEARCH_CASSETTE} "
+                  f"was recorded with: {cassette.settings}")
+        print(f"Search providers {settings.SEARCH_CASSETTE_MODE}ing cassette {settings.SEARCH_CASSETTE} "
+              f"({len(cassette)} interactions)")
+        return session
+    return requests.Session()
@@ -0,0 +1,295 @@
+"""
+Persistent job queue for long research tasks
+Jobs are stored in the database so they survive restarts and can be
+processed by the API process or by separate worker processes
+"""
+import asyncio
+import json
+import math
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from .database import Database, database
+from .deadline import Deadline, deadline_scope
+
+JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    query TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    created_at DOUBLE PRECISION NOT NULL,
+    started_at DOUBLE PRECISION,
+    heartbeat_at DOUBLE PRECISION,
+    finished_at DOUBLE PRECISION
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+JOB_KINDS = ("query", "parallel")
+
+JobHandler = Callable[[str, dict], Awaitable[Dict[str, Any]]]
+
+
+def job_budget(options: Optional[Dict[str, Any]]) -> float:
+    """
+    Seconds a job may run: options["timeout"], or JOB_DEADLINE_SECONDS
+
+    Raises:
+        ValueError: The timeout is not a positive number
+    """
+    timeout = (options or {}).get("timeout")
+    if timeout is None:
+        return settings.JOB_DEADLINE_SECONDS
+    try:
+        seconds = float(timeout)
+    except (TypeError, ValueError):
+        seconds = math.nan
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise ValueError(f"options.timeout must be a positive number of seconds, not {timeout!r}")
+    return seconds
+
+
+class JobQueue:
+    """Database-backed FIFO queue of research jobs"""
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._schema_ready = False
+        # Wakes local workers as soon as a job is submitted in this process
+        self.submitted = asyncio.Event()
+
+    async def init_schema(self) -> None:
+        if not self._schema_ready:
+            await self.db.executescript(JOB_SCHEMA)
+            self._schema_ready = True
+
+    async def submit(self, kind: str, query: str, options: Optional[dict] = None) -> Dict[str, Any]:
+        """
+        Enqueue a job
+
+        Args:
+            kind: "query" (answer_query) or "parallel" (run_parallel_chains)
+            query: User's research question
+            options: Optional configuration parameters
+
+        Returns:
+            dict: The stored job
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}'. Expected one of: {', '.join(JOB_KINDS)}")
+        job_budget(options)
+        await self.init_schema()
+        job_id = uuid.uuid4().hex
+        await self.db.execute(
+            "INSERT INTO jobs (id, kind, query, options, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+            job_id, kind, query, json.dumps(options or {}), time.time()
+        )
+        self.submitted.set()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a job with its decoded result"""
+        await self.init_schema()
+        row = await self.db.fetchone("SELECT * FROM jobs WHERE id = ?", job_id)
+        return self._decode(row) if row else None
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job, or None if the queue is empty"""
+        await self.init_schema()
+        lock_clause = " FOR UPDATE SKIP LOCKED" if self.db.dialect == "postgres" else ""
+        now = time.time()
+        row = await self.db.fetchone(
+            "UPDATE jobs SET status = 'running', worker_id = ?, started_at = ?, heartbeat_at = ?, "
+            "attempts = attempts + 1 WHERE id = (SELECT id FROM jobs WHERE status = 'queued' "
+            f"ORDER BY created_at LIMIT 1{lock_clause}) RETURNING *",
+            worker_id, now, now
+        )
+        return self._decode(row) if row else None
+
+    async def heartbeat(self, job_id: str) -> None:
+        await self.db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                              time.time(), job_id)
+
+    async def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        await self.db.execute(
+            "UPDATE jobs SET status = 'succeeded', result = ?, finished_at = ? WHERE id = ?",
+            json.dumps(result), time.time(), job_id
+        )
+
+    async def fail(self, job_id: str, error: str) -> None:
+        await self.db.execute(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+            error, time.time(), job_id
+        )
+
+    async def requeue(self, job_id: str) -> None:
+        """Put a running job back on the queue, e.g. when its worker shuts down"""
+        await self.db.execute(
+            "UPDATE jobs SET status = 'queued', worker_id = NULL WHERE id = ? AND status = 'running'", job_id
+        )
+
+    async def recover_stale(self) -> int:
+        """
+        Requeue running jobs whose worker stopped heartbeating (crash, kill -9).
+        Jobs that have used up their attempts are marked failed instead.
+        """
+        await self.init_schema()
+        cutoff = time.time() - settings.JOB_LEASE_SECONDS
+        await self.db.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Worker lost too many times', finished_at = ? "
+            "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+            time.time(), cutoff, settings.JOB_MAX_ATTEMPTS
+        )
+        requeued = await self.db.fetchall(
+            "UPDATE jobs SET status = 'queued', worker_id = NULL "
+            "WHERE status = 'running' AND heartbeat_at < ? RETURNING id",
+            cutoff
+        )
+        return len(requeued)
+
+    def _decode(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        job = dict(row)
+        job["options"] = json.loads(job["options"]) if job.get("options") else {}
+        job["result"] = json.loads(job["result"]) if job.get("result") else None
+        return job
+
+
+class JobWorkerPool:
+    """Background workers that execute queued jobs"""
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler], concurrency: int,
+                 poll_interval: Optional[float] = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval or settings.JOB_POLL_INTERVAL
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stopping = False
+
+    @property
+    def active_jobs(self) -> int:
+        return len(self._running)
+
+    async def start(self) -> None:
+        """Start the workers and the stale-job reaper"""
+        if self._tasks or self.concurrency <= 0:
+            return
+        self._stopping = False
+        await self.queue.init_schema()
+        await self.queue.recover_stale()
+        self._tasks = [asyncio.create_task(self._worker(f"{self.worker_prefix}:{n}"))
+                       for n in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs that are still running go back on the queue"""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, worker_id: str) -> None:
+        while not self._stopping:
+            try:
+                job = await self.queue.claim(worker_id)
+            except Exception as e:
+                print(f"Job worker {worker_id} could not claim a job: {e}")
+                job = None
+            if job is None:
+                self.queue.submitted.clear()
+                try:
+                    await asyncio.wait_for(self.queue.submitted.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # One broken job must not take the worker down with it
+                print(f"Job worker {worker_id} failed on job {job['id']}: {e}")
+                try:
+                    await self.queue.fail(job["id"], f"Worker error: {e}")
+                except Exception as fail_error:
+                    print(f"Job {job['id']} could not be marked failed: {fail_error}")
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await self.queue.fail(job["id"], f"No handler for job kind '{job['kind']}'")
+            return
+
+        # Jobs get their own, longer budget; the task copies the deadline into its context
+        try:
+            deadline = Deadline(job_budget(job["options"]))
+        except ValueError as e:
+            await self.queue.fail(job["id"], str(e))
+            return
+        with deadline_scope(deadline):
+            task = asyncio.create_task(handler(job["query"], job["options"]))
+        self._running[job["id"]] = task
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=settings.JOB_LEASE_SECONDS / 3)
+                if done:
+                    break
+                try:
+                    await self.queue.heartbeat(job["id"])
+                except Exception as e:
+                    # A missed heartbeat only shortens the lease; the next one may get through
+                    print(f"Job {job['id']} heartbeat failed: {e}")
+            result = task.result()
+            if result.get("error"):
+                await self.queue.fail(job["id"], result["error"])
+            else:
+                await self.queue.complete(job["id"], result)
+        except asyncio.CancelledError:
+            task.cancel()
+            await asyncio.shield(self.queue.requeue(job["id"]))
+            raise
+        except Exception as e:
+            # Stop the handler too, so it does not keep spending on a job recorded as failed
+            task.cancel()
+            await self.queue.fail(job["id"], str(e))
+        finally:
+            self._running.pop(job["id"], None)
+
+    async def _reaper(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 2)
+            try:
+                await self.queue.recover_stale()
+            except Exception as e:
+                print(f"Job reaper failed: {e}")
+
+
+def default_handlers() -> Dict[str, JobHandler]:
+    """Job kind to service coroutine"""
+    from .langchain_service import langchain_service
+
+    async def run_parallel(query: str, options: dict) -> Dict[str, Any]:
+        return await langchain_service.run_parallel_chains(query)
+
+    return {
+        "query": langchain_service.answer_query,
+        "parallel": run_parallel,
+    }
+
+
+# Global queue and in-process worker pool
+job_queue = JobQueue(database)
+job_workers = JobWorkerPool(job_queue, default_handlers(), settings.JOB_WORKERS)
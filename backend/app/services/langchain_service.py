@@ -2,15 +2,30 @@
 LangChain-based AI service for AI Research Assistant.
 Uses LangChain chains with Google Gemini models for enhanced functionality.
 """
-import os
 import asyncio
-import json
-import re
-from typing import Dict, List, Any, Optional
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from langchain_core.runnables import Runnable
 from app.config import settings
+from app.startup import constructing
 from .chains import research_chains, tool_chains
 from .llm_config import llm_config
-import requests
+from .tool_graph import ToolGraph, ToolResult
+from .deadline import DeadlineExceeded, current_deadline, stage_timeout
+from .history_store import history_store, normalize_query
+from .cache import revalidating, tiered_cache
+from .answer_index import REUSED_CHAIN, UNINDEXED_CHAINS, AnswerMatch, IndexedAnswer, answer_index
+from .semantic_cache import semantic_cache
+from .freshness import freshness_for
+from .metrics import metrics
+from .profiling import profile_thread
+from . import math_evaluator, math_batch
+from .math_evaluator import MathEvaluationError
+
+# Set while cache warming or a background refresh answers a query: the answer is cached, but nobody
+# asked it, so it stays out of the history (and the popularity the warmer reads from it) and the index
+_background_answer: ContextVar[bool] = ContextVar("background_answer", default=False)
 
 class LangChainService:
     """Main service class using LangChain chains"""
@@ -25,35 +40,187 @@ class LangChainService:
         Perform web search using enhanced search service with fallbacks.
         This method uses the new enhanced search service for better reliability.
         """
+        return self._search(query)["results"]
+    
+    def _search(self, query: str) -> Dict[str, Any]:
+        """Web search returning the result text together with the providers tried"""
         try:
             from .enhanced_search_service import enhanced_search_service
             
             # Use the enhanced search service
             search_result = enhanced_search_service.perform_enhanced_search(query)
             
-            if search_result["success"]:
-                return search_result["results"]
-            else:
+            if not search_result["success"]:
                 # If all providers failed, return a helpful error message
-                return f"I am unable to provide you with the latest information because search services are currently unavailable. Error: {search_result.get('error', 'Unknown error')}. Please try again later."
+                search_result["results"] = f"I am unable to provide you with the latest information because search services are currently unavailable. Error: {search_result.get('error', 'Unknown error')}. Please try again later."
+            return search_result
                 
         except Exception as e:
-            return f"Search service temporarily unavailable: {str(e)}. Please try again later."
+            return {
+                "success": False,
+                "results": f"Search service temporarily unavailable: {str(e)}. Please try again later.",
+                "provider_used": "",
+                "providers_attempted": []
+            }
     
     def calculate_math(self, expression: str) -> str:
-        """Simple math calculation using LangChain math chain"""
+        """
+        Calculate a math expression.
+        Plain arithmetic is evaluated locally; anything else goes to the LangChain math chain.
+        """
+        try:
+            return self._evaluate_locally(expression)
+        except MathEvaluationError:
+            pass
         try:
-            # Use the math chain for calculation
             math_chain = self.research_chains.get_math_chain()
-            result = asyncio.run(math_chain.ainvoke({"math_expression": expression}))
-            return result
+            return math_chain.invoke({"math_expression": expression})
         except Exception as e:
-            # Fallback to simple eval if chain fails
-            try:
-                eval_result = eval(expression)
-                return f"The result of {expression} is {eval_result}"
-            except:
-                return f"Error calculating {expression}: {str(e)}"
+            return f"Error calculating {expression}: {str(e)}"
+    
+    async def acalculate_math(self, expression: str) -> str:
+        """Async variant of calculate_math; the math chain is awaited on the running event loop"""
+        try:
+            return self._evaluate_locally(expression)
+        except MathEvaluationError:
+            pass
+        try:
+            math_chain = self.research_chains.get_math_chain()
+            return await math_chain.ainvoke({"math_expression": expression})
+        except Exception as e:
+            return f"Error calculating {expression}: {str(e)}"
+    
+    async def calculate_math_batch(self, expressions: List[str]) -> List[Dict[str, Any]]:
+        """
+        Batch calculator tool: evaluate many arithmetic expressions locally
+        
+        Args:
+            expressions: Arithmetic expressions, e.g. rows of a spreadsheet
+            
+        Returns:
+            list: Per-expression results in input order; failed items carry an error instead of a result
+        """
+        # Large batches are CPU-bound; keep them off the event loop
+        return await asyncio.to_thread(profile_thread(math_batch.evaluate_batch), expressions)
+    
+    def _evaluate_locally(self, expression: str) -> str:
+        """Evaluate plain arithmetic without an LLM call; raises MathEvaluationError otherwise"""
+        try:
+            result = math_evaluator.evaluate(expression)
+        except ArithmeticError as e:
+            return f"Error calculating {expression}: {str(e)}"
+        return f"The result of {expression} is {math_evaluator.format_number(result)}"
+    
+    async def answer_query(self, query: str, options: dict = None) -> Dict[str, Any]:
+        """
+        Answer a query, serving repeats and paraphrases of recent queries from the answer cache
+        
+        Cached answers stay fresh as long as the query's freshness class
+        allows; stale ones within the grace window are served at once and
+        refreshed in the background. Concurrent misses for the same question
+        share one computation.
+        
+        Args:
+            query: User's research question
+            options: Optional configuration parameters; use_cache=False bypasses the cache
+            
+        Returns:
+            dict: Response from process_query_with_chains, or a cached one marked cached=True
+        """
+        if options is None:
+            options = {}
+        
+        start = time.perf_counter()
+        cached = await self._cached_answer(query, options)
+        if cached:
+            result, answered_at = cached
+            self._record_history(result, {}, "", self._cache_trace(answered_at, start))
+            return result
+        
+        if options.get("use_cache") is False:
+            return await self.process_query_with_chains(query, options)
+        return await tiered_cache.single_flight("answers", normalize_query(query),
+                                                lambda: self._fresh_answer(query, options))
+    
+    async def _fresh_answer(self, query: str, options: dict) -> Dict[str, Any]:
+        """Answer a query through the chains and cache the answer"""
+        result = await self.process_query_with_chains(query, options)
+        await self._cache_answer(query, result, options)
+        return result
+    
+    async def _background_fresh_answer(self, query: str, options: dict) -> Dict[str, Any]:
+        """_fresh_answer for the warmer and refreshes, without a history row"""
+        _background_answer.set(True)  # Only within this flight's task
+        return await self._fresh_answer(query, options)
+    
+    async def warm_answer(self, query: str) -> str:
+        """
+        Make sure a fresh answer to a query is cached; used by the cache warmer
+        
+        Returns:
+            str: "fresh" when one was cached already, "warmed" or "failed"
+        """
+        key = normalize_query(query)
+        found = await tiered_cache.aget_fresh("answers", key)
+        if found is not None and not found[1]:
+            return "fresh"
+        with revalidating():
+            result = await tiered_cache.single_flight(
+                "answers", key, lambda: self._background_fresh_answer(query, {"use_index": False}))
+        return "failed" if result.get("error") or result.get("partial") else "warmed"
+    
+    def _revalidate(self, key: str, query: str, options: dict) -> None:
+        """Refresh a stale cached answer in the background; the answer index is skipped, since it is as old"""
+        tiered_cache.refresh("answers", key,
+                             lambda: self._background_fresh_answer(query, {**options, "use_index": False}))
+    
+    async def _cached_answer(self, query: str, options: dict) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Earlier answer to the same query, or to a paraphrase of it, from the "answers" cache namespace
+        
+        Returns:
+            tuple: The response and when it was originally answered, or None
+        """
+        if options.get("use_cache") is False:
+            return None
+        key = normalize_query(query)
+        found = await tiered_cache.aget_fresh("answers", key)
+        if found is not None:
+            cached, stale = found
+            if stale:
+                self._revalidate(key, query, options)
+            response = {**cached["response"], "query": query, "cached": True,
+                        "cache": {"type": "exact", "age": round(time.time() - cached["answered_at"], 1), "stale": stale}}
+            return response, cached["answered_at"]
+        hit = await asyncio.to_thread(semantic_cache.lookup, query) if settings.SEMANTIC_CACHE_ENABLED else None
+        if hit:
+            found = await tiered_cache.aget_fresh("answers", hit.entry.key)
+            if found is not None:
+                cached, stale = found
+                if stale:
+                    self._revalidate(hit.entry.key, hit.entry.query, options)
+                response = hit.response(query, cached)
+                response["cache"]["stale"] = stale
+                return response, cached["answered_at"]
+        return None
+    
+    async def _cache_answer(self, query: str, result: Dict[str, Any], options: dict) -> None:
+        # Partial and failed answers are not kept; local calculations and reused answers are cheap to produce again
+        if options.get("use_cache") is False or result.get("partial") or result.get("error") \
+                or result.get("cached") or result.get("chain_used") in UNINDEXED_CHAINS:
+            return
+        key = normalize_query(query)
+        freshness = freshness_for(query)
+        await tiered_cache.aset_fresh("answers", key, {"response": result, "answered_at": time.time()},
+                                      freshness.ttl, freshness.grace)
+        if settings.SEMANTIC_CACHE_ENABLED:
+            await asyncio.to_thread(semantic_cache.store, query, key)
+    
+    def _cache_trace(self, answered_at: float, start: float) -> Dict[str, Any]:
+        return {
+            "timings": {"total": time.perf_counter() - start},
+            "providers": {"used": "Answer Cache", "seeded_from": answered_at}
+        }
     
     async def process_query_with_chains(self, query: str, options: dict = None) -> Dict[str, Any]:
         """
@@ -69,72 +236,44 @@ class LangChainService:
         if options is None:
             options = {}
         
+        start = time.perf_counter()
         try:
+            # Pure arithmetic is answered locally, without tools or an LLM call
+            local_math = math_evaluator.evaluate_query(query)
+            if local_math:
+                result = self._local_math_response(query, local_math)
+                self._record_history(result, {}, "", {"timings": {"total": time.perf_counter() - start}})
+                return result
+            
+            # Near-repeat questions reuse, or build on, a fresh prior answer
+            match, reusable = self._lookup_answer(query, options)
+            if reusable:
+                result = self._reused_response(query, match)
+                self._record_history(result, {}, "", {"timings": {"total": time.perf_counter() - start}})
+                return result
+            
             # Determine query type and select appropriate chain
-            query_lower = query.lower()
-            tools_used = []
-            context = ""
-            
-            # Check if search is needed
-            needs_search = any(keyword in query_lower for keyword in [
-                'search', 'find', 'latest', 'current', 'news', 'what is', 'who is', 
-                'when was', 'recent', 'today', 'update'
-            ])
-            
-            # Check if math calculation is needed
-            needs_math = any(char in query for char in ['+', '-', '*', '/', '=', 'calculate', 'math']) or \
-                        any(keyword in query_lower for keyword in ['calculate', 'solve', 'compute'])
-            
-            # Check if complex reasoning is needed
-            needs_reasoning = any(keyword in query_lower for keyword in [
-                'analyze', 'compare', 'explain', 'why', 'how', 'step by step', 'break down'
-            ])
-            
-            # Use tools if needed
-            if needs_search:
-                search_result = self.perform_web_search(query)
-                context += f"Search Results:\n{search_result}\n\n"
-                tools_used.append("Search")
-            
-            if needs_math:
-                # Extract math expression
-                math_match = re.search(r'([\d+\-*/().\s]+)', query)
-                if math_match:
-                    math_result = self.calculate_math(math_match.group(1))
-                    context += f"Math Calculation:\n{math_result}\n\n"
-                    tools_used.append("Calculator")
+            route = self.route_query(query)
+            trace = {"timings": {}, "providers": {}}
+            seed = match.entry if match and route["needs_search"] else None
+            
+            # Use tools if needed - independent tools run concurrently
+            context, tools_used = await self._run_tools(query, route, trace, seed)
             
             # Select and execute appropriate chain
-            if context and needs_search:
-                # Use research chain with search context
-                chain = self.research_chains.get_research_chain()
-                response = await chain.ainvoke({
-                    "search_context": context.strip(),
-                    "question": query
-                })
-            elif needs_reasoning:
-                # Use reasoning chain for complex queries
-                chain = self.research_chains.get_reasoning_chain()
-                response = await chain.ainvoke({"question": query})
-            elif needs_math and not needs_search:
-                # Use math chain for pure math queries
-                chain = self.research_chains.get_math_chain()
-                math_expr = re.search(r'([\d+\-*/().\s]+)', query)
-                response = await chain.ainvoke({
-                    "math_expression": math_expr.group(1) if math_expr else query
-                })
-            else:
-                # Use simple Q&A chain
-                chain = self.research_chains.get_qa_chain()
-                response = await chain.ainvoke({"question": query})
+            chain_key, chain_input = self._select_chain(query, route, context)
+            chain_start = time.perf_counter()
+            try:
+                response = await self._invoke_chain(chain_key, chain_input)
+                result = self._chain_response(query, response, tools_used, route)
+            except (asyncio.TimeoutError, DeadlineExceeded):
+                # Out of time: return what the tools found instead of nothing
+                result = self._partial_response(query, context, tools_used, route)
             
-            return {
-                "summary": response,
-                "query": query,
-                "tools_available": ["Search", "Calculator", "Reasoning"],
-                "tools_used": tools_used,
-                "chain_used": self._get_chain_name(needs_search, needs_math, needs_reasoning)
-            }
+            trace["timings"]["chain"] = time.perf_counter() - chain_start
+            trace["timings"]["total"] = time.perf_counter() - start
+            self._record_history(result, route, context, trace)
+            return result
             
         except Exception as e:
             return {
@@ -145,6 +284,350 @@ class LangChainService:
                 "tools_used": []
             }
     
+    def route_query(self, query: str) -> Dict[str, bool]:
+        """
+        Decide which tools and chain a query needs
+        
+        Args:
+            query: User's research question
+            
+        Returns:
+            dict: needs_search, needs_math and needs_reasoning flags
+        """
+        query_lower = query.lower()
+        
+        # Check if search is needed
+        needs_search = any(keyword in query_lower for keyword in [
+            'search', 'find', 'latest', 'current', 'news', 'what is', 'who is', 
+            'when was', 'recent', 'today', 'update'
+        ])
+        
+        # Check if math calculation is needed
+        needs_math = any(char in query for char in ['+', '-', '*', '/', '=', 'calculate', 'math']) or \
+                    any(keyword in query_lower for keyword in ['calculate', 'solve', 'compute'])
+        
+        # Check if complex reasoning is needed
+        needs_reasoning = any(keyword in query_lower for keyword in [
+            'analyze', 'compare', 'explain', 'why', 'how', 'step by step', 'break down'
+        ])
+        
+        return {
+            "needs_search": needs_search,
+            "needs_math": needs_math,
+            "needs_reasoning": needs_reasoning
+        }
+    
+    async def _run_tools(self, query: str, route: Dict[str, bool], trace: Optional[Dict[str, Any]] = None,
+                         seed: Optional[IndexedAnswer] = None) -> Tuple[str, List[str]]:
+        """
+        Run the tools a query needs and return the chain context and the tools that succeeded
+        
+        When a trace dict is given, per-tool timings and the search providers
+        used are recorded into it for the query history. A seed answer from
+        the answer index replaces the web search.
+        """
+        math_expression = math_evaluator.extract_expression(query) if route["needs_math"] else None
+        graph = self._build_tool_graph(query, route["needs_search"] and seed is None, math_expression)
+        context, tools_used = (self._seed_context(seed, trace), [REUSED_CHAIN]) if seed else ("", [])
+        if not len(graph):
+            return context, tools_used
+        # Tools share the request budget but leave room for the chain call
+        tool_results = await graph.run(deadline=stage_timeout(settings.TOOL_DEADLINE, reserve=settings.CHAIN_MIN_BUDGET))
+        tool_context, tool_names = self._collect_tool_context(tool_results, trace)
+        return context + tool_context, tools_used + tool_names
+    
+    def _lookup_answer(self, query: str, options: dict) -> Tuple[Optional[AnswerMatch], bool]:
+        """
+        Best related prior answer from the answer index, if any is close and fresh enough to use
+        
+        Returns:
+            tuple: The match or None, and whether it can be returned as is
+        """
+        if not settings.ANSWER_INDEX_ENABLED or options.get("use_index") is False:
+            return None, False
+        # Time-sensitive queries only build on answers younger than their cache TTL
+        max_age = freshness_for(query).ttl
+        match = answer_index.best_match(query)
+        if match and match.reusable(max_age):
+            outcome = "reuse"
+        elif match and match.seedable(max_age):
+            outcome = "related"
+        else:
+            outcome, match = "miss", None
+        metrics.increment("answer_index_lookups_total", outcome=outcome)
+        return match, outcome == "reuse"
+    
+    def _seed_context(self, seed: IndexedAnswer, trace: Optional[Dict[str, Any]]) -> str:
+        if trace is not None:
+            trace["providers"] = {"used": REUSED_CHAIN, "attempted": [], "seeded_from": seed.created_at}
+        return f"Previously Researched ({seed.query}):\n{seed.answer}\n\n{seed.context}"
+    
+    def _chain_key(self, route: Dict[str, bool]) -> str:
+        """Chain a routed query runs through; the search tool always yields context"""
+        if route["needs_search"]:
+            return "research"
+        elif route["needs_reasoning"]:
+            return "reasoning"
+        elif route["needs_math"]:
+            return "math"
+        return "qa"
+    
+    def _select_chain(self, query: str, route: Dict[str, bool], context: str) -> Tuple[str, Dict[str, Any]]:
+        """Pick the chain for a routed query and build its input"""
+        chain_key = self._chain_key(route)
+        if chain_key == "research":
+            # Use research chain with search context
+            return chain_key, {"search_context": context.strip(), "question": query}
+        elif chain_key == "math":
+            # Word problems and symbolic math need the whole query, not just the numbers
+            return chain_key, {"math_expression": query}
+        # Reasoning and simple Q&A chains take the question alone
+        return chain_key, {"question": query}
+    
+    def _get_chain(self, chain_key: str) -> Runnable:
+        """Get the chain registered under a chain key"""
+        return {
+            "research": self.research_chains.get_research_chain,
+            "reasoning": self.research_chains.get_reasoning_chain,
+            "math": self.research_chains.get_math_chain,
+            "qa": self.research_chains.get_qa_chain,
+        }[chain_key]()
+    
+    async def _invoke_chain(self, chain_key: str, chain_input: Dict[str, Any]) -> str:
+        """Invoke a chain within the remaining request budget"""
+        deadline = current_deadline()
+        if deadline:
+            deadline.check(f"the {chain_key} chain")
+        return await asyncio.wait_for(
+            self._get_chain(chain_key).ainvoke(chain_input),
+            timeout=stage_timeout(settings.CHAIN_TIMEOUT)
+        )
+    
+    def _partial_response(self, query: str, context: str, tools_used: List[str], route: Dict[str, bool]) -> Dict[str, Any]:
+        summary = "I could not finish the answer within the time limit for this request."
+        if context:
+            summary += f" Here is what I found so far:\n\n{context.strip()}"
+        response = self._chain_response(query, summary, tools_used, route)
+        response["partial"] = True
+        response["deadline_exceeded"] = True
+        return response
+    
+    def _chain_response(self, query: str, response: str, tools_used: List[str], route: Dict[str, bool]) -> Dict[str, Any]:
+        return {
+            "summary": response,
+            "query": query,
+            "tools_available": ["Search", "Calculator", "Reasoning"],
+            "tools_used": tools_used,
+            "chain_used": self._get_chain_name(route["needs_search"], route["needs_math"], route["needs_reasoning"])
+        }
+    
+    def _reused_response(self, query: str, match: AnswerMatch) -> Dict[str, Any]:
+        entry = match.entry
+        return {
+            "summary": entry.answer,
+            "query": query,
+            "tools_available": ["Search", "Calculator", "Reasoning"],
+            "tools_used": [REUSED_CHAIN],
+            "chain_used": REUSED_CHAIN,
+            "reused_from": {
+                "query": entry.query,
+                "answered_at": entry.created_at,
+                "similarity": round(match.similarity, 3)
+            }
+        }
+    
+    def _local_math_response(self, query: str, local_math: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "summary": local_math["answer"],
+            "query": query,
+            "tools_available": ["Search", "Calculator", "Reasoning"],
+            "tools_used": ["Calculator"],
+            "chain_used": "Local Calculator"
+        }
+    
+    def _record_history(self, result: Dict[str, Any], route: Dict[str, bool], context: str,
+                        trace: Dict[str, Any]) -> None:
+        """Queue an answered query for the history store (write-behind, never blocks) and the answer index"""
+        if _background_answer.get():
+            return
+        if settings.ANSWER_INDEX_ENABLED and not result.get("partial") and not result.get("cached") \
+                and result.get("chain_used") not in UNINDEXED_CHAINS:
+            # Answers built on a reused context are only as fresh as that context
+            seeded_from = (trace.get("providers") or {}).get("seeded_from")
+            answer_index.add(result["query"], result["summary"], context, result.get("chain_used"),
+                             result.get("tools_used"), seeded_from)
+        history_store.record(
+            result["query"],
+            result["summary"],
+            chain_used=result.get("chain_used"),
+            route=route,
+            tools_used=result.get("tools_used"),
+            providers=trace.get("providers"),
+            timings={name: round(seconds, 4) for name, seconds in trace.get("timings", {}).items()},
+            context=context or None,
+            partial=result.get("partial", False)
+        )
+    
+    async def process_batch(self, queries: List[str], options: dict = None,
+                            max_concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process many queries using the chains' native batch execution
+        
+        Queries are routed and grouped by chain; each group runs through one
+        abatch call bounded by max_concurrency. Pure arithmetic is answered
+        locally and groups without tools start immediately, while the research
+        group waits for its searches (run concurrently).
+        
+        Args:
+            queries: User questions
+            options: Optional configuration parameters shared by all queries
+            max_concurrency: Maximum concurrent chain calls per group and concurrent tool runs
+            
+        Yields:
+            dict: One result per query as it finishes, tagged with its input index
+        """
+        max_concurrency = max_concurrency or settings.BATCH_MAX_CONCURRENCY
+        results: asyncio.Queue = asyncio.Queue()
+        groups: Dict[str, List[Tuple[int, Dict[str, bool]]]] = {}
+        seeds: Dict[int, IndexedAnswer] = {}
+        
+        for index, query in enumerate(queries):
+            try:
+                local_math = math_evaluator.evaluate_query(query)
+            except Exception as e:
+                # One bad expression must not end the stream for the rest of the batch
+                results.put_nowait({"index": index, "status": "error", "query": query, "error": str(e)})
+                continue
+            if local_math:
+                response = self._local_math_response(query, local_math)
+                self._record_history(response, {}, "", {})
+                results.put_nowait({"index": index, "status": "ok", **response})
+                continue
+            cached = await self._cached_answer(query, options or {})
+            if cached:
+                response, answered_at = cached
+                self._record_history(response, {}, "", self._cache_trace(answered_at, time.perf_counter()))
+                results.put_nowait({"index": index, "status": "ok", **response})
+                continue
+            match, reusable = self._lookup_answer(query, options or {})
+            if reusable:
+                response = self._reused_response(query, match)
+                self._record_history(response, {}, "", {})
+                results.put_nowait({"index": index, "status": "ok", **response})
+                continue
+            route = self.route_query(query)
+            if match and route["needs_search"]:
+                seeds[index] = match.entry
+            groups.setdefault(self._chain_key(route), []).append((index, route))
+        
+        tool_slots = asyncio.Semaphore(max_concurrency)
+        traces: Dict[int, Dict[str, Any]] = {}
+        contexts: Dict[int, str] = {}
+        
+        async def prepare(index: int, route: Dict[str, bool]):
+            traces[index] = {"timings": {}, "providers": {}}
+            async with tool_slots:
+                context, tools_used = await self._run_tools(queries[index], route, traces[index], seeds.get(index))
+            contexts[index] = context
+            _, chain_input = self._select_chain(queries[index], route, context)
+            return chain_input, tools_used
+        
+        async def run_group(chain_key: str, members: List[Tuple[int, Dict[str, bool]]]):
+            emitted = set()
+            start = time.perf_counter()
+            
+            async def emit(position: int, output: Any, tools_used: List[str]):
+                index, route = members[position]
+                emitted.add(position)
+                if isinstance(output, Exception):
+                    results.put_nowait({
+                        "index": index,
+                        "status": "error",
+                        "query": queries[index],
+                        "error": str(output)
+                    })
+                else:
+                    response = self._chain_response(queries[index], output, tools_used, route)
+                    trace = traces.get(index, {"timings": {}})
+                    trace["timings"]["total"] = time.perf_counter() - start
+                    self._record_history(response, route, contexts.get(index, ""), trace)
+                    results.put_nowait({"index": index, "status": "ok", **response})
+                    await self._cache_answer(queries[index], response, options or {})
+            
+            async def invoke_group():
+                prepared = await asyncio.gather(*(prepare(index, route) for index, route in members))
+                chain = self._get_chain(chain_key)
+                inputs = [chain_input for chain_input, _ in prepared]
+                config = {"max_concurrency": max_concurrency}
+                if hasattr(chain, "abatch_as_completed"):
+                    async for position, output in chain.abatch_as_completed(inputs, config, return_exceptions=True):
+                        await emit(position, output, prepared[position][1])
+                else:
+                    outputs = await chain.abatch(inputs, config, return_exceptions=True)
+                    for position, output in enumerate(outputs):
+                        await emit(position, output, prepared[position][1])
+            
+            try:
+                await asyncio.wait_for(invoke_group(), timeout=stage_timeout(settings.CHAIN_TIMEOUT + settings.TOOL_DEADLINE))
+            except asyncio.TimeoutError:
+                for position in range(len(members)):
+                    if position not in emitted:
+                        await emit(position, DeadlineExceeded("Request deadline exceeded"), [])
+            except Exception as e:
+                # Report every query of a failed group that has not produced a result yet
+                for position in range(len(members)):
+                    if position not in emitted:
+                        await emit(position, e, [])
+        
+        tasks = [asyncio.create_task(run_group(chain_key, members)) for chain_key, members in groups.items()]
+        try:
+            for _ in range(len(queries)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def _build_tool_graph(self, query: str, needs_search: bool, math_expression: Optional[str]) -> ToolGraph:
+        """
+        Build the tool DAG for a query.
+        
+        Search and math do not depend on each other, so they are independent
+        nodes and run concurrently. Blocking search runs in a worker thread.
+        """
+        graph = ToolGraph()
+        if needs_search:
+            graph.add("Search", lambda deps: asyncio.to_thread(profile_thread(self._search), query),
+                      timeout=settings.SEARCH_TOOL_TIMEOUT)
+        if math_expression:
+            graph.add("Calculator", lambda deps: self.acalculate_math(math_expression),
+                      timeout=settings.MATH_TOOL_TIMEOUT)
+        return graph
+    
+    def _collect_tool_context(self, tool_results: Dict[str, ToolResult],
+                              trace: Optional[Dict[str, Any]] = None) -> Tuple[str, List[str]]:
+        """Turn tool results into chain context; failed tools degrade to a note instead of an error"""
+        labels = {"Search": "Search Results", "Calculator": "Math Calculation"}
+        context = ""
+        tools_used = []
+        for name, result in tool_results.items():
+            value = result.value
+            if name == "Search" and isinstance(value, dict):
+                if trace is not None:
+                    trace["providers"] = {
+                        "used": value.get("provider_used") or None,
+                        "attempted": value.get("providers_attempted", [])
+                    }
+                value = value["results"]
+            if trace is not None:
+                trace["timings"][name.lower()] = result.elapsed
+            if result.ok:
+                context += f"{labels.get(name, name)}:\n{value}\n\n"
+                tools_used.append(name)
+            else:
+                print(f"Tool {name} failed: {result.error}")
+                context += f"{labels.get(name, name)}:\nUnavailable ({result.error})\n\n"
+        return context, tools_used
+    
     def _get_chain_name(self, needs_search: bool, needs_math: bool, needs_reasoning: bool) -> str:
         """Determine which chain was used based on query analysis"""
         if needs_search:
@@ -173,8 +656,11 @@ class LangChainService:
                 "reasoning_result": self.research_chains.get_reasoning_chain()
             })
             
-            # Execute parallel chains
-            results = await parallel_chain.ainvoke({"question": query})
+            # Execute parallel chains within the remaining request budget
+            results = await asyncio.wait_for(
+                parallel_chain.ainvoke({"question": query}),
+                timeout=stage_timeout(settings.CHAIN_TIMEOUT)
+            )
             
             # Combine results
             combined_summary = f"""Direct Answer:
@@ -201,7 +687,8 @@ Detailed Analysis:
             }
 
 # Global service instance
-langchain_service = LangChainService()
+with constructing("langchain_service"):
+    langchain_service = LangChainService()
 
 # Backward compatibility functions
 async def run_agent(query: str, options: dict = None):
@@ -209,7 +696,12 @@ async def run_agent(query: str, options: dict = None):
     Legacy function for backward compatibility.
     Uses the new LangChain service.
     """
-    return await langchain_service.process_query_with_chains(query, options)
+    return await langchain_service.answer_query(query, options)
+
+async def run_agent_batch(queries: List[str], options: dict = None, max_concurrency: Optional[int] = None):
+    """Process many queries, yielding results as they finish"""
+    async for result in langchain_service.process_batch(queries, options, max_concurrency):
+        yield result
 
 def perform_web_search(query: str) -> str:
     """Legacy function for backward compatibility"""
@@ -218,3 +710,7 @@ def perform_web_search(query: str) -> str:
 def calculate_math(expression: str) -> str:
     """Legacy function for backward compatibility"""
     return langchain_service.calculate_math(expression)
+
+async def calculate_math_batch(expressions: List[str]) -> List[Dict[str, Any]]:
+    """Evaluate a batch of arithmetic expressions"""
+    return await langchain_service.calculate_math_batch(expressions)
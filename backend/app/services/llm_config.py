@@ -7,6 +7,7 @@ from typing import Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.language_models import BaseLanguageModel
 from dotenv import load_dotenv
+from app.startup import constructing
 
 load_dotenv()
 
@@ -57,4 +58,5 @@ class LLMConfig:
         )
 
 # Global LLM configuration instance
-llm_config = LLMConfig()
+with constructing("llm_config"):
+    llm_config = LLMConfig()
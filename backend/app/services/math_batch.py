@@ -0,0 +1,302 @@
+"""
+Batch arithmetic evaluation for AI Research Assistant
+Groups expressions that share structure, compiles each structure once and
+evaluates each group with NumPy over arrays of their numeric literals
+"""
+import ast
+import re
+from collections import defaultdict
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import math_evaluator
+from .math_evaluator import MathEvaluationError
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batches then fall back to the scalar evaluator
+    np = None
+
+# Groups smaller than this are cheaper to evaluate one by one
+VECTORIZE_MIN_GROUP = 8
+# Largest integer float64 represents exactly
+EXACT_FLOAT_INT = 2 ** 53
+
+if np is not None:
+    NUMPY_BINARY = {
+        ast.Add: np.add,
+        ast.Sub: np.subtract,
+        ast.Mult: np.multiply,
+        ast.Div: np.true_divide,
+        ast.FloorDiv: np.floor_divide,
+        ast.Mod: np.mod,
+        ast.Pow: np.power,
+    }
+    NUMPY_FUNCTIONS = {
+        "sqrt": np.sqrt,
+        "sin": np.sin,
+        "cos": np.cos,
+        "tan": np.tan,
+        "asin": np.arcsin,
+        "acos": np.arccos,
+        "atan": np.arctan,
+        "exp": np.exp,
+        "ln": np.log,
+        "log10": np.log10,
+        "log2": np.log2,
+        "abs": np.abs,
+        "floor": np.floor,
+        "ceil": np.ceil,
+        "hypot": np.hypot,
+        "degrees": np.degrees,
+        "radians": np.radians,
+    }
+else:
+    NUMPY_BINARY = {}
+    NUMPY_FUNCTIONS = {}
+
+# Operators that keep integer inputs integral; results are exact while bounded by EXACT_FLOAT_INT
+INTEGER_CLOSED = (ast.Add, ast.Sub, ast.Mult, ast.FloorDiv, ast.Mod, ast.UAdd, ast.USub)
+
+
+# Unsigned numeric literals; digits inside names such as log10 are not literals
+_NUMBER = re.compile(r"(?<![\w.])(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_SLOT = re.compile(r"_c(\d+)$")
+# A literal running into a name or another literal (1_000, 0x10, 1j) is not a whole number token
+_PARTIAL_LITERAL = re.compile(r"#[\w.]")
+# Python rejects integer literals with leading zeros (01), though the shape they share is valid
+_LEADING_ZERO = re.compile(r"0+[1-9]\d*")
+
+
+class Template:
+    """A compiled expression shape whose numeric literals are slots _c0, _c1, ..."""
+
+    def __init__(self, shape: str, tree: ast.Expression, slots: int):
+        self.tree = tree
+        self.slots = slots
+        self.vectorizable = _is_vectorizable(tree) and not _PARTIAL_LITERAL.search(shape)
+        self.integer_closed = _is_integer_closed(tree)
+        # // and % of inexact operands lose the digits that the scalar path's Decimals keep
+        self.floors = any(isinstance(node, ast.BinOp) and isinstance(node.op, (ast.FloorDiv, ast.Mod))
+                          for node in ast.walk(tree))
+        # Functions and named constants always produce floats in the scalar evaluator too
+        self.float_only = any(isinstance(node, ast.Call) or
+                              (isinstance(node, ast.Name) and not _SLOT.match(node.id))
+                              for node in ast.walk(tree))
+
+
+def split_literals(source: str) -> Tuple[str, List[str]]:
+    """Split a normalized expression into its shape and its numeric literals"""
+    literals = _NUMBER.findall(source)
+    return _NUMBER.sub("#", source), literals
+
+
+@lru_cache(maxsize=1024)
+def compile_template(shape: str, representative: str) -> Template:
+    """
+    Compile an expression shape once for every expression that shares it
+
+    Args:
+        shape: Expression with numeric literals replaced by '#'
+        representative: One concrete expression of this shape, used for validation
+
+    Returns:
+        Template whose tree has a _cN name per literal
+    """
+    # Validity only depends on structure, so one concrete expression validates the shape
+    math_evaluator.compile_expression(representative)
+    parts = shape.split("#")
+    source = parts[0] + "".join(f"_c{i}" + part for i, part in enumerate(parts[1:]))
+    return Template(shape, ast.parse(source, mode="eval"), len(parts) - 1)
+
+
+def _is_vectorizable(tree: ast.AST) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            name = node.func.id
+            if name in ("min", "max"):
+                continue
+            if name == "log" and len(node.args) in (1, 2):
+                continue
+            if name == "round" and len(node.args) == 1:
+                continue
+            if name not in NUMPY_FUNCTIONS:
+                return False
+    return np is not None
+
+
+def _is_integer_closed(tree: ast.AST) -> bool:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) or (isinstance(node, ast.Name) and not _SLOT.match(node.id)):
+            return False
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)) and not isinstance(node.op, INTEGER_CLOSED):
+            return False
+    return True
+
+
+class _VectorEvaluator:
+    """Evaluates one template tree with every literal slot bound to an array"""
+
+    def __init__(self, columns: List["np.ndarray"]):
+        self.columns = columns
+
+    def evaluate(self, node: ast.AST, magnitude: bool = False):
+        """Evaluate the tree; with magnitude=True, compute an upper bound on every intermediate value"""
+        if isinstance(node, ast.Expression):
+            return self.evaluate(node.body, magnitude)
+        if isinstance(node, ast.Constant):
+            return abs(node.value) if magnitude else node.value
+        if isinstance(node, ast.Name):
+            slot = _SLOT.match(node.id)
+            if slot:
+                column = self.columns[int(slot.group(1))]
+                return np.abs(column) if magnitude else column
+            return math_evaluator.CONSTANTS[node.id]
+        if isinstance(node, ast.UnaryOp):
+            operand = self.evaluate(node.operand, magnitude)
+            return operand if magnitude or isinstance(node.op, ast.UAdd) else -operand
+        if isinstance(node, ast.BinOp):
+            left = self.evaluate(node.left, magnitude)
+            right = self.evaluate(node.right, magnitude)
+            if magnitude:
+                if isinstance(node.op, (ast.Add, ast.Sub)):
+                    return left + right
+                if isinstance(node.op, ast.Mult):
+                    return left * right
+                return np.maximum(left, right)
+            return NUMPY_BINARY[type(node.op)](left, right)
+        if isinstance(node, ast.Call):
+            name = node.func.id
+            args = [self.evaluate(arg) for arg in node.args]
+            if name == "min":
+                return np.minimum.reduce(np.broadcast_arrays(*args))
+            if name == "max":
+                return np.maximum.reduce(np.broadcast_arrays(*args))
+            if name == "log":
+                if len(args) == 1:
+                    return np.log(args[0])
+                # log(x, 0) would be log(x) / -inf = -0.0; NaN sends it to the scalar domain error
+                base = np.log(args[1])
+                return np.log(args[0]) / np.where(np.isfinite(base), base, np.nan)
+            if name == "round":
+                return np.rint(args[0])
+            return NUMPY_FUNCTIONS[name](*args)
+        raise MathEvaluationError(f"Unsupported syntax: {type(node).__name__}")
+
+
+def _scalar_item(expression: str, source: str) -> Dict[str, Any]:
+    try:
+        result = math_evaluator.evaluate(source)
+        if isinstance(result, Decimal):
+            result = float(result)
+        return _result_item(expression, result)
+    except (MathEvaluationError, ArithmeticError) as e:
+        return _error_item(expression, str(e))
+    except ValueError:
+        # Integers past Python's int-to-str digit limit cannot be formatted
+        return _error_item(expression, "Result is too large")
+
+
+def _result_item(expression: str, result) -> Dict[str, Any]:
+    return {
+        "expression": expression,
+        "result": result,
+        "formatted": math_evaluator.format_number(result),
+        "error": None,
+    }
+
+
+def _error_item(expression: str, error: str) -> Dict[str, Any]:
+    return {"expression": expression, "result": None, "formatted": None, "error": error}
+
+
+def _literal(token: str):
+    return int(token) if token.isdigit() else float(token)
+
+
+def _evaluate_group(template: Template, expressions: List[str], sources: List[str],
+                    literals: List[List[str]], indices: List[int],
+                    results: List[Optional[Dict[str, Any]]]) -> None:
+    """Evaluate a group of same-shaped expressions in one vectorized pass"""
+    values_by_row = [[_literal(token) for token in literals[i]] for i in indices]
+    all_int = np.array([all(isinstance(v, int) for v in row) for row in values_by_row], dtype=bool)
+    too_large = np.array([any(abs(v) >= EXACT_FLOAT_INT for v in row) for row in values_by_row], dtype=bool)
+    columns = [np.array(column, dtype=np.float64) for column in zip(*values_by_row)]
+
+    evaluator = _VectorEvaluator(columns)
+    with np.errstate(all="ignore"):
+        values = np.broadcast_to(np.asarray(evaluator.evaluate(template.tree), dtype=np.float64), (len(indices),))
+        if template.integer_closed:
+            bound = np.broadcast_to(evaluator.evaluate(template.tree, magnitude=True), (len(indices),))
+            exact_int = all_int & (bound < EXACT_FLOAT_INT)
+        else:
+            exact_int = np.zeros(len(indices), dtype=bool)
+    finite = np.isfinite(values)
+
+    for row, index in enumerate(indices):
+        value = float(values[row])
+        # Past 2**53 a float64 cannot tell an exact result from a rounded one, and the scalar path keeps
+        # integers and decimals exact; results of functions are floats on both paths
+        beyond_exact = not template.float_only and abs(value) >= EXACT_FLOAT_INT
+        inexact_int = all_int[row] and template.integer_closed and not exact_int[row]
+        inexact_floor = template.floors and not exact_int[row]
+        if too_large[row] or not finite[row] or beyond_exact or inexact_int or inexact_floor:
+            # Overflow, domain errors and big integers get exact scalar semantics and error messages
+            results[index] = _scalar_item(expressions[index], sources[index])
+            continue
+        if not template.float_only and value.is_integer():
+            value = int(value)
+        results[index] = _result_item(expressions[index], value)
+
+
+def evaluate_batch(expressions: List[str]) -> List[Dict[str, Any]]:
+    """
+    Evaluate many arithmetic expressions at once
+
+    Expressions are grouped by shape (e.g. "12 * 1.07 + 3" and "40 * 1.2 + 5"
+    share "# * # + #"). Each shape is parsed and validated once, and large
+    groups are evaluated with NumPy over arrays of their literals. Small
+    groups, non-vectorizable functions, results beyond 2**53, // and % of
+    non-integers, and literals the shape cannot validate (01) use the scalar
+    evaluator. Results use float64 precision except for exact integers.
+
+    Args:
+        expressions: Arithmetic expressions
+
+    Returns:
+        list: One dict per expression, in input order, with expression,
+        result, formatted and error keys
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(expressions)
+    sources: List[str] = [""] * len(expressions)
+    literals: List[List[str]] = [[] for _ in expressions]
+    groups: Dict[str, List[int]] = defaultdict(list)
+
+    for index, expression in enumerate(expressions):
+        sources[index] = math_evaluator.normalize_expression(expression)
+        if "#" in sources[index]:
+            results[index] = _error_item(expression, "Not an arithmetic expression: unexpected '#'")
+            continue
+        shape, literals[index] = split_literals(sources[index])
+        if len(sources[index]) > math_evaluator.MAX_EXPRESSION_LENGTH or \
+                any(_LEADING_ZERO.fullmatch(token) for token in literals[index]):
+            # Invalid for reasons the shape does not show; the scalar evaluator gives the error
+            results[index] = _scalar_item(expression, sources[index])
+            continue
+        groups[shape].append(index)
+
+    for shape, indices in groups.items():
+        try:
+            template = compile_template(shape, sources[indices[0]])
+        except MathEvaluationError as e:
+            for index in indices:
+                results[index] = _error_item(expressions[index], str(e))
+            continue
+        if len(indices) >= VECTORIZE_MIN_GROUP and template.vectorizable:
+            _evaluate_group(template, expressions, sources, literals, indices, results)
+        else:
+            for index in indices:
+                results[index] = _scalar_item(expressions[index], sources[index])
+
+    return results
@@ -0,0 +1,375 @@
+"""
+Safe local arithmetic evaluator for AI Research Assistant
+Answers pure arithmetic without an LLM call by walking a whitelisted Python AST
+"""
+import ast
+import math
+import operator
+import re
+from decimal import Decimal, DecimalException, InvalidOperation, localcontext
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Union
+
+Number = Union[int, float, Decimal]
+
+MAX_EXPRESSION_LENGTH = 500
+MAX_NODES = 200
+# Below Python's default 4300-digit limit on converting an int to str
+MAX_RESULT_DIGITS = 4000
+MAX_FACTORIAL = 1000
+DECIMAL_PRECISION = 34
+
+
+class MathEvaluationError(ValueError):
+    """Raised when an expression is not plain arithmetic the evaluator can handle"""
+
+
+FUNCTIONS = {
+    "sqrt": math.sqrt,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "exp": math.exp,
+    "log": math.log,
+    "ln": math.log,
+    "log10": math.log10,
+    "log2": math.log2,
+    "abs": abs,
+    "round": round,
+    "floor": math.floor,
+    "ceil": math.ceil,
+    "factorial": math.factorial,
+    "gcd": math.gcd,
+    "lcm": math.lcm,
+    "hypot": math.hypot,
+    "degrees": math.degrees,
+    "radians": math.radians,
+    "min": min,
+    "max": max,
+}
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+}
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+
+UNARY_OPERATORS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+# Leading/trailing phrases that wrap an otherwise pure arithmetic query
+_LEAD_PHRASES = re.compile(
+    r"^\s*(?:please\s+)?(?:what\s+is|what's|whats|how\s+much\s+is|calculate|compute|solve|evaluate|"
+    r"work\s+out|find)\s*(?:the\s+(?:value|result)\s+of\s*)?:?\s*",
+    re.IGNORECASE,
+)
+_TRAILING = re.compile(r"[\s?.!=]+$")
+
+_WORD_OPERATORS = [
+    (re.compile(r"\bmultiplied\s+by\b|\btimes\b", re.IGNORECASE), "*"),
+    (re.compile(r"\bdivided\s+by\b", re.IGNORECASE), "/"),
+    (re.compile(r"\bplus\b", re.IGNORECASE), "+"),
+    (re.compile(r"\bminus\b", re.IGNORECASE), "-"),
+    (re.compile(r"\bto\s+the\s+power\s+of\b", re.IGNORECASE), "**"),
+    (re.compile(r"\bmod(?:ulo)?\b", re.IGNORECASE), "%"),
+    (re.compile(r"\bsquared\b", re.IGNORECASE), "**2"),
+    (re.compile(r"\bcubed\b", re.IGNORECASE), "**3"),
+    (re.compile(r"\bsquare\s+root\s+of\s+(\d+(?:\.\d+)?)", re.IGNORECASE), r"sqrt(\1)"),
+    (re.compile(r"(\d+(?:\.\d+)?)\s*%\s*of\b", re.IGNORECASE), r"(\1/100)*"),
+]
+
+_THOUSANDS_SEPARATOR = re.compile(r"(?<=\d),(?=\d{3}(?!\d))")
+
+# Runs of tokens that can appear in an arithmetic expression
+_TOKEN_NAMES = "|".join(sorted(list(FUNCTIONS) + list(CONSTANTS), key=len, reverse=True))
+_CANDIDATE = re.compile(r"(?:\b(?:" + _TOKEN_NAMES + r")\b|\*\*|[\d.()+\-*/%,\s])+", re.IGNORECASE)
+_HAS_OPERATOR = re.compile(r"[+\-*/%]|\b(?:" + "|".join(FUNCTIONS) + r")\s*\(", re.IGNORECASE)
+
+
+def normalize_expression(text: str) -> str:
+    """Rewrite common notations (^, x, unicode operators, words) into Python syntax"""
+    expr = text.strip()
+    expr = expr.replace("×", "*").replace("÷", "/").replace("−", "-").replace("^", "**")
+    for pattern, replacement in _WORD_OPERATORS:
+        expr = pattern.sub(replacement, expr)
+    expr = re.sub(r"(?<=\d)\s*[xX]\s*(?=[\d(])", "*", expr)
+    expr = _THOUSANDS_SEPARATOR.sub("", expr)
+    return expr.strip()
+
+
+def _literal_decimal(node: ast.Constant, source: str) -> Number:
+    """Keep float literals exact by re-reading their source text as a Decimal"""
+    segment = ast.get_source_segment(source, node)
+    try:
+        return Decimal(segment) if segment else Decimal(repr(node.value))
+    except InvalidOperation:
+        return node.value
+
+
+def _validate(tree: ast.AST) -> None:
+    count = 0
+    for node in ast.walk(tree):
+        count += 1
+        if count > MAX_NODES:
+            raise MathEvaluationError("Expression is too large")
+        if isinstance(node, (ast.Expression, ast.Load)) or type(node) in BINARY_OPERATORS or type(node) in UNARY_OPERATORS:
+            continue
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            continue
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise MathEvaluationError(f"Unsupported literal: {node.value!r}")
+            continue
+        if isinstance(node, ast.Name):
+            if node.id not in CONSTANTS and node.id not in FUNCTIONS:
+                raise MathEvaluationError(f"Unknown name: {node.id}")
+            continue
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise MathEvaluationError("Unsupported function call")
+            continue
+        raise MathEvaluationError(f"Unsupported syntax: {type(node).__name__}")
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str) -> ast.Expression:
+    """
+    Parse and validate an arithmetic expression once
+
+    Args:
+        expression: Expression in Python syntax (see normalize_expression)
+
+    Returns:
+        Validated AST, safe to pass to evaluate_ast
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise MathEvaluationError("Expression is too long")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise MathEvaluationError(f"Not an arithmetic expression: {e.msg}")
+    _validate(tree)
+    return tree
+
+
+def _check_power(base: Number, exponent: Number) -> None:
+    # Negative exponents of large bases (2 ** -100000) are tiny, not too large
+    if isinstance(exponent, (int, Decimal)) and base != 0 and abs(base) != 1:
+        digits = float(exponent) * math.log10(abs(base))
+        if digits > MAX_RESULT_DIGITS:
+            raise OverflowError("Result is too large")
+
+
+def _check_digits(result: Number) -> None:
+    # Products of powers that each pass _check_power can still be too long to print
+    if isinstance(result, int) and result.bit_length() * math.log10(2) > MAX_RESULT_DIGITS:
+        raise OverflowError("Result is too large")
+
+
+def _floor_divmod(left: Number, right: Number) -> Tuple[Number, Number]:
+    """
+    Python's // and % for Decimal operands, which round toward zero on their own
+
+    The quotient is rounded down and the remainder takes the divisor's sign,
+    as for ints and floats: -7.5 // 2 is -4 and -7.5 % 2 is 0.5.
+    """
+    if right == 0:
+        raise ZeroDivisionError("division by zero")
+    try:
+        quotient, remainder = divmod(Decimal(left), Decimal(right))  # Truncated, exactly
+    except InvalidOperation:
+        # The quotient has more digits than the context's precision
+        return divmod(float(left), float(right))
+    if remainder and (remainder < 0) != (right < 0):
+        quotient -= 1
+        remainder += right
+    return quotient, remainder
+
+
+def _power(left: Number, right: Number) -> Number:
+    """Powers with a negative integer exponent are exact Decimals, not floats that underflow to 0"""
+    if isinstance(left, int) and isinstance(right, int) and right < 0:
+        if left == 0:
+            raise ZeroDivisionError("division by zero")
+        return Decimal(left) ** right
+    return left ** right
+
+
+def _coerce(left: Number, right: Number):
+    """Decimal and float do not mix; fall back to float when they meet"""
+    if isinstance(left, Decimal) and isinstance(right, float):
+        return float(left), right
+    if isinstance(left, float) and isinstance(right, Decimal):
+        return left, float(right)
+    return left, right
+
+
+def _check_real(result: Number) -> Number:
+    if isinstance(result, complex):
+        raise ArithmeticError("result is not a real number")
+    return result
+
+
+def evaluate_ast(node: ast.AST, source: str) -> Number:
+    """Evaluate a validated AST node"""
+    if isinstance(node, ast.Expression):
+        return evaluate_ast(node.body, source)
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, float):
+            return _literal_decimal(node, source)
+        return node.value
+    if isinstance(node, ast.Name):
+        return CONSTANTS[node.id]
+    if isinstance(node, ast.UnaryOp):
+        return UNARY_OPERATORS[type(node.op)](evaluate_ast(node.operand, source))
+    if isinstance(node, ast.BinOp):
+        left, right = _coerce(evaluate_ast(node.left, source), evaluate_ast(node.right, source))
+        op = type(node.op)
+        if op is ast.Pow:
+            _check_power(left, right)
+            return _check_real(_power(left, right))
+        if op in (ast.FloorDiv, ast.Mod) and (isinstance(left, Decimal) or isinstance(right, Decimal)):
+            return _floor_divmod(left, right)[0 if op is ast.FloorDiv else 1]
+        if op is ast.Div and isinstance(left, int) and isinstance(right, int):
+            if right == 0:
+                raise ZeroDivisionError("division by zero")
+            if left % right == 0:
+                return left // right
+            return Decimal(left) / Decimal(right)
+        return _check_real(BINARY_OPERATORS[op](left, right))
+    if isinstance(node, ast.Call):
+        name = node.func.id
+        args = [evaluate_ast(arg, source) for arg in node.args]
+        if name == "factorial":
+            if len(args) != 1 or int(args[0]) != args[0] or args[0] > MAX_FACTORIAL:
+                raise MathEvaluationError("factorial() needs an integer up to 1000")
+            return math.factorial(int(args[0]))
+        if name in ("gcd", "lcm"):
+            return FUNCTIONS[name](*[int(arg) for arg in args])
+        if name in ("abs", "min", "max", "round"):
+            return FUNCTIONS[name](*args)
+        return FUNCTIONS[name](*[float(arg) for arg in args])
+    raise MathEvaluationError(f"Unsupported syntax: {type(node).__name__}")
+
+
+def evaluate(expression: str) -> Number:
+    """
+    Evaluate an arithmetic expression locally
+
+    Args:
+        expression: Arithmetic expression, e.g. "2^10 + sqrt(16)"
+
+    Returns:
+        int for exact integer results, Decimal for exact decimal results, float otherwise
+
+    Raises:
+        MathEvaluationError: The expression is not plain arithmetic, or its result is too large
+        ArithmeticError: The arithmetic itself failed (division by zero, domain errors)
+    """
+    source = normalize_expression(expression)
+    tree = compile_expression(source)
+    with localcontext() as ctx:
+        ctx.prec = DECIMAL_PRECISION
+        try:
+            result = evaluate_ast(tree, source)
+            _check_digits(result)
+        except ZeroDivisionError:
+            raise ZeroDivisionError("division by zero")
+        except OverflowError:
+            # e.g. e**1000 in floats; the message of a float overflow is not meant for users
+            raise MathEvaluationError("Result is too large")
+        except DecimalException:
+            raise ArithmeticError("result is not a real number")
+        except (TypeError, ValueError) as e:
+            if isinstance(e, MathEvaluationError):
+                raise
+            raise ArithmeticError(str(e))
+        if isinstance(result, Decimal):
+            result = result.normalize()
+            if result == result.to_integral_value():
+                result = int(result)
+    return result
+
+
+def format_number(value: Number) -> str:
+    """Format an evaluation result for display"""
+    if isinstance(value, bool) or isinstance(value, int):
+        return str(value)
+    if isinstance(value, Decimal):
+        return format(value, "f") if abs(value.adjusted()) < 20 else str(value)
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e16:
+            return str(int(value))
+        return format(value, ".15g")
+    return str(value)
+
+
+def _is_computation(tree: ast.AST) -> bool:
+    """Whether an expression operates on two operands or calls a function, unlike the -4 of gpt-4"""
+    return any(isinstance(node, (ast.BinOp, ast.Call)) for node in ast.walk(tree))
+
+
+def extract_expression(text: str) -> Optional[str]:
+    """
+    Find the arithmetic expression embedded in free text
+
+    Args:
+        text: User query, e.g. "latest inflation data and calculate 250 * 1.07"
+
+    Returns:
+        The longest embedded expression that computes something (a binary
+        operation or function call, so not the "-19" of "covid-19"), or None
+    """
+    normalized = normalize_expression(text)
+    candidates = sorted((c.strip(" ,") for c in _CANDIDATE.findall(normalized)), key=len, reverse=True)
+    for candidate in candidates:
+        if not any(ch.isdigit() for ch in candidate) or not _HAS_OPERATOR.search(candidate):
+            continue
+        try:
+            tree = compile_expression(candidate)
+        except MathEvaluationError:
+            continue
+        if _is_computation(tree):
+            return candidate
+    return None
+
+
+def evaluate_query(query: str) -> Optional[Dict[str, Any]]:
+    """
+    Answer a query locally if the whole query is pure arithmetic
+
+    Args:
+        query: User query, e.g. "What is 2^32 - 1?"
+
+    Returns:
+        dict with expression, result and formatted answer, or None if the
+        query has words beyond the arithmetic (word problems go to the LLM)
+    """
+    stripped = _TRAILING.sub("", _LEAD_PHRASES.sub("", query))
+    expression = normalize_expression(stripped)
+    if not expression or not any(ch.isdigit() for ch in expression) or not _HAS_OPERATOR.search(expression):
+        return None
+    try:
+        result = evaluate(expression)
+    except MathEvaluationError:
+        return None
+    except ArithmeticError as e:
+        return {"expression": expression, "result": None, "error": str(e),
+                "answer": f"Error calculating {expression}: {str(e)}"}
+    return {"expression": expression, "result": result, "error": None,
+            "answer": f"The result of {expression} is {format_number(result)}"}
@@ -0,0 +1,201 @@
+"""
+Memory diagnostics for AI Research Assistant
+Allocation tracing with tracemalloc (top allocation sites diffed between
+snapshots) and per-singleton object footprints, for finding what makes a
+long-running worker grow. Tracing slows allocation down noticeably, so it
+only runs between an explicit start and stop.
+"""
+import gc
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from .metrics import metrics
+
+# Not followed when measuring a footprint: they lead to module globals and the whole program
+_OPAQUE_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+# Strings and bytes at least this large are listed individually in a footprint
+LARGE_OBJECT_BYTES = 64 * 1024
+
+
+def rss_bytes() -> Optional[int]:
+    """Current resident set size; peak RSS where /proc is unavailable"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def object_footprint(root: Any, max_objects: int) -> Dict[str, Any]:
+    """
+    Objects reachable from root and their shallow sizes, by type
+
+    Follows gc referents breadth first, without entering classes, modules or
+    functions. Objects shared with other roots count towards each of them.
+    """
+    seen = {id(root)}
+    pending = deque([root])
+    by_type: Dict[str, List[int]] = {}
+    large = []
+    total_bytes = 0
+    while pending and len(seen) <= max_objects:
+        obj = pending.popleft()
+        size = sys.getsizeof(obj, 0)
+        total_bytes += size
+        counts = by_type.setdefault(type(obj).__name__, [0, 0])
+        counts[0] += 1
+        counts[1] += size
+        if isinstance(obj, (str, bytes, bytearray)) and size >= LARGE_OBJECT_BYTES:
+            large.append({"type": type(obj).__name__, "bytes": size, "preview": repr(obj[:80])})
+        for referent in gc.get_referents(obj):
+            if id(referent) not in seen and not isinstance(referent, _OPAQUE_TYPES):
+                seen.add(id(referent))
+                pending.append(referent)
+    top_types = sorted(by_type.items(), key=lambda item: item[1][1], reverse=True)[:15]
+    return {
+        "objects": len(seen) - len(pending),
+        "bytes": total_bytes,
+        "truncated": bool(pending),
+        "top_types": [{"type": name, "count": count, "bytes": size} for name, (count, size) in top_types],
+        "large_objects": sorted(large, key=lambda entry: entry["bytes"], reverse=True)[:10],
+    }
+
+
+def service_singletons() -> Dict[str, Any]:
+    """The long-lived service objects whose growth is worth watching"""
+    from .answer_index import answer_index
+    from .cache import tiered_cache
+    from .chains import research_chains, tool_chains
+    from .enhanced_search_service import enhanced_search_service
+    from .langchain_service import langchain_service
+    from .llm_config import llm_config
+    from .semantic_cache import semantic_cache
+
+    return {
+        "langchain_service": langchain_service,
+        "enhanced_search_service": enhanced_search_service,
+        "research_chains": research_chains,
+        "tool_chains": tool_chains,
+        "llm_config": llm_config,
+        "tiered_cache": tiered_cache,
+        "semantic_cache": semantic_cache,
+        "answer_index": answer_index,
+    }
+
+
+class MemoryTracer:
+    """tracemalloc control with a baseline and a previous snapshot to diff against"""
+
+    def __init__(self, frames: int, top: int):
+        self.frames = frames
+        self.top = top
+        self.started_at: Optional[float] = None
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: Optional[int] = None) -> Dict[str, Any]:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames or self.frames)
+                self.started_at = time.time()
+                self._baseline = self._previous = self._take()
+            return self.state()
+
+    def stop(self) -> Dict[str, Any]:
+        with self._lock:
+            tracemalloc.stop()
+            self.started_at = None
+            self._baseline = self._previous = None
+            return self.state()
+
+    def _take(self) -> tracemalloc.Snapshot:
+        # Allocations made by tracemalloc and the import system would otherwise top every diff
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ])
+
+    def snapshot(self, compare_to: str = "previous", group_by: str = "lineno",
+                 limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Top allocation sites grown since the baseline (tracing start) or the previous snapshot
+
+        Raises:
+            RuntimeError: Tracing is not running
+        """
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                raise RuntimeError("Allocation tracing is not running")
+            current = self._take()
+            reference = self._baseline if compare_to == "baseline" else self._previous
+            self._previous = current
+        stats = current.compare_to(reference, group_by)
+        stats.sort(key=lambda stat: stat.size_diff, reverse=True)
+        traced, peak = tracemalloc.get_traced_memory()
+        metrics.set_gauge("memory_traced_bytes", traced)
+        return {
+            "compared_to": compare_to,
+            "traced_bytes": traced,
+            "traced_peak_bytes": peak,
+            "top": [
+                {
+                    "site": str(stat.traceback[0]) if stat.traceback else "?",
+                    "size_diff": stat.size_diff,
+                    "size": stat.size,
+                    "count_diff": stat.count_diff,
+                    "count": stat.count,
+                    "traceback": stat.traceback.format()[-2 * self.frames:] if group_by == "traceback" else None,
+                }
+                for stat in stats[:limit or self.top]
+            ],
+        }
+
+    def state(self) -> Dict[str, Any]:
+        traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "started_at": self.started_at,
+            "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else self.frames,
+            "traced_bytes": traced,
+            "traced_peak_bytes": peak,
+        }
+
+
+def memory_report(max_objects: Optional[int] = None) -> Dict[str, Any]:
+    """Process memory, gc state and the footprint of each service singleton"""
+    rss = rss_bytes()
+    if rss is not None:
+        metrics.set_gauge("process_rss_bytes", rss)
+    limit = max_objects or settings.MEMORY_FOOTPRINT_MAX_OBJECTS
+    return {
+        "rss_bytes": rss,
+        "gc": {"counts": gc.get_count(), "objects": len(gc.get_objects()), "garbage": len(gc.garbage)},
+        "tracing": memory_tracer.state(),
+        "singletons": {name: object_footprint(obj, limit) for name, obj in service_singletons().items()},
+    }
+
+
+# Global allocation tracer
+memory_tracer = MemoryTracer(settings.MEMORY_TRACE_FRAMES, settings.MEMORY_TOP_ALLOCATIONS)
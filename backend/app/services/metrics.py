@@ -0,0 +1,116 @@
+"""
+In-process metrics for AI Research Assistant
+Counters, gauges and timing summaries, keyed by name and labels. With several
+worker processes (app.serve) each publishes its metrics to a shared directory
+and snapshots add up every worker's.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+
+def _key(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+class Metrics:
+    """Thread-safe metric registry; search and tool threads record into it too"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._gauges: Dict[str, float] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+        self.shared_dir: Optional[str] = None
+        self._publisher: Optional[threading.Thread] = None
+        self._stop_publishing = threading.Event()
+
+    def increment(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """Add to a counter"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to its current value"""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """Record one duration in a timing summary (count, sum, max)"""
+        key = _key(name, labels)
+        with self._lock:
+            timing = self._timings.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["sum"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def local_snapshot(self) -> Dict[str, Any]:
+        """Copy of this process's metrics"""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "timings": {key: dict(value) for key, value in self._timings.items()}
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of every metric, for the /metrics endpoint; summed over the workers when shared"""
+        if self.shared_dir is None:
+            return self.local_snapshot()
+        self.publish()
+        merged: Dict[str, Any] = {"counters": {}, "gauges": {}, "timings": {}, "workers": 0}
+        for name in os.listdir(self.shared_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, name)) as f:
+                    worker = json.load(f)
+            except (OSError, ValueError):
+                continue  # Removed by the parent after its worker exited
+            merged["workers"] += 1
+            for kind in ("counters", "gauges"):
+                for key, value in worker[kind].items():
+                    merged[kind][key] = merged[kind].get(key, 0.0) + value
+            for key, timing in worker["timings"].items():
+                total = merged["timings"].setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0})
+                total["count"] += timing["count"]
+                total["sum"] += timing["sum"]
+                total["max"] = max(total["max"], timing["max"])
+        return merged
+
+    def share(self, directory: str) -> None:
+        """Publish to directory, where every worker's metrics are summed; called in the parent before forking"""
+        self.shared_dir = directory
+
+    def publish(self) -> None:
+        """Write this process's metrics to the shared directory"""
+        path = os.path.join(self.shared_dir, f"{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.local_snapshot(), f)
+        os.replace(path + ".tmp", path)
+
+    def start_publishing(self, interval: float) -> None:
+        """Publish every interval seconds from a background thread, in a forked worker"""
+        def publish_periodically():
+            while not self._stop_publishing.wait(interval):
+                self.publish()
+
+        self._stop_publishing.clear()
+        self._publisher = threading.Thread(target=publish_periodically, name="metrics-publisher", daemon=True)
+        self._publisher.start()
+
+    def stop_publishing(self) -> None:
+        if self._publisher is not None:
+            self._stop_publishing.set()
+            self._publisher.join()
+            self._publisher = None
+        self.publish()
+
+
+# Global metrics registry
+metrics = Metrics()
@@ -0,0 +1,258 @@
+"""
+On-demand request profiling for AI Research Assistant
+An admin can run a single request under cProfile by sending X-Admin-Token
+together with X-Profile: 1, or options.profile in the JSON body. The profile
+covers the whole ASGI call (middleware, routing, tool graph, regex parsing,
+chain invocation and response serialization) and the worker threads that join
+it through profile_thread. Results are stored in memory for download from
+/admin/profiles; the response carries X-Profile-Id. Requests without the
+admin header pass straight through.
+
+cProfile records everything the event loop runs meanwhile, other requests
+included, so each profile reports concurrent_requests: how many other
+requests were in flight at its start or began before it finished. Profiles
+with none show the request alone.
+"""
+import cProfile
+import io
+import json
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+from app.config import settings
+from .admin import ADMIN_TOKEN_HEADER, is_admin
+from .metrics import metrics
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_ADMIN_TOKEN_KEY = ADMIN_TOKEN_HEADER.lower().encode()
+_PROFILE_KEY = PROFILE_HEADER.lower().encode()
+_TRUE_VALUES = {b"1", b"true", b"yes", b"on"}
+
+# Profile of the request being processed; copied into asyncio.to_thread workers with the context
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """cProfile data for one request: the event loop thread plus any worker threads that joined it"""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.status: Optional[int] = None
+        self.concurrent_requests = 0  # Other requests whose work may appear in the profile
+        self.stats: Optional[pstats.Stats] = None
+        self._profiler = cProfile.Profile()
+        self._thread_profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        self._profiler.enable()
+
+    def stop(self) -> None:
+        self._profiler.disable()
+        self.duration = time.perf_counter() - self._start
+        stats = pstats.Stats(self._profiler)
+        with self._lock:
+            for profiler in self._thread_profilers:
+                stats.add(profiler)
+            self._thread_profilers = []
+        self.stats = stats
+
+    def add_thread_profiler(self, profiler: cProfile.Profile) -> None:
+        with self._lock:
+            self._thread_profilers.append(profiler)
+
+    def summary(self, limit: Optional[int] = None, sort: str = "cumulative") -> Dict[str, Any]:
+        """Metadata and the top functions as text, in pstats' usual layout"""
+        text = ""
+        if self.stats is not None:
+            out = io.StringIO()
+            self.stats.stream = out
+            self.stats.sort_stats(sort).print_stats(limit or settings.PROFILE_TOP_FUNCTIONS)
+            text = out.getvalue()
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2),
+            "concurrent_requests": self.concurrent_requests,
+            "functions": self.stats.total_calls if self.stats is not None else 0,
+            "stats": text,
+        }
+
+    def dump(self) -> bytes:
+        """The profile in pstats' binary format, readable by pstats.Stats, snakeviz or gprof2dot"""
+        return marshal.dumps(self.stats.stats) if self.stats is not None else b""
+
+
+class ProfileStore:
+    """The most recent request profiles, kept in memory"""
+
+    def __init__(self, max_profiles: int):
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, RequestProfile]" = OrderedDict()
+        self._active = threading.Lock()
+
+    def try_begin(self) -> bool:
+        """cProfile hooks the whole event loop thread, so only one request is profiled at a time"""
+        return self._active.acquire(blocking=False)
+
+    def end(self, profile: RequestProfile) -> None:
+        self._active.release()
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.max_profiles:
+            self._profiles.popitem(last=False)
+        metrics.increment("request_profiles_total")
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [{key: value for key, value in profile.summary().items() if key != "stats"}
+                for profile in reversed(self._profiles.values())]
+
+
+def profile_thread(fn: Callable) -> Callable:
+    """
+    Wrap a function run in a worker thread so it joins the current request's profile
+
+    Before Python 3.12 cProfile only sees the thread it was enabled on; the
+    wrapper runs its own profiler in the worker and merges it when the request
+    finishes. Without an active profile it just calls fn.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _current_profile.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from the request's own profiler and allows only one
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            profile.add_thread_profiler(profiler)
+    return wrapper
+
+
+def _wants_profile_body(body: bytes) -> bool:
+    try:
+        options = json.loads(body).get("options")
+    except (ValueError, AttributeError):
+        return False
+    return isinstance(options, dict) and bool(options.get("profile"))
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling admin requests that ask for it; outermost, so it sees every layer"""
+
+    def __init__(self, app, store: "ProfileStore"):
+        self.app = app
+        self.store = store
+        self.in_flight = 0
+        self._profile: Optional[RequestProfile] = None  # The one being recorded
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.ADMIN_TOKEN:
+            await self.app(scope, receive, send)
+            return
+        self.in_flight += 1
+        if self._profile is not None:
+            self._profile.concurrent_requests += 1
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def _handle(self, scope, receive, send):
+        token = flag = None
+        for name, value in scope["headers"]:
+            if name == _ADMIN_TOKEN_KEY:
+                token = value
+            elif name == _PROFILE_KEY:
+                flag = value
+        if token is None or not is_admin(token.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        wanted = flag is not None and flag.lower() in _TRUE_VALUES
+        if not wanted and scope["method"] == "POST":
+            # options.profile is in the body: read it once and hand it on unchanged
+            messages = []
+            while True:
+                message = await receive()
+                messages.append(message)
+                if message["type"] != "http.request" or not message.get("more_body"):
+                    break
+            wanted = _wants_profile_body(b"".join(m.get("body", b"") for m in messages))
+            receive = _replay(messages, receive)
+        if not wanted:
+            await self.app(scope, receive, send)
+            return
+        if not self.store.try_begin():
+            metrics.increment("request_profiles_skipped_total")
+            await self.app(scope, receive, _with_header(send, PROFILE_ID_HEADER, "busy"))
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        send_profiled = _with_header(send, PROFILE_ID_HEADER, profile.id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+            await send_profiled(message)
+
+        context_token = _current_profile.set(profile)
+        profile.concurrent_requests = self.in_flight - 1
+        self._profile = profile
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            self._profile = None
+            _current_profile.reset(context_token)
+            self.store.end(profile)
+
+
+def _replay(messages: List[Dict[str, Any]], receive):
+    """A receive callable returning already read messages first"""
+    pending = list(messages)
+
+    async def replay_receive():
+        if pending:
+            return pending.pop(0)
+        return await receive()
+    return replay_receive
+
+
+def _with_header(send, name: str, value: str):
+    async def send_with_header(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []),
+                                              (name.lower().encode(), value.encode())]}
+        await send(message)
+    return send_with_header
+
+
+# Global profile store
+profile_store = ProfileStore(settings.PROFILE_MAX_STORED)
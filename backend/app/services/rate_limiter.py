@@ -0,0 +1,298 @@
+"""
+Per-client rate limiting for AI Research Assistant
+GCRA (generic cell rate algorithm) limits per API key or client IP, with state
+in process, in memory shared by the worker processes of a host (API_WORKERS),
+or in Redis when REDIS_URL is set
+"""
+import hashlib
+import math
+import mmap
+import multiprocessing
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from .metrics import metrics
+
+
+@dataclass
+class RateLimit:
+    """`limit` requests per `period` seconds, allowing a burst of `limit`"""
+    limit: int
+    period: float
+
+    @property
+    def emission_interval(self) -> float:
+        return self.period / self.limit
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+
+
+def parse_rate(value: str) -> RateLimit:
+    """Parse "30/60" (requests/seconds; the period defaults to 60)"""
+    count, _, period = value.partition("/")
+    return RateLimit(int(count), float(period or 60))
+
+
+def parse_rate_limits(spec: str) -> Dict[str, RateLimit]:
+    """Parse "/api/query=30/60,/api/jobs=10/60" into path -> RateLimit"""
+    limits = {}
+    for rule in spec.split(","):
+        if not rule.strip():
+            continue
+        path, _, value = rule.partition("=")
+        limits[path.strip()] = parse_rate(value)
+    return limits
+
+
+def _gcra(tat: float, now: float, rate: RateLimit) -> Tuple[RateLimitDecision, Optional[float]]:
+    """
+    One GCRA step
+
+    Returns:
+        The decision and the new theoretical arrival time (None when rejected)
+    """
+    interval = rate.emission_interval
+    new_tat = max(tat, now) + interval
+    allow_at = new_tat - rate.period
+    if now < allow_at:
+        remaining = 0
+        return RateLimitDecision(False, rate.limit, remaining, allow_at - now), None
+    remaining = int(math.floor((rate.period - (new_tat - now)) / interval + 1e-9))
+    return RateLimitDecision(True, rate.limit, max(remaining, 0), 0.0), new_tat
+
+
+class InMemoryRateLimiter:
+    """
+    Process-local GCRA state: one float per client.
+
+    Keys are kept in least-recently-used order so expired entries can be
+    dropped from the front a few at a time, keeping each check O(1).
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._tats: "OrderedDict[str, float]" = OrderedDict()
+
+    async def check(self, key: str, rate: RateLimit) -> RateLimitDecision:
+        now = time.monotonic()
+        decision, new_tat = _gcra(self._tats.get(key, now), now, rate)
+        if new_tat is not None:
+            self._tats[key] = new_tat
+            self._tats.move_to_end(key)
+        self._evict(now)
+        return decision
+
+    def _evict(self, now: float) -> None:
+        for _ in range(2):
+            if not self._tats:
+                return
+            oldest_key, oldest_tat = next(iter(self._tats.items()))
+            if oldest_tat <= now or len(self._tats) > self.max_keys:
+                del self._tats[oldest_key]
+
+    async def close(self) -> None:
+        pass
+
+
+# Shared limiter slot: key digest, theoretical arrival time (monotonic clock, the same in every process)
+_SLOT = struct.Struct("<16sd")
+_EMPTY_DIGEST = bytes(16)
+_MAX_PROBES = 32
+
+
+class SharedMemoryRateLimiter:
+    """
+    GCRA state in an anonymous shared memory map, one slot per client.
+
+    Created before app.serve forks its workers, so every worker process on
+    the host reads and updates the same table under one lock. A slot whose
+    arrival time has passed holds no state and is reused; when every probed
+    slot is live, the one closest to expiring is taken over.
+    """
+
+    def __init__(self, max_keys: int):
+        self.slots = max_keys
+        self._map = mmap.mmap(-1, max_keys * _SLOT.size)
+        self._lock = multiprocessing.Lock()
+
+    async def check(self, key: str, rate: RateLimit) -> RateLimitDecision:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        now = time.monotonic()
+        with self._lock:
+            position = self._find(digest, now)
+            stored, tat = _SLOT.unpack_from(self._map, position)
+            decision, new_tat = _gcra(tat if stored == digest else now, now, rate)
+            if new_tat is not None:
+                _SLOT.pack_into(self._map, position, digest, new_tat)
+        return decision
+
+    def _find(self, digest: bytes, now: float) -> int:
+        """Offset of the slot holding digest, or of the slot to store it in"""
+        start = int.from_bytes(digest[:8], "little") % self.slots
+        free = oldest = None
+        oldest_tat = math.inf
+        for step in range(min(_MAX_PROBES, self.slots)):
+            position = ((start + step) % self.slots) * _SLOT.size
+            stored, tat = _SLOT.unpack_from(self._map, position)
+            if stored == digest:
+                return position
+            if stored == _EMPTY_DIGEST:
+                return free if free is not None else position
+            if free is None and tat <= now:
+                free = position
+            if tat < oldest_tat:
+                oldest, oldest_tat = position, tat
+        return free if free is not None else oldest
+
+    async def close(self) -> None:
+        pass
+
+
+# Atomic GCRA step in Redis; uses the Redis clock so every worker agrees on time
+_GCRA_SCRIPT = """
+local interval = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, tostring(allow_at - now), 0}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, '0', math.floor((period - (new_tat - now)) / interval + 1e-9)}
+"""
+
+
+class RedisRateLimiter:
+    """GCRA state shared by every worker and instance through Redis"""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis  # Only needed when REDIS_URL is configured
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_GCRA_SCRIPT)
+
+    async def check(self, key: str, rate: RateLimit) -> RateLimitDecision:
+        allowed, retry_after, remaining = await self._script(
+            keys=[self.prefix + key], args=[rate.emission_interval, rate.period]
+        )
+        return RateLimitDecision(bool(allowed), rate.limit, max(int(remaining), 0), float(retry_after))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def _key_digest(api_key: bytes) -> str:
+    return hashlib.sha256(api_key).hexdigest()[:32]
+
+
+# Only keys issued through RATE_LIMIT_API_KEYS get their own bucket; any other value is ignored
+_API_KEY_DIGESTS = frozenset(_key_digest(key.strip().encode()) for key in settings.RATE_LIMIT_API_KEYS.split(",")
+                             if key.strip())
+
+
+def client_key(scope) -> str:
+    """
+    Identify the caller by a configured API key (hashed) or, failing that, by client IP
+
+    Both headers are sent by the client, so neither may pick the bucket on its
+    own: an unknown X-API-Key is ignored, and the IP is the X-Forwarded-For
+    entry appended by the outermost of RATE_LIMIT_TRUSTED_PROXIES proxies,
+    which the client cannot forge. Earlier entries are the client's own.
+    """
+    headers = dict(scope.get("headers") or [])
+    api_key = headers.get(b"x-api-key")
+    if api_key and _key_digest(api_key) in _API_KEY_DIGESTS:
+        return "key:" + _key_digest(api_key)
+    trusted = settings.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = headers.get(b"x-forwarded-for")
+    if forwarded and trusted > 0:
+        hops = [hop.strip() for hop in forwarded.decode("latin-1").split(",") if hop.strip()]
+        if len(hops) >= trusted:
+            return "ip:" + hops[-trusted]
+    client = scope.get("client")
+    return "ip:" + (client[0] if client else "unknown")
+
+
+class RateLimitMiddleware:
+    """ASGI middleware enforcing per-route, per-client limits on POST requests"""
+
+    def __init__(self, app, limiter, limits: Optional[Dict[str, RateLimit]] = None):
+        self.app = app
+        self.limiter = limiter
+        self.limits = limits if limits is not None else parse_rate_limits(settings.RATE_LIMITS)
+
+    async def __call__(self, scope, receive, send):
+        rate = self.limits.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if rate is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            decision = await self.limiter.check(f"{scope['path']}:{client_key(scope)}", rate)
+        except Exception as e:
+            # Fail open: losing the limiter must not take the API down
+            print(f"Rate limiter unavailable: {e}")
+            await self.app(scope, receive, send)
+            return
+
+        if not decision.allowed:
+            metrics.increment("rate_limited_total", route=scope["path"])
+            await self._send_rejection(send, decision)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + self._headers(decision)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    def _headers(self, decision: RateLimitDecision):
+        return [
+            (b"x-ratelimit-limit", str(decision.limit).encode()),
+            (b"x-ratelimit-remaining", str(decision.remaining).encode()),
+        ]
+
+    async def _send_rejection(self, send, decision: RateLimitDecision) -> None:
+        body = b'{"status": "error", "detail": "Rate limit exceeded. Please slow down."}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(decision.retry_after))).encode()),
+                (b"access-control-allow-origin", b"*"),
+            ] + self._headers(decision),
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def create_rate_limiter():
+    """Redis-backed limiter when REDIS_URL is set, shared memory with several workers, in-process otherwise"""
+    if settings.REDIS_URL:
+        try:
+            return RedisRateLimiter(settings.REDIS_URL)
+        except ImportError:
+            print("REDIS_URL is set but the redis package is not installed; using local rate limits")
+    if settings.API_WORKERS > 1:
+        return SharedMemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+    return InMemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+
+
+# Global rate limiter
+rate_limiter = create_rate_limiter()
@@ -0,0 +1,180 @@
+"""
+Readiness for AI Research Assistant
+/health only says the process is alive. /ready turns green once warmup has
+primed the database pool, loaded the disk caches, built the chains and,
+optionally, run one synthetic query through a stand-in model, so load
+balancers only route to instances whose first request will not pay for it.
+The database and Redis are optional for answering queries: when they are
+unreachable the steps say so in their details but still pass, as both are
+reconnected on their next use.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from .metrics import metrics
+
+
+async def _warm_database() -> Dict[str, Any]:
+    from .database import database
+
+    try:
+        # Within half the step's budget, so an unreachable server is reported rather than timing the step out
+        await asyncio.wait_for(database.fetchone("SELECT 1"), settings.WARMUP_TIMEOUT / 2)
+    except Exception as e:
+        return {"dialect": database.dialect, "available": False, "error": f"{type(e).__name__}: {e}"}
+    return {"dialect": database.dialect, "available": True}
+
+
+async def _warm_caches() -> Dict[str, Any]:
+    from .cache import tiered_cache
+
+    return await asyncio.to_thread(tiered_cache.warm)
+
+
+def _chain_factories() -> List[Callable]:
+    from .chains import research_chains, tool_chains
+
+    return [
+        research_chains.get_qa_chain, research_chains.get_research_chain, research_chains.get_math_chain,
+        research_chains.get_summary_chain, research_chains.get_reasoning_chain,
+        tool_chains.get_tool_selection_chain, tool_chains.get_search_processing_chain,
+    ]
+
+
+def build_chains() -> Dict[str, Any]:
+    """
+    Compose every chain once, building its schemas and formatting its prompt, as the first request would
+
+    app.serve also runs it before forking workers, which then share the result.
+    """
+    for factory in _chain_factories():
+        chain = factory()
+        chain.get_input_schema()
+        chain.get_output_schema()
+        chain.first.format_messages(**dict.fromkeys(chain.first.input_variables, "warmup"))
+    return {"chains": len(_chain_factories())}
+
+
+async def _warm_chains() -> Dict[str, Any]:
+    return await asyncio.to_thread(build_chains)
+
+
+async def _warm_model() -> Dict[str, Any]:
+    """One research query through the real prompt and parser with a stand-in chat model; no API call is made"""
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from langchain_core.output_parsers import StrOutputParser
+    from .chains import research_chains
+    from .langchain_service import langchain_service
+    from .serialization import dumps
+
+    stand_in = FakeListChatModel(responses=["Warmup answer."], cache=False)
+    template = research_chains.research_template
+    chain = template | stand_in | StrOutputParser()
+    answer = await chain.ainvoke(dict.fromkeys(template.input_variables, "What is 2 + 2?"))
+    calculation = await langchain_service.acalculate_math("2 + 2")
+    dumps({"status": "ok", "summary": answer, "calculation": calculation})
+    return {"answer_chars": len(answer)}
+
+
+_STEP_FUNCTIONS: Dict[str, Callable[[], Awaitable[Dict[str, Any]]]] = {
+    "database": _warm_database,
+    "caches": _warm_caches,
+    "chains": _warm_chains,
+    "model": _warm_model,
+}
+
+
+class Readiness:
+    """Runs the warmup steps in the background and reports whether the instance may take traffic"""
+
+    def __init__(self, steps: List[str], timeout: float, retry_interval: float):
+        unknown = [step for step in steps if step not in _STEP_FUNCTIONS]
+        if unknown:
+            raise ValueError(f"Unknown warmup steps: {', '.join(unknown)}; expected {', '.join(_STEP_FUNCTIONS)}")
+        self.steps = steps
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.status = "starting"
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.draining = False
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready" and not self.draining
+
+    def start(self) -> None:
+        self.started_at = time.time()
+        self._set_status("warming")
+        self._task = asyncio.create_task(self._warm())
+
+    def drain(self) -> None:
+        """
+        Report not ready from now on, so load balancers stop routing here before the listener closes
+
+        Called from the shutdown signal handler, so it only sets a flag and
+        takes no locks.
+        """
+        self.draining = True
+
+    async def stop(self) -> None:
+        self._set_status("stopping")
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _set_status(self, status: str) -> None:
+        self.status = status
+        metrics.set_gauge("ready", 1 if status == "ready" else 0)
+
+    async def _run_step(self, step: str) -> bool:
+        start = time.perf_counter()
+        try:
+            details = await asyncio.wait_for(_STEP_FUNCTIONS[step](), self.timeout)
+            self.results[step] = {"status": "ok", **details}
+        except asyncio.TimeoutError:
+            self.results[step] = {"status": "failed", "error": f"timed out after {self.timeout:g}s"}
+        except Exception as e:
+            self.results[step] = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+        elapsed = time.perf_counter() - start
+        self.results[step]["seconds"] = round(elapsed, 4)
+        metrics.observe("warmup_step_seconds", elapsed, step=step)
+        return self.results[step]["status"] == "ok"
+
+    async def _warm(self) -> None:
+        """Run the steps in order; failed ones are retried until they pass, the instance staying unready meanwhile"""
+        pending = list(self.steps)
+        while True:
+            pending = [step for step in pending if not await self._run_step(step)]
+            if not pending:
+                break
+            self._set_status("failed")
+            errors = "; ".join(f"{step}: {self.results[step]['error']}" for step in pending)
+            print(f"Warmup failed ({errors}); retrying in {self.retry_interval:g}s")
+            await asyncio.sleep(self.retry_interval)
+            self._set_status("warming")
+        self.ready_at = time.time()
+        self._set_status("ready")
+        print(f"Ready after {self.ready_at - self.started_at:.2f}s of warmup ({', '.join(self.steps) or 'no steps'})")
+
+    def state(self) -> Dict[str, Any]:
+        """Readiness and warmup results, for the /ready endpoint"""
+        return {
+            "status": "draining" if self.draining and self.status != "stopping" else self.status,
+            "ready": self.ready,
+            "steps": self.results,
+            "warmup_seconds": round(self.ready_at - self.started_at, 3) if self.ready_at and self.started_at else None,
+        }
+
+
+# Global readiness state
+readiness = Readiness(
+    [step.strip() for step in settings.WARMUP_STEPS.split(",") if step.strip()],
+    settings.WARMUP_TIMEOUT,
+    settings.WARMUP_RETRY_INTERVAL
+)
@@ -0,0 +1,331 @@
+"""
+Semantic query cache for AI Research Assistant
+Embeds queries locally (hashed word and character n-gram TF-IDF, CPU only)
+and finds the cached answer of an earlier paraphrase of a query; the answers
+themselves live in the "answers" namespace of the tiered cache
+"""
+import json
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, FrozenSet, List, Optional, Tuple
+
+from app.config import settings
+from app.startup import constructing
+from .metrics import metrics
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; without it the semantic cache is disabled
+    np = None
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+# Common paraphrases mapped onto one form so they share features
+SYNONYMS = {
+    "recent": "latest", "newest": "latest", "currently": "latest",
+    "development": "news", "developments": "news", "updates": "news", "update": "news", "headlines": "news",
+    "ai": "artificial intelligence", "ml": "machine learning", "llm": "large language model",
+    "llms": "large language model", "explain": "describe", "define": "describe", "meaning": "definition",
+    "biggest": "largest", "fastest": "quickest", "cheapest": "lowest price",
+    "usa": "united states", "uk": "united kingdom",
+}
+# Abbreviations that are only synonyms when capitalized; "us" is also a pronoun
+CASED_SYNONYMS = {"US": "united states"}
+
+STOPWORDS = frozenset("a an the of in on for to is are was were what whats me please tell about do does".split())
+# Words that give the words around them a direction: "EUR to USD" is not "USD to EUR"
+DIRECTION_MARKERS = frozenset("to into from than vs versus".split())
+
+
+def canonical_words(query: str) -> List[str]:
+    words = []
+    for word in _WORD.findall(query):
+        if word in CASED_SYNONYMS:
+            words.extend(CASED_SYNONYMS[word].split())
+            continue
+        word = word.lower()
+        if word in STOPWORDS:
+            continue
+        words.extend(SYNONYMS.get(word, word).split())
+    return words
+
+
+def directed_pairs(query: str) -> FrozenSet[Tuple[str, str]]:
+    """
+    (before, after) pairs of words on either side of a direction marker
+
+    Each word since the previous marker is paired with the first word after
+    the marker, so "is java faster than python" gives (java, python) among
+    others. The embedding hardly changes when such words swap places.
+    """
+    pairs = set()
+    before: List[str] = []
+    words = [word.lower() for word in _WORD.findall(query)]
+    for i, word in enumerate(words):
+        if word not in DIRECTION_MARKERS:
+            if word not in STOPWORDS:
+                before.extend(SYNONYMS.get(word, word).split())
+            continue
+        after = next((SYNONYMS.get(w, w).split()[0] for w in words[i + 1:]
+                      if w not in STOPWORDS and w not in DIRECTION_MARKERS), None)
+        if after is not None:
+            pairs.update((b, after) for b in before if b != after)
+        before = []
+    return frozenset(pairs)
+
+
+def reversed_direction(first: FrozenSet[Tuple[str, str]], second: FrozenSet[Tuple[str, str]]) -> bool:
+    return any((after, before) in second for before, after in first)
+
+
+class HashingEmbedder:
+    """
+    TF-IDF over hashed word unigrams and character trigrams.
+
+    Features are hashed into a fixed number of buckets (with a hash-derived
+    sign to cancel collisions on average), so no vocabulary is stored.
+    Document frequencies are updated as queries are added; stored vectors
+    keep the IDF weights they were embedded with.
+    """
+
+    def __init__(self, dim: int, char_weight: float = 0.5):
+        self.dim = dim
+        self.char_weight = char_weight
+        self._df = np.zeros(dim, dtype=np.float64)
+        self._documents = 0
+
+    def _features(self, query: str) -> Dict[int, float]:
+        words = canonical_words(query)
+        features: Dict[int, float] = {}
+
+        def add(feature: str, weight: float) -> None:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            bucket = digest % self.dim
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            features[bucket] = features.get(bucket, 0.0) + sign * weight
+
+        for word in words:
+            add("w:" + word, 1.0)
+        text = " " + " ".join(words) + " "
+        for i in range(len(text) - 2):
+            add("c:" + text[i:i + 3], self.char_weight)
+        return features
+
+    def embed(self, query: str, update: bool = False) -> "np.ndarray":
+        """L2-normalized vector; update=True also counts the query towards the document frequencies"""
+        features = self._features(query)
+        buckets = np.fromiter(features.keys(), dtype=np.int64, count=len(features))
+        counts = np.fromiter(features.values(), dtype=np.float64, count=len(features))
+        if update:
+            self._df[buckets] += 1
+            self._documents += 1
+        idf = np.log((1 + self._documents) / (1 + self._df[buckets])) + 1
+        vector = np.zeros(self.dim, dtype=np.float32)
+        # Sublinear term frequency keeps repeated n-grams from dominating
+        vector[buckets] = np.sign(counts) * (1 + np.log(np.maximum(np.abs(counts), 1e-9))) * idf
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    key: str  # Key of the answer in the "answers" cache namespace
+    numbers: FrozenSet[str]
+    directions: FrozenSet[Tuple[str, str]]
+    created_at: float
+    hits: int = 0
+
+
+@dataclass
+class SemanticHit:
+    entry: CachedAnswer
+    similarity: float
+
+    def response(self, query: str, cached: Dict[str, Any]) -> Dict[str, Any]:
+        """The cached answer, as stored in the answers namespace, as a response to a new query"""
+        response = dict(cached["response"])
+        response["query"] = query
+        response["cached"] = True
+        response["cache"] = {
+            "type": "semantic",
+            "matched_query": self.entry.query,
+            "similarity": round(self.similarity, 4),
+            "age": round(time.time() - cached["answered_at"], 1),
+        }
+        return response
+
+
+class SemanticCache:
+    """
+    Query vectors in one contiguous float32 matrix searched by cosine top-k.
+
+    Rows are L2-normalized, so one matrix-vector product scores every
+    entry. A match must also mention the same numbers as the query, since
+    "GDP in 2020" and "GDP in 2021" embed almost identically, and must not
+    swap words around a direction marker ("EUR to USD", "USD to EUR"). When full, the
+    least recently used row is evicted and the last row moved into its slot
+    to keep the matrix contiguous. Hits and near misses go to an audit log.
+    Lookups and stores block on the matrix product and the lock, so async
+    callers run them in a thread.
+    """
+
+    def __init__(self, dim: int, max_entries: int, threshold: float, ttl: float, top_k: int = 5,
+                 audit_size: int = 1000, audit_path: Optional[str] = None):
+        self.enabled = np is not None
+        self.dim = dim
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.top_k = top_k
+        self.audit_path = audit_path
+        self.audit: Deque[Dict[str, Any]] = deque(maxlen=audit_size)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: List[CachedAnswer] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if self.enabled:
+            self.embedder = HashingEmbedder(dim)
+            self._vectors = np.zeros((min(max_entries, 1024), dim), dtype=np.float32)
+            self._last_used = np.zeros(len(self._vectors), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, query: str) -> Optional[SemanticHit]:
+        """Closest fresh cached answer at or above the similarity threshold"""
+        if not self.enabled:
+            return None
+        vector = self.embedder.embed(query)
+        numbers = frozenset(_NUMBER.findall(query))
+        directions = directed_pairs(query)
+        now = time.time()
+        with self._lock:
+            size = len(self._entries)
+            if not size:
+                self.misses += 1
+                metrics.increment("semantic_cache_lookups_total", outcome="miss")
+                return None
+            scores = self._vectors[:size] @ vector
+            k = min(self.top_k, size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            neighbors = [(int(i), float(scores[i])) for i in top]
+
+            hit = None
+            for i, score in neighbors:
+                entry = self._entries[i]
+                if score < self.threshold:
+                    break
+                if entry.numbers != numbers or reversed_direction(directions, entry.directions):
+                    continue
+                if now - entry.created_at > self.ttl:
+                    continue
+                entry.hits += 1
+                self._last_used[i] = now
+                hit = SemanticHit(entry, score)
+                break
+            self.hits += hit is not None
+            self.misses += hit is None
+            self._audit(query, hit, neighbors)
+        metrics.increment("semantic_cache_lookups_total", outcome="hit" if hit else "miss")
+        return hit
+
+    def store(self, query: str, key: str) -> None:
+        """Remember a query whose answer was cached under key"""
+        if not self.enabled:
+            return
+        entry = CachedAnswer(query, key, frozenset(_NUMBER.findall(query)), directed_pairs(query), time.time())
+        with self._lock:
+            # Under the lock, so concurrent stores do not lose document frequency updates
+            vector = self.embedder.embed(query, update=True)
+            if key in self._rows:
+                row = self._rows[key]
+                self._vectors[row] = vector
+                self._last_used[row] = entry.created_at
+                self._entries[row] = entry
+                return
+            size = len(self._entries)
+            if size >= self.max_entries:
+                self._evict(int(np.argmin(self._last_used[:size])))
+                size -= 1
+            if size == len(self._vectors):
+                self._grow()
+            self._vectors[size] = vector
+            self._last_used[size] = entry.created_at
+            self._entries.append(entry)
+            self._rows[key] = size
+
+    def _grow(self) -> None:
+        capacity = min(len(self._vectors) * 2, self.max_entries)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:len(self._vectors)] = self._vectors
+        last_used = np.zeros(capacity, dtype=np.float64)
+        last_used[:len(self._last_used)] = self._last_used
+        self._vectors, self._last_used = vectors, last_used
+
+    def _evict(self, i: int) -> None:
+        last = len(self._entries) - 1
+        del self._rows[self._entries[i].key]
+        if i != last:
+            self._vectors[i] = self._vectors[last]
+            self._last_used[i] = self._last_used[last]
+            self._entries[i] = self._entries[last]
+            self._rows[self._entries[i].key] = i
+        self._entries.pop()
+        self.evictions += 1
+        metrics.increment("semantic_cache_evictions_total")
+
+    def _audit(self, query: str, hit: Optional[SemanticHit], neighbors: List[Any]) -> None:
+        """Record hits and near misses, so the threshold can be tuned from real traffic"""
+        best = neighbors[0][1] if neighbors else 0.0
+        if hit is None and best < self.threshold - settings.SEMANTIC_CACHE_AUDIT_MARGIN:
+            return
+        record = {
+            "time": time.time(),
+            "query": query,
+            "hit": hit is not None,
+            "matched_query": hit.entry.query if hit else None,
+            "similarity": round(hit.similarity if hit else best, 4),
+            "neighbors": [
+                {"query": self._entries[i].query, "similarity": round(score, 4)} for i, score in neighbors[:3]
+            ],
+        }
+        self.audit.append(record)
+        if self.audit_path:
+            try:
+                with open(self.audit_path, "a", encoding="utf-8") as audit_file:
+                    audit_file.write(json.dumps(record) + "\n")
+            except OSError as e:
+                print(f"Semantic cache audit write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Global semantic cache
+with constructing("semantic_cache"):
+    semantic_cache = SemanticCache(
+        settings.SEMANTIC_CACHE_DIM,
+        settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        settings.SEMANTIC_CACHE_THRESHOLD,
+        settings.SEMANTIC_CACHE_TTL,
+        audit_path=settings.SEMANTIC_CACHE_AUDIT_PATH
+    )
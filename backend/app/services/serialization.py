@@ -0,0 +1,74 @@
+"""
+JSON serialization for AI Research Assistant responses
+Uses orjson or msgspec when installed, with the standard library as fallback
+"""
+import json
+from decimal import Decimal
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _default(obj: Any) -> Any:
+    """Types the fast encoders do not handle natively"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _select_dumps() -> Callable[[Any], bytes]:
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        return lambda obj: orjson.dumps(obj, default=_default, option=option)
+    if msgspec is not None:
+        encoder = msgspec.json.Encoder(enc_hook=_default)
+        return encoder.encode
+    return _stdlib_dumps
+
+
+JSON_BACKEND = "orjson" if orjson is not None else "msgspec" if msgspec is not None else "json"
+_fast_dumps = _select_dumps()
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes
+
+    The fast encoders reject a few values the standard library accepts
+    (e.g. integers beyond 64 bits from the calculator); those payloads fall
+    back to the standard library encoder.
+    """
+    try:
+        return _fast_dumps(obj)
+    except (TypeError, OverflowError, ValueError):
+        return _stdlib_dumps(obj)
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the fastest available encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,117 @@
+"""
+Async tool execution graph for AI Research Assistant
+Runs independent tools concurrently under a shared deadline, with per-tool timeouts
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+
+@dataclass
+class ToolResult:
+    """Outcome of a single tool in the graph"""
+    name: str
+    ok: bool
+    value: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+@dataclass
+class ToolNode:
+    """A tool and the tools whose results it depends on"""
+    name: str
+    func: Callable[[Dict[str, ToolResult]], Awaitable[Any]]
+    depends_on: List[str] = field(default_factory=list)
+    timeout: Optional[float] = None
+
+
+class ToolGraph:
+    """
+    Small DAG of async tools.
+
+    Each node starts as soon as all of its dependencies have finished, so
+    independent tools (e.g. search and math) run concurrently. A failed or
+    timed-out dependency does not block its dependents; they receive the
+    failed ToolResult and decide how to degrade.
+    """
+
+    def __init__(self, default_timeout: Optional[float] = None):
+        self.default_timeout = default_timeout
+        self.nodes: Dict[str, ToolNode] = {}
+
+    def add(self, name: str, func: Callable[[Dict[str, ToolResult]], Awaitable[Any]],
+            depends_on: Iterable[str] = (), timeout: Optional[float] = None) -> "ToolGraph":
+        """
+        Register a tool in the graph
+
+        Args:
+            name: Unique tool name
+            func: Coroutine function receiving the results of its dependencies
+            depends_on: Names of tools that must finish first
+            timeout: Per-tool timeout in seconds (defaults to the graph default)
+
+        Returns:
+            The graph, for chaining
+        """
+        if name in self.nodes:
+            raise ValueError(f"Tool '{name}' is already registered")
+        for dep in depends_on:
+            if dep not in self.nodes:
+                raise ValueError(f"Tool '{name}' depends on unknown tool '{dep}'")
+        self.nodes[name] = ToolNode(name, func, list(depends_on), timeout)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    async def _run_node(self, node: ToolNode, done: Dict[str, asyncio.Task]) -> ToolResult:
+        dep_results = {}
+        for dep in node.depends_on:
+            dep_results[dep] = await done[dep]
+
+        start = time.perf_counter()
+        timeout = node.timeout if node.timeout is not None else self.default_timeout
+        try:
+            value = await asyncio.wait_for(node.func(dep_results), timeout)
+            return ToolResult(node.name, True, value, elapsed=time.perf_counter() - start)
+        except asyncio.TimeoutError:
+            return ToolResult(node.name, False, error=f"{node.name} timed out after {timeout:.1f}s",
+                              elapsed=time.perf_counter() - start)
+        except Exception as e:
+            return ToolResult(node.name, False, error=f"{node.name} failed: {str(e)}",
+                              elapsed=time.perf_counter() - start)
+
+    async def run(self, deadline: Optional[float] = None) -> Dict[str, ToolResult]:
+        """
+        Execute every tool in the graph
+
+        Args:
+            deadline: Overall budget in seconds for the whole graph
+
+        Returns:
+            dict: Tool name to ToolResult, in registration order. Tools still
+            running when the deadline expires are cancelled and reported as failed.
+        """
+        tasks: Dict[str, asyncio.Task] = {}
+        # Nodes are registered after their dependencies, so insertion order is topological
+        for name, node in self.nodes.items():
+            tasks[name] = asyncio.ensure_future(self._run_node(node, tasks))
+
+        try:
+            if tasks:
+                await asyncio.wait(tasks.values(), timeout=deadline)
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        results = {}
+        for name, task in tasks.items():
+            if task.done() and not task.cancelled():
+                results[name] = task.result()
+            else:
+                results[name] = ToolResult(name, False, error=f"{name} exceeded the {deadline:.1f}s tool deadline",
+                                           elapsed=deadline or 0.0)
+        return results
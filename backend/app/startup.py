@@ -0,0 +1,21 @@
+"""
+Startup timing for AI Research Assistant
+Records how long each global service object took to construct at import,
+for the startup report (python -m benchmarks.startup) and /ready
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+# Seconds per global, in construction order
+construction_times: Dict[str, float] = {}
+
+
+@contextmanager
+def constructing(name: str) -> Iterator[None]:
+    """Time the construction of the global called name"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        construction_times[name] = time.perf_counter() - start
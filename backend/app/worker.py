@@ -0,0 +1,54 @@
+"""
+Standalone job worker process.
+
+Runs queued research jobs from the shared job store, so long tasks can be
+processed outside the API process:
+
+    python -m app.worker --concurrency 4
+
+Set JOB_WORKERS=0 on the API service when dedicated workers are used.
+"""
+import argparse
+import asyncio
+import signal
+
+from app.config import settings
+from app.services.database import database
+from app.services.history_store import history_store
+from app.services.answer_index import answer_index
+from app.services.cache import tiered_cache
+from app.services.job_queue import JobWorkerPool, default_handlers, job_queue
+
+
+async def run_worker(concurrency: int) -> None:
+    pool = JobWorkerPool(job_queue, default_handlers(), concurrency)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await history_store.start()
+    if settings.ANSWER_INDEX_ENABLED and history_store.running:
+        await answer_index.load(history_store)
+    await pool.start()
+    print(f"Job worker started with {concurrency} slots ({database.dialect})")
+    try:
+        await stop.wait()
+    finally:
+        await pool.stop()
+        await history_store.stop()
+        await database.close()
+        tiered_cache.close()
+        print("Job worker stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run AI Research Assistant background job workers")
+    parser.add_argument("--concurrency", type=int, default=max(settings.JOB_WORKERS, 1),
+                        help="Number of jobs to run at the same time")
+    args = parser.parse_args()
+    asyncio.run(run_worker(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+Benchmarks for the AI Research Assistant backend.
+Run from the backend directory, e.g. `python -m benchmarks.serialization`
+or `python -m benchmarks.api_query` (offline, against fake providers).
+"""
@@ -0,0 +1,203 @@
+"""
+Offline /api/query benchmark
+
+Runs request scenarios against the app in process, with the search
+providers replaced by local fake servers (in a child process, so they do
+not count towards CPU time) and Gemini replaced by a latency-model chat
+model. Reports throughput, latency percentiles and CPU time per request;
+the JSON report can be compared against an earlier one.
+
+    python -m benchmarks.api_query [--scenario research] [--requests 200] [--concurrency 8]
+                                   [--json report.json] [--baseline old.json]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import report as reporting
+from benchmarks.fakes import LatencyChatModel, configure_environment, install_chat_model, start_providers_process
+
+TOPICS = [
+    "quantum computing", "battery storage", "solar panels", "large language models", "vaccine research",
+    "electric vehicles", "chip manufacturing", "climate policy", "fusion energy", "space launches",
+    "cyber security", "semiconductor exports", "wind power", "gene editing", "robotics",
+]
+
+NO_CACHE = {"use_cache": False, "use_index": False}
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    query: Callable[[int, random.Random], str]  # request number (unique across scenarios) -> query text
+    options: Dict[str, Any] = field(default_factory=dict)
+    providers: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # /_profile overrides per provider
+
+
+SCENARIOS = {
+    scenario.name: scenario for scenario in [
+        Scenario(
+            "research", "Unique search questions: Serper, then the research chain",
+            lambda i, rng: f"latest news on {rng.choice(TOPICS)} (case {i})", NO_CACHE),
+        Scenario(
+            "research_fallback", "Serper rate limited (429): every search falls back to DuckDuckGo",
+            lambda i, rng: f"latest news on {rng.choice(TOPICS)} (case {i})", NO_CACHE,
+            {"serper": {"error_rate": 1.0}}),
+        Scenario(
+            "research_cached", "A small set of repeated questions, answered from the caches",
+            lambda i, rng: f"latest news on {TOPICS[i % 5]}"),
+        Scenario(
+            "reasoning", "Explanations without search: the reasoning chain alone",
+            lambda i, rng: f"explain why {rng.choice(TOPICS)} matters (case {i})", NO_CACHE),
+        Scenario(
+            "local_math", "Plain arithmetic answered by the local calculator",
+            lambda i, rng: f"{rng.randint(1, 999)} * {rng.randint(1, 99)} + {rng.randint(1, 9999)}"),
+    ]
+}
+
+
+async def set_profiles(client, control: Dict[str, str], overrides: Dict[str, Dict[str, Any]],
+                       defaults: Dict[str, Dict[str, Any]]) -> None:
+    for name, url in control.items():
+        await client.post(url, json={**defaults[name], **overrides.get(name, {})})
+
+
+async def provider_requests(client, control: Dict[str, str]) -> Dict[str, int]:
+    return {name: (await client.get(url)).json()["requests"] for name, url in control.items()}
+
+
+async def run_scenario(app_client, control_client, control: Dict[str, str], defaults: Dict[str, Dict[str, Any]],
+                       scenario: Scenario, requests: int, concurrency: int, warmup: int, seed: int,
+                       numbers: "itertools.count") -> Dict[str, Any]:
+    await set_profiles(control_client, control, scenario.providers, defaults)
+    rng = random.Random(seed)
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    async def one(record: bool) -> None:
+        # Request numbers continue across scenarios, so one scenario never hits another's cached searches or prompts
+        body = {"query": scenario.query(next(numbers), rng), "options": scenario.options}
+        async with slots:
+            start = time.perf_counter()
+            try:
+                response = await app_client.post("/api/query", json=body)
+                ok = response.status_code == 200 and "error" not in response.json()
+                outcome = "ok" if ok else f"http_{response.status_code}" if response.status_code != 200 else "error"
+            except Exception as e:
+                outcome = type(e).__name__
+            elapsed = time.perf_counter() - start
+        if record:
+            if outcome == "ok":
+                latencies.append(elapsed)
+            else:
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    await asyncio.gather(*(one(False) for _ in range(warmup)))
+    before = await provider_requests(control_client, control)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(one(True) for _ in range(requests)))
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    after = await provider_requests(control_client, control)
+
+    return {
+        "description": scenario.description,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "duration_s": round(wall, 3),
+        "throughput_rps": round(requests / wall, 2) if wall else 0.0,
+        "latency_ms": reporting.latency_summary(latencies),
+        "cpu_ms_per_request": round(cpu / requests * 1000, 3) if requests else 0.0,
+        "provider_requests": {name: after[name] - before[name] for name in after},
+    }
+
+
+async def run(scenarios: List[Scenario], requests: int, concurrency: int, warmup: int, seed: int,
+              model: LatencyChatModel, control: Dict[str, str]) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+    from app.config import settings
+
+    install_chat_model(model)
+    result: Dict[str, Any] = {
+        "benchmark": "api_query",
+        "environment": reporting.environment(),
+        "config": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "warmup": warmup,
+            "seed": seed,
+            "model": {name: getattr(model, name) for name in ("first_token", "per_token", "output_tokens", "sigma")},
+            "admission_max_concurrency": settings.ADMISSION_MAX_CONCURRENCY,
+        },
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as app_client, \
+            httpx.AsyncClient(timeout=10) as control_client:
+        defaults = {name: (await control_client.get(url)).json()["profile"] for name, url in control.items()}
+        result["config"]["providers"] = defaults
+        numbers = itertools.count()
+        for scenario in scenarios:
+            print(f"Running {scenario.name} ({requests} requests, concurrency {concurrency})...")
+            entry = await run_scenario(app_client, control_client, control, defaults, scenario,
+                                       requests, concurrency, warmup, seed, numbers)
+            result["scenarios"][scenario.name] = entry
+            print_scenario(scenario.name, entry)
+    return result
+
+
+def print_scenario(name: str, entry: Dict[str, Any]) -> None:
+    latency = entry["latency_ms"]
+    print(f"  {name:<18} {entry['throughput_rps']:>8.2f} req/s  p50 {latency['p50']:>8.1f} ms  "
+          f"p95 {latency['p95']:>8.1f} ms  p99 {latency['p99']:>8.1f} ms  "
+          f"cpu {entry['cpu_ms_per_request']:>7.2f} ms/req  errors {sum(entry['errors'].values())}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable); all by default")
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--model-first-token", type=float, default=0.4, help="Fake model time to first token (s)")
+    parser.add_argument("--model-per-token", type=float, default=0.004, help="Fake model time per output token (s)")
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    process, provider_env, control = start_providers_process(args.seed)
+    try:
+        with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir:
+            configure_environment(provider_env, workdir)
+            model = LatencyChatModel(first_token=args.model_first_token, per_token=args.model_per_token, seed=args.seed)
+            scenarios = [SCENARIOS[name] for name in (args.scenario or SCENARIOS)]
+            result = asyncio.run(run(scenarios, args.requests, args.concurrency, args.warmup, args.seed, model, control))
+    finally:
+        process.terminate()
+
+    if args.baseline:
+        print(f"\nCompared with {args.baseline}:")
+        fields = ["throughput_rps", "latency_ms.p50", "latency_ms.p95", "latency_ms.p99", "cpu_ms_per_request"]
+        for line in reporting.compare(reporting.load_json(args.baseline), result, "scenarios", fields):
+            print(line)
+    if args.json_path:
+        reporting.write_json(result, args.json_path)
+
+
+if __name__ == "__main__":
+    main()
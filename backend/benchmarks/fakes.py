@@ -0,0 +1,423 @@
+"""
+Local stand-ins for the external services
+
+Fake Serper, DuckDuckGo and Wikipedia HTTP servers answering in each
+provider's response format, with configurable latency and error
+distributions, and a chat model with a latency model in place of Gemini.
+The servers can also be started on their own, or together with the
+backend under uvicorn (fake model installed):
+
+    python -m benchmarks.fakes [--port 8900]
+    python -m benchmarks.fakes --backend 8000 [--workdir DIR] [--workers 4] [--provider-median 0.05]
+
+Each server accepts POST /_profile with a JSON body such as
+{"median": 0.3, "sigma": 0.5, "error_rate": 0.1} to change its behaviour
+while running; GET /_profile returns the profile and the request count.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+WORDS = (
+    "research model energy market policy climate quantum network system data growth study report "
+    "analysis science health economy security technology software hardware battery solar launch "
+    "release update trend result evidence survey review index forecast signal"
+).split()
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Log-normal latency with an error rate
+
+    median is the typical latency in seconds; sigma widens the tail
+    (p99 is about median * exp(2.33 * sigma)).
+    """
+    median: float = 0.2
+    sigma: float = 0.4
+    error_rate: float = 0.0
+    error_status: int = 500
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(self.sigma * rng.gauss(0.0, 1.0))
+
+    def update(self, values: Dict[str, Any]) -> None:
+        for name, value in values.items():
+            if hasattr(self, name):
+                setattr(self, name, type(getattr(self, name))(value))
+
+
+def fake_text(seed: str, words: int) -> str:
+    """Deterministic filler text derived from seed"""
+    rng = random.Random(hashlib.blake2b(seed.encode("utf-8"), digest_size=8).digest())
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def serper_response(query: str, results: int = 10) -> Dict[str, Any]:
+    return {
+        "searchParameters": {"q": query, "type": "search", "engine": "google"},
+        "knowledgeGraph": {"title": query.title(), "description": fake_text(query + "kg", 40)},
+        "organic": [
+            {
+                "title": f"{query.title()} - result {i + 1}",
+                "link": f"https://example.com/{urllib.parse.quote(query)}/{i + 1}",
+                "snippet": fake_text(f"{query}{i}", 35),
+                "position": i + 1,
+            }
+            for i in range(results)
+        ],
+    }
+
+
+def duckduckgo_html(query: str, results: int = 10) -> str:
+    items = "\n".join(
+        f'<div class="result results_links web-result"><div class="links_main">'
+        f'<h2 class="result__title"><a rel="nofollow" class="result__a" href="https://example.com/{i}">'
+        f'{query.title()} - result {i + 1}</a></h2>'
+        f'<a class="result__snippet" href="https://example.com/{i}">{fake_text(f"{query}{i}", 30)}</a>'
+        f'</div></div>'
+        for i in range(results)
+    )
+    return f"<html><head><title>{query} at DuckDuckGo</title></head><body>{items}</body></html>"
+
+
+def wikipedia_summary(title: str) -> Dict[str, Any]:
+    return {
+        "type": "standard",
+        "title": title.replace("_", " ").title(),
+        "extract": fake_text(title, 80),
+        "content_urls": {"desktop": {"page": f"https://en.wikipedia.org/wiki/{urllib.parse.quote(title)}"}},
+    }
+
+
+class _ProviderHandler(BaseHTTPRequestHandler):
+    server: "FakeProviderServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _handle(self, method: str) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        body = self._body()
+        if url.path == "/_profile":
+            if method == "POST":
+                self.server.profile.update(json.loads(body or b"{}"))
+            state = {"profile": asdict(self.server.profile), "requests": self.server.requests}
+            self._send(200, json.dumps(state).encode(), "application/json")
+            return
+        status, payload, content_type = self.server.respond(method, url, body)
+        self._send(status, payload, content_type)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    """One fake provider on 127.0.0.1; subclasses produce the provider's responses"""
+
+    daemon_threads = True
+    name = "provider"
+
+    def __init__(self, profile: Optional[LatencyProfile] = None, port: int = 0, seed: int = 0):
+        super().__init__(("127.0.0.1", port), _ProviderHandler)
+        self.profile = profile or LatencyProfile()
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> "FakeProviderServer":
+        self._thread = threading.Thread(target=self.serve_forever, name=f"fake-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def respond(self, method: str, url: urllib.parse.SplitResult, body: bytes):
+        with self._lock:
+            self.requests += 1
+            delay = self.profile.sample(self._rng)
+            failed = self._rng.random() < self.profile.error_rate
+        time.sleep(delay)
+        if failed:
+            return self.profile.error_status, b'{"message": "fake provider error"}', "application/json"
+        return self.success(method, url, body)
+
+    def success(self, method: str, url: urllib.parse.SplitResult, body: bytes):
+        raise NotImplementedError
+
+
+class FakeSerper(FakeProviderServer):
+    name = "serper"
+
+    def __init__(self, profile: Optional[LatencyProfile] = None, port: int = 0, seed: int = 0):
+        super().__init__(profile or LatencyProfile(0.35, 0.35, error_status=429), port, seed)
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/search"
+
+    def success(self, method, url, body):
+        query = json.loads(body or b"{}").get("q", "")
+        return 200, json.dumps(serper_response(query)).encode(), "application/json"
+
+
+class FakeDuckDuckGo(FakeProviderServer):
+    name = "duckduckgo"
+
+    def __init__(self, profile: Optional[LatencyProfile] = None, port: int = 0, seed: int = 1):
+        # DuckDuckGo answers 202 when it declines to serve a result page
+        super().__init__(profile or LatencyProfile(0.6, 0.5, error_status=202), port, seed)
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/html/"
+
+    def success(self, method, url, body):
+        query = urllib.parse.parse_qs(url.query).get("q", [""])[0]
+        return 200, duckduckgo_html(query).encode(), "text/html; charset=utf-8"
+
+
+class FakeWikipedia(FakeProviderServer):
+    name = "wikipedia"
+
+    def __init__(self, profile: Optional[LatencyProfile] = None, port: int = 0, seed: int = 2):
+        super().__init__(profile or LatencyProfile(0.15, 0.3, error_status=404), port, seed)
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/api/rest_v1/page/summary/"
+
+    def success(self, method, url, body):
+        title = urllib.parse.unquote(url.path.rsplit("/", 1)[-1])
+        return 200, json.dumps(wikipedia_summary(title)).encode(), "application/json"
+
+
+class FakeProviders:
+    """All three fake providers, with the settings that point the search service at them"""
+
+    def __init__(self, seed: int = 0):
+        self.serper = FakeSerper(seed=seed)
+        self.duckduckgo = FakeDuckDuckGo(seed=seed + 1)
+        self.wikipedia = FakeWikipedia(seed=seed + 2)
+
+    def __iter__(self):
+        return iter((self.serper, self.duckduckgo, self.wikipedia))
+
+    def start(self) -> "FakeProviders":
+        for server in self:
+            server.start()
+        return self
+
+    def stop(self) -> None:
+        for server in self:
+            server.stop()
+
+    def environment(self) -> Dict[str, str]:
+        """Environment variables for app.config.Settings"""
+        return {
+            "SERPER_API_KEY": "benchmark",
+            "SERPER_URL": self.serper.url,
+            "DUCKDUCKGO_URLS": self.duckduckgo.url,
+            "WIKIPEDIA_SUMMARY_URL": self.wikipedia.url,
+        }
+
+    def request_counts(self) -> Dict[str, int]:
+        return {server.name: server.requests for server in self}
+
+
+def _serve(seed: int, ready) -> None:
+    providers = FakeProviders(seed).start()
+    ready.put({
+        "environment": providers.environment(),
+        "control": {server.name: f"{server.base_url}/_profile" for server in providers},
+    })
+    threading.Event().wait()
+
+
+def start_providers_process(seed: int = 0):
+    """
+    Run the fake providers in a child process, so their CPU time does not
+    count towards the backend being measured
+
+    Returns:
+        tuple: The process, the search service environment and the /_profile URL per provider
+    """
+    ready = multiprocessing.get_context("spawn").Queue()
+    process = multiprocessing.get_context("spawn").Process(target=_serve, args=(seed, ready), daemon=True)
+    process.start()
+    info = ready.get(timeout=30)
+    return process, info["environment"], info["control"]
+
+
+class LatencyChatModel(BaseChatModel):
+    """
+    Chat model stand-in for Gemini
+
+    Latency is a time to first token plus a per-token generation time for
+    output_tokens tokens, scaled by log-normal jitter. The reply is filler
+    text derived from the prompt, so identical prompts get identical replies.
+    """
+    first_token: float = 0.4
+    per_token: float = 0.004
+    output_tokens: int = 250
+    sigma: float = 0.25
+    error_rate: float = 0.0
+    seed: int = 0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "benchmark-latency"
+
+    def _rng(self) -> random.Random:
+        self.calls += 1
+        return random.Random(self.seed * 1_000_003 + self.calls)
+
+    def _plan(self, messages: List[BaseMessage]):
+        rng = self._rng()
+        delay = (self.first_token + self.per_token * self.output_tokens) * math.exp(self.sigma * rng.gauss(0.0, 1.0))
+        prompt = "\n".join(str(message.content) for message in messages)
+        failed = rng.random() < self.error_rate
+        return delay, failed, fake_text(prompt, self.output_tokens)
+
+    def _result(self, failed: bool, text: str) -> ChatResult:
+        if failed:
+            raise RuntimeError("Fake model error")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        delay, failed, text = self._plan(messages)
+        time.sleep(delay)
+        return self._result(failed, text)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        delay, failed, text = self._plan(messages)
+        await asyncio.sleep(delay)
+        return self._result(failed, text)
+
+
+def configure_environment(provider_env: Dict[str, str], workdir: str) -> None:
+    """Settings for an isolated, offline app instance; must run before app is imported"""
+    os.environ.update(provider_env)
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.update({
+        "SQLITE_PATH": os.path.join(workdir, "benchmark.db"),
+        "CACHE_DIR": os.path.join(workdir, "cache"),
+        "CACHE_WARM_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "NO_PROXY": "127.0.0.1,localhost",
+    })
+
+
+def install_chat_model(model: BaseChatModel) -> None:
+    """Replace every Gemini model the app holds with model"""
+    from app.services.chains import research_chains, tool_chains
+    from app.services.langchain_service import langchain_service
+
+    research_chains.llm = research_chains.pro_llm = model
+    tool_chains.llm = model
+    langchain_service.llm = model
+
+
+def serve_backend(port: int, seed: int = 0, first_token: float = 0.4, per_token: float = 0.004,
+                  workdir: Optional[str] = None, workers: int = 1, provider_median: Optional[float] = None) -> None:
+    """
+    Run the backend on port with fake providers (in a child process) and the fake model
+
+    The database and disk caches go to workdir, or to a temporary directory
+    removed on exit. With workers above 1 the backend forks that many worker
+    processes (app.serve). SIGTERM shuts the backend down gracefully.
+    """
+    process, provider_env, control = start_providers_process(seed)
+    if provider_median is not None:
+        for url in control.values():
+            request = urllib.request.Request(url, data=json.dumps({"median": provider_median}).encode(),
+                                             headers={"Content-Type": "application/json"})
+            urllib.request.urlopen(request, timeout=10).close()
+    try:
+        with tempfile.TemporaryDirectory(prefix="benchmark-") as temporary:
+            configure_environment(provider_env, workdir or temporary)
+            os.environ["API_WORKERS"] = str(workers)
+            from app.main import app
+            from app.serve import serve
+
+            install_chat_model(LatencyChatModel(first_token=first_token, per_token=per_token, seed=seed))
+            serve(app, "127.0.0.1", port, workers, log_level="warning")
+    finally:
+        process.terminate()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900, help="Serper port; DuckDuckGo and Wikipedia use the next two")
+    parser.add_argument("--backend", type=int, metavar="PORT", help="Also run the backend on this port")
+    parser.add_argument("--model-first-token", type=float, default=0.4)
+    parser.add_argument("--model-per-token", type=float, default=0.004)
+    parser.add_argument("--workdir", help="Keep the backend's database and disk caches here")
+    parser.add_argument("--workers", type=int, default=1, help="Backend worker processes")
+    parser.add_argument("--provider-median", type=float, help="Typical latency of every fake provider, in seconds")
+    args = parser.parse_args()
+
+    if args.backend:
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        serve_backend(args.backend, first_token=args.model_first_token, per_token=args.model_per_token,
+                      workdir=args.workdir, workers=args.workers, provider_median=args.provider_median)
+        return
+
+    servers = [FakeSerper(port=args.port), FakeDuckDuckGo(port=args.port + 1), FakeWikipedia(port=args.port + 2)]
+    for server in servers:
+        server.start()
+    print("Fake providers running; point the backend at them with:")
+    print(f"  SERPER_API_KEY=benchmark SERPER_URL={servers[0].url}")
+    print(f"  DUCKDUCKGO_URLS={servers[1].url} WIKIPEDIA_SUMMARY_URL={servers[2].url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
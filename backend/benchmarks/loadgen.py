@@ -0,0 +1,328 @@
+"""
+Open-loop load generator for the API
+
+Requests arrive as a Poisson process at each offered rate, whether or not
+earlier ones have finished, so a slow server cannot slow the arrivals down
+(a closed loop would). Latency is measured from each request's scheduled
+arrival time, which corrects for coordinated omission: time a request spent
+waiting because the generator or the server fell behind is counted. The
+latency from the actual send ("service") is reported alongside.
+
+The traffic mixes /api/query (research, reasoning, Q&A and math questions
+from a corpus), the NDJSON stream of /api/query/batch (time to first line and
+to the end of the stream) and /api/calculate/batch. By default one backend
+worker is started under uvicorn with the fake providers and model from
+benchmarks.fakes; --url targets a running server instead.
+
+    python -m benchmarks.loadgen --rates 1,2,4,8 --duration 30 [--url http://127.0.0.1:8000]
+                                 [--mix query=0.8,stream=0.1,batch=0.1] [--corpus queries.txt]
+                                 [--json report.json] [--baseline old.json]
+
+The JSON report has sorted keys and rounded values, so reports from two
+commits can be compared with diff or --baseline.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import report as reporting
+from benchmarks.report import LatencyHistogram
+
+# Built-in corpus: (kind, query); "{n}" is replaced by a request number for queries that must not hit caches
+CORPUS: List[Tuple[str, str]] = [
+    ("research", "latest news on quantum computing"),
+    ("research", "what is the current state of fusion energy"),
+    ("research", "recent developments in battery storage {n}"),
+    ("research", "latest electric vehicle sales figures {n}"),
+    ("research", "who is leading in chip manufacturing today"),
+    ("reasoning", "explain why interest rates affect housing prices"),
+    ("reasoning", "compare solar and wind power for a small town {n}"),
+    ("reasoning", "analyze the tradeoffs of remote work {n}"),
+    ("qa", "write a haiku about autumn"),
+    ("qa", "give me three names for a coffee shop {n}"),
+    ("math", "12 * 7 + 3"),
+    ("math", "(1500 - 250) / 5 + {n}"),
+]
+
+DEFAULT_MIX = "query=0.8,stream=0.1,batch=0.1"
+
+
+def load_corpus(path: Optional[str]) -> List[Tuple[str, str]]:
+    """One query per line, optionally prefixed with "kind<TAB>"; the built-in corpus when no path is given"""
+    if not path:
+        return CORPUS
+    corpus = []
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.strip():
+                kind, _, query = line.rpartition("\t")
+                corpus.append((kind or "query", query))
+    return corpus
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"query", "stream", "batch"}
+    if unknown:
+        raise SystemExit(f"Unknown request types in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+class Recorder:
+    """Histograms and outcome counts for one offered rate"""
+
+    def __init__(self):
+        self.corrected: Dict[str, LatencyHistogram] = {}
+        self.service: Dict[str, LatencyHistogram] = {}
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+        self.send_lag = LatencyHistogram()
+
+    def record(self, name: str, outcome: str, corrected: Optional[float] = None, service: Optional[float] = None):
+        counts = self.outcomes.setdefault(name, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if outcome == "ok":
+            self.corrected.setdefault(name, LatencyHistogram()).record(corrected)
+            self.service.setdefault(name, LatencyHistogram()).record(service)
+
+
+class LoadGenerator:
+    def __init__(self, client, corpus: List[Tuple[str, str]], mix: Dict[str, float], seed: int,
+                 batch_size: int, stream_size: int, max_outstanding: int):
+        self.client = client
+        self.corpus = corpus
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.numbers = itertools.count()
+        self.batch_size = batch_size
+        self.stream_size = stream_size
+        self.slots = asyncio.Semaphore(max_outstanding)
+
+    def _query(self) -> Tuple[str, str]:
+        kind, query = self.rng.choice(self.corpus)
+        return kind, query.replace("{n}", str(next(self.numbers)))
+
+    def _request(self) -> Tuple[str, Any]:
+        """Pick the next request: its histogram name, and a function sending it (or the queries of a stream)"""
+        request_type = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        if request_type == "query":
+            kind, query = self._query()
+            return f"query:{kind}", lambda: self.client.post("/api/query", json={"query": query})
+        if request_type == "batch":
+            expressions = [f"{self.rng.randint(1, 999)} * {self.rng.randint(1, 99)} + {self.rng.random():.3f}"
+                           for _ in range(self.batch_size)]
+            return "batch", lambda: self.client.post("/api/calculate/batch", json={"expressions": expressions})
+        return "stream", [self._query()[1] for _ in range(self.stream_size)]
+
+    async def _send(self, name: str, request, scheduled: float, recorder: Recorder) -> None:
+        async with self.slots:
+            sent = time.perf_counter()
+            recorder.send_lag.record(sent - scheduled)
+            try:
+                if name == "stream":
+                    await self._stream(request, scheduled, sent, recorder)
+                    return
+                response = await request()
+                outcome = "ok" if response.status_code == 200 else f"http_{response.status_code}"
+            except Exception as e:
+                outcome = type(e).__name__
+            done = time.perf_counter()
+            recorder.record(name, outcome, done - scheduled, done - sent)
+
+    async def _stream(self, queries: List[str], scheduled: float, sent: float, recorder: Recorder) -> None:
+        first_line = None
+        try:
+            async with self.client.stream("POST", "/api/query/batch", json={"queries": queries}) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    recorder.record("stream", f"http_{response.status_code}")
+                    return
+                async for line in response.aiter_lines():
+                    if line and first_line is None:
+                        first_line = time.perf_counter()
+        except Exception as e:
+            recorder.record("stream", type(e).__name__)
+            return
+        done = time.perf_counter()
+        recorder.record("stream", "ok", done - scheduled, done - sent)
+        if first_line is not None:
+            recorder.record("stream:first_line", "ok", first_line - scheduled, first_line - sent)
+
+    async def run(self, rate: float, duration: float) -> Dict[str, Any]:
+        """Offer Poisson arrivals at rate for duration seconds, then wait for the stragglers"""
+        recorder = Recorder()
+        tasks = []
+        start = time.perf_counter()
+        scheduled = start
+        while True:
+            scheduled += self.rng.expovariate(rate)
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name, request = self._request()
+            tasks.append(asyncio.create_task(self._send(name, request, scheduled, recorder)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        return self._summarize(rate, duration, elapsed, len(tasks), recorder)
+
+    def _summarize(self, rate: float, duration: float, elapsed: float, sent: int, recorder: Recorder) -> Dict[str, Any]:
+        completed = sum(counts.get("ok", 0) for name, counts in recorder.outcomes.items()
+                        if name != "stream:first_line")
+        errors = sum(count for name, counts in recorder.outcomes.items() if name != "stream:first_line"
+                     for outcome, count in counts.items() if outcome != "ok")
+        overall = LatencyHistogram()
+        for name, histogram in recorder.corrected.items():
+            if name != "stream:first_line":
+                overall.merge(histogram)
+        return {
+            "offered_rps": rate,
+            "requests": sent,
+            "achieved_rps": round(completed / elapsed, 2) if elapsed else 0.0,
+            "duration_s": round(elapsed, 1),
+            "error_rate": round(errors / sent, 4) if sent else 0.0,
+            "latency_ms": overall.summary(),
+            "send_lag_ms": recorder.send_lag.summary(),
+            "endpoints": {
+                name: {
+                    "outcomes": recorder.outcomes.get(name, {}),
+                    "latency_ms": recorder.corrected[name].summary() if name in recorder.corrected else None,
+                    "service_ms": recorder.service[name].summary() if name in recorder.service else None,
+                }
+                for name in sorted(recorder.outcomes)
+            },
+        }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_ready(client, timeout: float = 60.0) -> None:
+    """Wait until the backend has finished its warmup, so the first requests measured are not cold ones"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit("Backend did not become ready")
+
+
+async def run(args, base_url: str) -> Dict[str, Any]:
+    import httpx
+
+    corpus = load_corpus(args.corpus)
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_outstanding, max_keepalive_connections=args.max_outstanding)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        await wait_for_ready(client)
+        result: Dict[str, Any] = {
+            "benchmark": "loadgen",
+            "environment": reporting.environment(),
+            "config": {
+                "target": "spawned" if not args.url else "external",
+                "duration_s": args.duration,
+                "mix": mix,
+                "corpus": args.corpus or "built-in",
+                "seed": args.seed,
+                "slo_p99_ms": args.slo_p99_ms,
+                "max_error_rate": args.max_error_rate,
+            },
+            "rates": {},
+        }
+        sustained = None
+        for rate in args.rates:
+            generator = LoadGenerator(client, corpus, mix, args.seed, args.batch_size, args.stream_size,
+                                      args.max_outstanding)
+            print(f"Offering {rate:g} req/s for {args.duration:g}s...")
+            entry = await generator.run(rate, args.duration)
+            entry["within_slo"] = (entry["latency_ms"]["p99"] <= args.slo_p99_ms
+                                   and entry["error_rate"] <= args.max_error_rate)
+            result["rates"][f"{rate:g}"] = entry
+            print_rate(entry)
+            if entry["within_slo"]:
+                sustained = rate
+            if args.cooldown:
+                await asyncio.sleep(args.cooldown)
+        result["max_sustained_rps"] = sustained
+        print(f"\nHighest offered rate within the SLO (p99 <= {args.slo_p99_ms:g} ms, "
+              f"errors <= {args.max_error_rate:.1%}): {sustained if sustained is not None else 'none'}")
+        return result
+
+
+def print_rate(entry: Dict[str, Any]) -> None:
+    latency = entry["latency_ms"]
+    print(f"  offered {entry['offered_rps']:>6g}  achieved {entry['achieved_rps']:>7.2f} req/s  "
+          f"p50 {latency['p50']:>8.1f}  p99 {latency['p99']:>8.1f}  p99.9 {latency['p999']:>8.1f} ms  "
+          f"errors {entry['error_rate']:.1%}  {'ok' if entry['within_slo'] else 'over SLO'}")
+    for name, endpoint in entry["endpoints"].items():
+        if endpoint["latency_ms"]:
+            print(f"    {name:<20} p50 {endpoint['latency_ms']['p50']:>8.1f}  p99 {endpoint['latency_ms']['p99']:>8.1f} ms"
+                  f"  (service p99 {endpoint['service_ms']['p99']:.1f} ms)  {endpoint['outcomes']}")
+        else:
+            print(f"    {name:<20} {endpoint['outcomes']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Running backend to target; by default one is started with fake providers")
+    parser.add_argument("--rates", default="1,2,4,8", help="Offered arrival rates (req/s), run in order")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of arrivals per rate")
+    parser.add_argument("--cooldown", type=float, default=2.0, help="Pause between rates")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weights of query, stream and batch requests")
+    parser.add_argument("--corpus", help="Query file: one per line, optionally 'kind<TAB>query'")
+    parser.add_argument("--stream-size", type=int, default=4, help="Queries per /api/query/batch stream")
+    parser.add_argument("--batch-size", type=int, default=200, help="Expressions per /api/calculate/batch")
+    parser.add_argument("--max-outstanding", type=int, default=1000, help="Client-side cap on requests in flight")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--slo-p99-ms", type=float, default=5000.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rates.split(",")]
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.fakes", "--backend", str(port)], cwd=backend_dir)
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        result = asyncio.run(run(args, base_url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    if args.baseline:
+        print(f"\nCompared with {args.baseline}:")
+        fields = ["achieved_rps", "error_rate", "latency_ms.p50", "latency_ms.p99", "latency_ms.p999"]
+        for line in reporting.compare(reporting.load_json(args.baseline), result, "rates", fields):
+            print(line)
+    if args.json_path:
+        reporting.write_json(result, args.json_path)
+
+
+if __name__ == "__main__":
+    main()
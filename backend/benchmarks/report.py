@@ -0,0 +1,150 @@
+"""
+Shared report helpers for the benchmarks: latency summaries and histograms,
+environment details and comparison of two JSON reports
+"""
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def latency_summary(seconds: Iterable[float]) -> Dict[str, float]:
+    """p50/p95/p99, mean and max in milliseconds"""
+    values = sorted(seconds)
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    return {
+        "p50": round(percentile(values, 0.50) * 1000, 2),
+        "p95": round(percentile(values, 0.95) * 1000, 2),
+        "p99": round(percentile(values, 0.99) * 1000, 2),
+        "mean": round(sum(values) / len(values) * 1000, 2),
+        "max": round(values[-1] * 1000, 2),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Where and on what a report was produced, so reports from different machines are not compared blindly"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def write_json(report: Dict[str, Any], path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"\nReport written to {path}")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], section: str,
+            fields: List[str]) -> List[str]:
+    """
+    Lines comparing the entries of one report section with a baseline report
+
+    fields are dotted paths into each entry, e.g. "latency_ms.p99".
+    """
+    lines = []
+    for name, entry in current.get(section, {}).items():
+        old_entry = baseline.get(section, {}).get(name)
+        if old_entry is None:
+            lines.append(f"  {name}: not in baseline")
+            continue
+        changes = []
+        for field in fields:
+            old, new = _lookup(old_entry, field), _lookup(entry, field)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            changes.append(f"{field} {old:g} -> {new:g} ({change})")
+        lines.append(f"  {name}: " + "; ".join(changes))
+    return lines
+
+
+def _lookup(entry: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = entry
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value if isinstance(value, (int, float)) else None
+
+
+def load_json(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram (about 1% relative precision)
+
+    Constant memory regardless of sample count and mergeable across runs,
+    like an HDR histogram; percentiles report the upper bound of a bucket.
+    """
+
+    def __init__(self, lowest: float = 0.0001, precision: float = 0.01):
+        self.lowest = lowest
+        self._log_base = math.log1p(precision)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = max(math.ceil(math.log(max(seconds, self.lowest) / self.lowest) / self._log_base), 0)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def value_at(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+        target = max(math.ceil(fraction * self.count), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(self.lowest * math.exp(index * self._log_base), self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Percentiles in milliseconds"""
+        return {
+            "count": self.count,
+            "p50": round(self.value_at(0.50) * 1000, 1),
+            "p90": round(self.value_at(0.90) * 1000, 1),
+            "p95": round(self.value_at(0.95) * 1000, 1),
+            "p99": round(self.value_at(0.99) * 1000, 1),
+            "p999": round(self.value_at(0.999) * 1000, 1),
+            "max": round(self.max * 1000, 1),
+            "mean": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+        }
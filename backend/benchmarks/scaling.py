@@ -0,0 +1,221 @@
+"""
+Throughput scaling with API worker processes
+
+Starts the backend with the fake providers and model (benchmarks.fakes) at
+each worker count in turn (API_WORKERS, forked by app.serve) and drives it
+with a closed loop of --concurrency clients sending /api/query requests back
+to back. Fake latencies are short, so throughput is bound by CPU (routing,
+result parsing, chains, JSON) rather than by waiting. Reports requests per
+second, latency, speedup and efficiency over one worker, the cache hit ratio
+summed across workers, and each worker's memory: resident (RSS) and
+proportional (PSS), in which pages still shared with the pre-fork parent
+count fractionally.
+
+    python -m benchmarks.scaling [--workers 1,2,4] [--duration 20] [--concurrency 32]
+                                 [--json report.json] [--baseline old.json]
+
+Workers beyond the number of cores cannot add throughput, and the load
+generator needs CPU too, so its share of a core is reported alongside.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import report as reporting
+from benchmarks.loadgen import CORPUS, free_port, wait_for_ready
+from benchmarks.report import LatencyHistogram
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Admission control is per worker; raised so it does not cap one worker below its CPU limit
+BACKEND_ENVIRONMENT = {
+    "ADMISSION_MAX_CONCURRENCY": "256",
+    "ADMISSION_MAX_QUEUE": "1024",
+    "ADMISSION_LATENCY_SLO": "600",
+}
+
+
+def default_worker_counts() -> str:
+    cpus = os.cpu_count() or 1
+    counts = [n for n in (1, 2, 4, 8, 16, 32) if n < cpus] + [cpus]
+    return ",".join(str(n) for n in counts)
+
+
+def _forked_workers(parent: int) -> List[int]:
+    """Children of the backend process running the same command line (not the fake providers)"""
+    with open(f"/proc/{parent}/cmdline", "rb") as f:
+        command = f.read()
+    with open(f"/proc/{parent}/task/{parent}/children") as f:
+        children = [int(pid) for pid in f.read().split()]
+    workers = []
+    for pid in children:
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if f.read() == command:
+                    workers.append(pid)
+        except OSError:
+            continue
+    return workers
+
+
+def worker_memory(parent: int) -> List[Dict[str, float]]:
+    """RSS, PSS and private memory in MB of each worker; a single worker is the backend process itself"""
+    try:
+        pids = _forked_workers(parent) or [parent]
+    except OSError:
+        return []  # Needs Linux /proc
+    workers = []
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.split()[-1] == "kB"}
+        except OSError:
+            continue
+        workers.append({
+            "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+            "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+            "private_mb": round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1),
+        })
+    return workers
+
+
+async def drive(client, concurrency: int, duration: float, seed: int) -> Dict[str, Any]:
+    """Closed loop: each client sends its next query as soon as the previous answer arrives"""
+    rng = random.Random(seed)
+    numbers = itertools.count()
+    histogram = LatencyHistogram()
+    outcomes: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        while time.perf_counter() < deadline:
+            query = rng.choice(CORPUS)[1].replace("{n}", str(next(numbers)))
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/query", json={"query": query})
+                outcome = "ok" if response.status_code == 200 else f"http_{response.status_code}"
+            except Exception as e:
+                outcome = type(e).__name__
+            if outcome == "ok":
+                histogram.record(time.perf_counter() - start)
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    cpu_start, start = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": sum(outcomes.values()),
+        "throughput_rps": round(histogram.count / elapsed, 2),
+        "error_rate": round(1 - histogram.count / max(sum(outcomes.values()), 1), 4),
+        "outcomes": outcomes,
+        "latency_ms": histogram.summary(),
+        "loadgen_cpu": round((time.process_time() - cpu_start) / elapsed, 2),
+    }
+
+
+def cache_hit_ratio(snapshot: Dict[str, Any]) -> Optional[float]:
+    """Share of cache lookups answered by any tier, over every worker"""
+    hits = misses = 0.0
+    for key, value in snapshot.get("counters", {}).items():
+        if key.startswith("cache_requests_total"):
+            if 'outcome="miss"' in key:
+                misses += value
+            else:
+                hits += value
+    return round(hits / (hits + misses), 3) if hits + misses else None
+
+
+async def measure(args, workers: int) -> Dict[str, Any]:
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fakes", "--backend", str(port), "--workers", str(workers),
+         "--model-first-token", str(args.model_latency), "--model-per-token", "0",
+         "--provider-median", str(args.provider_latency)],
+        cwd=BACKEND_DIR, env={**os.environ, **BACKEND_ENVIRONMENT},
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout,
+                                     limits=limits) as client:
+            await wait_for_ready(client, timeout=120.0)
+            # Every worker warms up separately; give each its first requests before measuring
+            await drive(client, args.concurrency, args.warmup, args.seed + 1)
+            entry = await drive(client, args.concurrency, args.duration, args.seed)
+            await asyncio.sleep(args.metrics_wait)
+            snapshot = (await client.get("/metrics")).json()
+        entry["workers_reporting"] = snapshot.get("workers", 1)
+        entry["cache_hit_ratio"] = cache_hit_ratio(snapshot)
+        entry["memory"] = worker_memory(server.pid)
+        return entry
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def print_entry(workers: int, entry: Dict[str, Any]) -> None:
+    latency = entry["latency_ms"]
+    memory = entry["memory"]
+    print(f"  {workers:>3} workers  {entry['throughput_rps']:>8.1f} req/s  speedup {entry['speedup']:>5.2f}x  "
+          f"efficiency {entry['efficiency']:>5.0%}  p50 {latency['p50']:>7.1f}  p99 {latency['p99']:>7.1f} ms  "
+          f"errors {entry['error_rate']:.1%}  cache hits {entry['cache_hit_ratio'] or 0:.0%}  "
+          f"loadgen {entry['loadgen_cpu']:.0%} of a core")
+    if memory:
+        print(f"               per worker: RSS {sum(m['rss_mb'] for m in memory) / len(memory):.0f} MB, "
+              f"PSS {sum(m['pss_mb'] for m in memory) / len(memory):.0f} MB, "
+              f"private {sum(m['private_mb'] for m in memory) / len(memory):.0f} MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=default_worker_counts(), help="Worker counts to measure, in order")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds measured per worker count")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of unmeasured load first")
+    parser.add_argument("--concurrency", type=int, default=32, help="Clients in the closed loop")
+    parser.add_argument("--model-latency", type=float, default=0.02, help="Fake model time to first token")
+    parser.add_argument("--provider-latency", type=float, default=0.01, help="Typical fake search provider latency")
+    parser.add_argument("--metrics-wait", type=float, default=1.5, help="Pause for the workers to publish metrics")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+    counts = [int(n) for n in args.workers.split(",")]
+
+    result: Dict[str, Any] = {
+        "benchmark": "scaling",
+        "environment": reporting.environment(),
+        "config": {"duration_s": args.duration, "concurrency": args.concurrency, "seed": args.seed,
+                   "model_latency_s": args.model_latency, "provider_latency_s": args.provider_latency},
+        "workers": {},
+    }
+    print(f"{os.cpu_count()} CPUs; measuring {', '.join(map(str, counts))} workers")
+    base = None
+    for workers in counts:
+        entry = asyncio.run(measure(args, workers))
+        base = base or entry["throughput_rps"] / workers
+        entry["speedup"] = round(entry["throughput_rps"] / (base or 1), 2)
+        entry["efficiency"] = round(entry["speedup"] / workers, 3)
+        result["workers"][str(workers)] = entry
+        print_entry(workers, entry)
+
+    if args.baseline:
+        print(f"\nCompared with {args.baseline}:")
+        fields = ["throughput_rps", "speedup", "latency_ms.p50", "latency_ms.p99"]
+        for line in reporting.compare(reporting.load_json(args.baseline), result, "workers", fields):
+            print(line)
+    if args.json_path:
+        reporting.write_json(result, args.json_path)
+
+
+if __name__ == "__main__":
+    main()
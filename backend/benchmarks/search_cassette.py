@@ -0,0 +1,158 @@
+"""
+Search provider cassettes: record once, replay deterministically
+
+record sends each query to every search provider (Serper, DuckDuckGo with its
+endpoint fallbacks, Wikipedia) and stores the responses in a gzip cassette; with --fake
+the local fake providers stand in for the real ones. replay runs the same
+queries against the cassette and reports provider call latency at the
+recorded pace scaled by --speed, and with --speed 0 the parsing cost alone.
+
+    python -m benchmarks.search_cassette record --cassette search.jsonl.gz [--queries queries.txt] [--fake]
+    python -m benchmarks.search_cassette replay --cassette search.jsonl.gz [--speed 1.0] [--repeat 3]
+                                                [--json report.json] [--baseline old.json]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import report as reporting
+
+QUERIES = [
+    "latest developments in quantum computing",
+    "solid state battery breakthroughs",
+    "who invented the transistor",
+    "history of the printing press",
+    "electric vehicle sales this year",
+    "how does CRISPR gene editing work",
+    "James Webb Space Telescope discoveries",
+    "what is retrieval augmented generation",
+    "fusion energy record",
+    "semiconductor export controls news",
+]
+
+
+def load_queries(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def configure(cassette: str, mode: str, speed: float, workdir: str) -> None:
+    """Point the search service at the cassette with every cache off; must run before app is imported"""
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+    os.environ.update({
+        "SEARCH_CASSETTE": os.path.abspath(cassette),
+        "SEARCH_CASSETTE_MODE": mode,
+        "SEARCH_CASSETTE_SPEED": str(speed),
+        "CACHE_ENABLED": "false",
+        "SQLITE_PATH": os.path.join(workdir, "benchmark.db"),
+        "CACHE_WARM_ENABLED": "false",
+        "NO_PROXY": "127.0.0.1,localhost",
+    })
+    if mode == "replay":
+        # Requests only match the cassette at the provider URLs it was recorded from
+        with gzip.open(cassette, "rt", encoding="utf-8") as f:
+            os.environ.update(json.loads(f.readline()).get("settings", {}))
+        # The key never leaves the process on replay, but Serper is skipped without one
+        os.environ.setdefault("SERPER_API_KEY", "replay")
+
+
+def provider_calls(service) -> Dict[str, Callable[[str], str]]:
+    return {
+        "serper": service.search_with_serper,
+        "duckduckgo": service.search_with_duckduckgo_fallback,
+        "wikipedia": service.search_with_wikipedia_fallback,
+    }
+
+
+def record(queries: List[str]) -> None:
+    from app.services.enhanced_search_service import enhanced_search_service
+
+    for query in queries:
+        for name, call in provider_calls(enhanced_search_service).items():
+            start = time.perf_counter()
+            result = call(query)
+            print(f"  {name:<11} {(time.perf_counter() - start) * 1000:>8.1f} ms  {query!r}: {result[:60]!r}")
+
+
+def replay(queries: List[str], repeat: int, speed: float) -> Dict[str, Any]:
+    from app.services.enhanced_search_service import enhanced_search_service
+
+    cassette = enhanced_search_service.session.get_adapter("https://").cassette
+    result: Dict[str, Any] = {
+        "benchmark": "search_cassette",
+        "environment": reporting.environment(),
+        "config": {"cassette": os.path.basename(cassette.path), "interactions": len(cassette),
+                   "queries": len(queries), "repeat": repeat, "speed": speed},
+        "providers": {},
+    }
+    for name, call in provider_calls(enhanced_search_service).items():
+        latencies, cpu = [], 0.0
+        for _ in range(repeat):
+            for query in queries:
+                cpu_start, start = time.process_time(), time.perf_counter()
+                call(query)
+                latencies.append(time.perf_counter() - start)
+                cpu += time.process_time() - cpu_start
+        result["providers"][name] = {
+            "calls": len(latencies),
+            "latency_ms": reporting.latency_summary(latencies),
+            "cpu_ms_per_call": round(cpu / len(latencies) * 1000, 3) if latencies else 0.0,
+        }
+    result["config"]["misses"] = cassette.misses
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--cassette", required=True, help="gzip JSON-lines cassette file")
+    parser.add_argument("--queries", help="File with one query per line; a built-in set by default")
+    parser.add_argument("--fake", action="store_true", help="Record from the local fake providers")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay pace; 0 replays without delays")
+    parser.add_argument("--repeat", type=int, default=3, help="Replays of the query set")
+    parser.add_argument("--json", dest="json_path", help="Write the replay report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries) if args.queries else QUERIES
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir:
+        configure(args.cassette, args.mode, args.speed, workdir)
+        if args.mode == "record":
+            process = None
+            if args.fake:
+                from benchmarks.fakes import start_providers_process
+
+                process, provider_env, _ = start_providers_process()
+                os.environ.update(provider_env)
+            try:
+                record(queries)
+            finally:
+                if process is not None:
+                    process.terminate()
+            print(f"\nRecorded to {args.cassette}")
+            return
+        result = replay(queries, args.repeat, args.speed)
+
+    for name, entry in result["providers"].items():
+        latency = entry["latency_ms"]
+        print(f"  {name:<11} {entry['calls']:>5} calls  p50 {latency['p50']:>8.1f} ms  p95 {latency['p95']:>8.1f} ms  "
+              f"p99 {latency['p99']:>8.1f} ms  cpu {entry['cpu_ms_per_call']:>7.3f} ms/call")
+    print(f"  unmatched requests: {result['config']['misses']}")
+    if args.baseline:
+        print(f"\nCompared with {args.baseline}:")
+        fields = ["latency_ms.p50", "latency_ms.p95", "latency_ms.p99", "cpu_ms_per_call"]
+        for line in reporting.compare(reporting.load_json(args.baseline), result, "providers", fields):
+            print(line)
+    if args.json_path:
+        reporting.write_json(result, args.json_path)
+
+
+if __name__ == "__main__":
+    main()
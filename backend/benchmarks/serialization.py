@@ -0,0 +1,135 @@
+"""
+Serialization and compression benchmark
+
+Measures encode time for the JSON backends available here and bytes on the
+wire for each negotiated encoding, using payloads shaped like /api/query
+answers, /api/query/batch NDJSON streams and job results.
+
+    python -m benchmarks.serialization [--iterations 2000] [--json report.json]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import serialization
+from app.services.compression import brotli
+
+PARAGRAPH = (
+    "Recent developments in quantum computing include improved error correction, "
+    "larger superconducting qubit arrays and early demonstrations of logical qubits "
+    "outperforming physical ones. Researchers caution that practical advantage for "
+    "commercial workloads is still several years away. "
+)
+
+
+def research_answer(paragraphs: int = 30) -> Dict[str, Any]:
+    """A long /api/query response"""
+    return {
+        "status": "ok",
+        "summary": "\n\n".join(f"{i + 1}. {PARAGRAPH}" for i in range(paragraphs)),
+        "query": "What are the latest developments in quantum computing?",
+        "tools_available": ["Search", "Calculator", "Reasoning"],
+        "tools_used": ["Search"],
+        "chain_used": "Research Chain (with context)",
+    }
+
+
+def batch_lines(count: int = 50) -> List[Dict[str, Any]]:
+    """NDJSON lines of a /api/query/batch stream"""
+    return [{"index": i, **research_answer(3)} for i in range(count)]
+
+
+def job_result() -> Dict[str, Any]:
+    """A GET /api/jobs/{id} response for a finished parallel job"""
+    return {
+        "job_id": "0" * 32,
+        "status": "succeeded",
+        "mode": "parallel",
+        "query": "Compare renewable energy sources",
+        "attempts": 1,
+        "created_at": time.time(),
+        "started_at": time.time(),
+        "finished_at": time.time(),
+        "result": research_answer(60),
+        "error": None,
+    }
+
+
+def time_per_call(func: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def encoders() -> Dict[str, Callable[[Any], bytes]]:
+    available = {"json": lambda obj: json.dumps(obj).encode("utf-8")}
+    if serialization.orjson is not None:
+        available["orjson"] = serialization.orjson.dumps
+    if serialization.msgspec is not None:
+        available["msgspec"] = serialization.msgspec.json.encode
+    available[f"serialization.dumps ({serialization.JSON_BACKEND})"] = serialization.dumps
+    return available
+
+
+def run(iterations: int) -> Dict[str, Any]:
+    payloads = {
+        "query_answer": research_answer(),
+        "batch_ndjson": batch_lines(),
+        "job_result": job_result(),
+    }
+    report: Dict[str, Any] = {"iterations": iterations, "payloads": {}}
+
+    for name, payload in payloads.items():
+        is_stream = isinstance(payload, list)
+        entry: Dict[str, Any] = {"encode_us": {}, "bytes": {}}
+        for encoder_name, encode in encoders().items():
+            if is_stream:
+                func = lambda: b"".join(encode(line) + b"\n" for line in payload)
+            else:
+                func = lambda: encode(payload)
+            entry["encode_us"][encoder_name] = round(time_per_call(func, iterations) * 1e6, 2)
+
+        body = (b"".join(serialization.dumps(line) + b"\n" for line in payload) if is_stream
+                else serialization.dumps(payload))
+        entry["bytes"]["identity"] = len(body)
+        entry["bytes"]["gzip-6"] = len(gzip.compress(body, 6))
+        compress_iterations = max(iterations // 10, 1)
+        entry["compress_us"] = {"gzip-6": round(time_per_call(lambda: gzip.compress(body, 6), compress_iterations) * 1e6, 2)}
+        if brotli is not None:
+            entry["bytes"]["br-4"] = len(brotli.compress(body, quality=4))
+            entry["compress_us"]["br-4"] = round(
+                time_per_call(lambda: brotli.compress(body, quality=4), compress_iterations) * 1e6, 2)
+        report["payloads"][name] = entry
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args.iterations)
+    for name, entry in report["payloads"].items():
+        print(f"\n{name}")
+        for encoder_name, micros in entry["encode_us"].items():
+            print(f"  encode {encoder_name:<32} {micros:>10.2f} us")
+        for encoding, size in entry["bytes"].items():
+            extra = f"  ({entry['compress_us'][encoding]:.0f} us)" if encoding in entry["compress_us"] else ""
+            print(f"  bytes  {encoding:<32} {size:>10}{extra}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Startup profile: import time per module and construction time per global
+
+Imports app.main in fresh interpreters under `python -X importtime` and
+reports the process wall time, the time to import app.main (and the modules
+it defers to the first request), how long each global service object took to
+construct (recorded by app.startup), and where import time goes by package
+and module. Budgets make it fail (exit
+status 1) when startup regresses, e.g. in a deploy hook:
+
+    python -m benchmarks.startup [--runs 3] [--budget 8] [--budgets research_chains=0.5,langchain=2]
+                                 [--json report.json] [--baseline old.json]
+
+--budget bounds the median import of app.main in seconds; --budgets bounds
+globals, packages or modules by name.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import report as reporting
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported on first use rather than with app.main; their cost lands on the first request instead
+DEFERRED_IMPORTS = ["app.services.enhanced_search_service"]
+
+CHILD = """
+import importlib, json, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+from app.startup import construction_times
+at_import = list(construction_times)
+start = time.perf_counter()
+for module in %r:
+    importlib.import_module(module)
+deferred = time.perf_counter() - start
+print(json.dumps({"import_s": elapsed, "deferred_s": deferred, "globals": construction_times,
+                  "deferred_globals": [name for name in construction_times if name not in at_import]}))
+""" % DEFERRED_IMPORTS
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) per line of -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return modules
+
+
+def run_once() -> Dict[str, Any]:
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, timeout=300)
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{completed.stderr[-4000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_s"] = wall
+    result["modules"] = parse_importtime(completed.stderr)
+    return result
+
+
+def _median_ms(values: List[float]) -> float:
+    return round(statistics.median(values) * 1000, 2)
+
+
+def summarize(runs: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """Medians across runs; modules and packages by self time (import work not done by their imports)"""
+    module_self: Dict[str, List[float]] = {}
+    module_cumulative: Dict[str, List[float]] = {}
+    package_self: Dict[str, List[float]] = {}
+    for run in runs:
+        packages: Dict[str, float] = {}
+        for name, self_us, cumulative_us in run["modules"]:
+            module_self.setdefault(name, []).append(self_us / 1e6)
+            module_cumulative.setdefault(name, []).append(cumulative_us / 1e6)
+            package = name.split(".")[0]
+            packages[package] = packages.get(package, 0.0) + self_us / 1e6
+        for package, seconds in packages.items():
+            package_self.setdefault(package, []).append(seconds)
+
+    modules = sorted(module_self, key=lambda name: statistics.median(module_self[name]), reverse=True)[:top]
+    packages = sorted(package_self, key=lambda name: statistics.median(package_self[name]), reverse=True)[:top]
+    return {
+        "totals": {
+            "startup": {
+                "process_ms": _median_ms([run["process_s"] for run in runs]),
+                "import_ms": _median_ms([run["import_s"] for run in runs]),
+                "deferred_import_ms": _median_ms([run["deferred_s"] for run in runs]),
+                "modules": len(runs[0]["modules"]),
+            },
+        },
+        "globals": {name: {"ms": _median_ms([run["globals"].get(name, 0.0) for run in runs]),
+                           "deferred": name in runs[0]["deferred_globals"]}
+                    for name in runs[0]["globals"]},
+        "packages": {name: {"self_ms": _median_ms(package_self[name])} for name in packages},
+        "modules": {name: {"self_ms": _median_ms(module_self[name]),
+                           "cumulative_ms": _median_ms(module_cumulative[name])} for name in modules},
+    }
+
+
+def parse_budgets(value: str) -> Dict[str, float]:
+    budgets = {}
+    for item in value.split(","):
+        if item.strip():
+            name, _, seconds = item.partition("=")
+            budgets[name.strip()] = float(seconds)
+    return budgets
+
+
+def check_budgets(summary: Dict[str, Any], total: float, budgets: Dict[str, float]) -> List[str]:
+    """
+    Budget violations in a summary of every module
+
+    Names are looked up among globals (construction time), then packages
+    (self import time), then modules (cumulative import time).
+    """
+    failures = []
+    import_ms = summary["totals"]["startup"]["import_ms"]
+    if total and import_ms > total * 1000:
+        failures.append(f"import app.main took {import_ms:.0f} ms (budget {total * 1000:.0f} ms)")
+    for name, seconds in budgets.items():
+        if name in summary["globals"]:
+            measured = summary["globals"][name]["ms"]
+        elif name in summary["packages"]:
+            measured = summary["packages"][name]["self_ms"]
+        elif name in summary["modules"]:
+            measured = summary["modules"][name]["cumulative_ms"]
+        else:
+            failures.append(f"{name}: not found among globals, packages or modules")
+            continue
+        if measured > seconds * 1000:
+            failures.append(f"{name} took {measured:.0f} ms (budget {seconds * 1000:.0f} ms)")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to start; medians are reported")
+    parser.add_argument("--top", type=int, default=15, help="Packages and modules listed")
+    parser.add_argument("--budget", type=float, default=0.0, help="Seconds allowed for importing app.main")
+    parser.add_argument("--budgets", default="", help="name=seconds,... for globals, packages or modules")
+    parser.add_argument("--json", dest="json_path", help="Write the report to this file")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    runs = []
+    for i in range(args.runs):
+        runs.append(run_once())
+        print(f"Run {i + 1}/{args.runs}: import app.main {runs[-1]['import_s'] * 1000:.0f} ms, "
+              f"process {runs[-1]['process_s'] * 1000:.0f} ms")
+    result: Dict[str, Any] = {
+        "benchmark": "startup",
+        "environment": reporting.environment(),
+        "config": {"runs": args.runs},
+        **summarize(runs, args.top),
+    }
+
+    totals = result["totals"]["startup"]
+    print(f"\nStartup (median of {args.runs}): process {totals['process_ms']:.0f} ms, "
+          f"import app.main {totals['import_ms']:.0f} ms, {totals['modules']} modules")
+    print(f"Deferred imports ({', '.join(DEFERRED_IMPORTS)}): {totals['deferred_import_ms']:.0f} ms on first use")
+    print("\nGlobals:")
+    for name, entry in result["globals"].items():
+        print(f"  {name:<28} {entry['ms']:>9.1f} ms" + ("  (deferred)" if entry["deferred"] else ""))
+    print("\nPackages by self import time:")
+    for name, entry in result["packages"].items():
+        print(f"  {name:<28} {entry['self_ms']:>9.1f} ms")
+    print("\nModules by self import time:")
+    for name, entry in result["modules"].items():
+        print(f"  {name:<48} {entry['self_ms']:>9.1f} ms  (cumulative {entry['cumulative_ms']:.1f} ms)")
+
+    if args.baseline:
+        print(f"\nCompared with {args.baseline}:")
+        baseline = reporting.load_json(args.baseline)
+        for line in reporting.compare(baseline, result, "totals", ["process_ms", "import_ms", "deferred_import_ms"]):
+            print(line)
+        for line in reporting.compare(baseline, result, "globals", ["ms"]):
+            print(line)
+    if args.json_path:
+        reporting.write_json(result, args.json_path)
+
+    # Budgets may name any package or module, not only the ones listed
+    failures = check_budgets(summarize(runs, top=totals["modules"]), args.budget, parse_budgets(args.budgets))
+    if failures:
+        print("\nStartup over budget:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    if args.budget or args.budgets:
+        print("\nStartup within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Test script for answer reuse through the local answer index
+
+Indexes a few answered questions and checks which new questions may reuse
+them: paraphrases of the same question do, while questions about the same
+subject that ask something else (who vs when, why vs how, is vs was, or the
+same words in another order) do not. Also checks which prior answers may
+stand in for a web search: not one that leaves most of the new question out.
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.answer_index import AnswerIndex
+
+ANSWERED = [
+    "Who invented the telephone?",
+    "Why is the sky blue?",
+    "What is the capital of Australia?",
+    "How do vaccines train the immune system?",
+    "Convert 100 USD to EUR",
+    "How to convert Celsius to Fahrenheit",
+    "Is Python faster than Java",
+    "Who is the CEO of Apple",
+    "latest news about Tesla",
+]
+
+CASES = [
+    ("Who invented the telephone", True),
+    ("who invented the telephone?", True),
+    ("Why is the sky blue", True),
+    ("When was the telephone invented?", False),
+    ("how is the sky blue", False),
+    ("Where is the capital of Australia?", False),
+    ("Why do vaccines train the immune system?", False),
+    ("convert 100 usd to eur", True),
+    ("Convert 100 EUR to USD", False),
+    ("How to convert Fahrenheit to Celsius", False),
+    ("Is Java faster than Python", False),
+    ("Who was the CEO of Apple", False),
+    ("Who will be the CEO of Apple", False),
+]
+
+SEED_CASES = [
+    ("Tesla latest news", True),
+    ("latest news about Tesla layoffs in Berlin", False),
+]
+
+
+def check(passed: bool, message: str) -> bool:
+    print(f"{'✅' if passed else '❌'} {message}")
+    return passed
+
+
+def main() -> None:
+    print("🔍 Answer Index Reuse Test")
+    print("=" * 50)
+    index = AnswerIndex(max_documents=100)
+    for question in ANSWERED:
+        index.add(question, f"Answer to: {question}")
+
+    results = []
+    for query, expected in CASES:
+        match = index.best_match(query)
+        reused = bool(match and match.reusable())
+        source = f" (from {match.entry.query!r})" if reused else ""
+        results.append(check(reused == expected,
+                             f"{query!r}: {'reused' if reused else 'not reused'}{source}"))
+    for query, expected in SEED_CASES:
+        match = index.best_match(query)
+        seeded = bool(match and not match.reusable() and match.seedable())
+        source = f" by {match.entry.query!r}" if seeded else ""
+        results.append(check(seeded == expected,
+                             f"{query!r}: {'seeded' if seeded else 'not seeded'}{source}"))
+
+    print("\n" + "=" * 50)
+    success = all(results)
+    print("🎉 Answer reuse working correctly." if success else "⚠️  Answer reuse test failed.")
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
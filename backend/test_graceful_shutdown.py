@@ -0,0 +1,136 @@
+"""
+Test script for graceful shutdown under load
+
+Starts the backend with fake providers and a slow fake model
+(python -m benchmarks.fakes --backend), sends it concurrent /api/query
+requests and a /api/query/batch stream, and sends SIGTERM while they are in
+flight. Checks that new connections are refused, every in-flight request and
+the stream complete, the process exits within the grace period, and the
+query history and answer cache were flushed to disk.
+"""
+import asyncio
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+GRACE_PERIOD = 20.0
+MODEL_FIRST_TOKEN = 2.0
+IN_FLIGHT = 6
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_for_ready(client: httpx.AsyncClient, timeout: float = 90.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return True
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.25)
+    return False
+
+
+async def stream_batch(client: httpx.AsyncClient, queries) -> int:
+    """Lines received from a /api/query/batch stream"""
+    lines = 0
+    async with client.stream("POST", "/api/query/batch", json={"queries": queries}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.strip():
+                lines += 1
+    return lines
+
+
+def check(passed: bool, message: str) -> bool:
+    print(f"{'✅' if passed else '❌'} {message}")
+    return passed
+
+
+async def run(workdir: str) -> bool:
+    port = free_port()
+    env = {**os.environ, "SHUTDOWN_GRACE_PERIOD": str(GRACE_PERIOD), "SHUTDOWN_DRAIN_DELAY": "0"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fakes", "--backend", str(port), "--workdir", workdir,
+         "--model-first-token", str(MODEL_FIRST_TOKEN)],
+        cwd=BACKEND_DIR, env=env,
+    )
+    results = []
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60.0) as client:
+            if not check(await wait_for_ready(client), "Backend ready"):
+                return False
+
+            run_id = int(time.time())
+            queries = [client.post("/api/query", json={"query": f"latest research news on topic {run_id}-{i}"})
+                       for i in range(IN_FLIGHT)]
+            batch = [f"recent developments in field {run_id}-{i}" for i in range(3)]
+            in_flight = asyncio.gather(*queries, stream_batch(client, batch), return_exceptions=True)
+            await asyncio.sleep(MODEL_FIRST_TOKEN / 2)
+
+            print(f"Sending SIGTERM with {IN_FLIGHT} queries and one batch stream in flight...")
+            signal_sent = time.monotonic()
+            process.send_signal(signal.SIGTERM)
+            await asyncio.sleep(0.5)
+
+            try:
+                async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=5.0) as fresh:
+                    refused = (await fresh.get("/health")).status_code != 200
+            except httpx.TransportError:
+                refused = True
+            results.append(check(refused, "New connections refused while draining"))
+
+            outcomes = await in_flight
+            responses, streamed = outcomes[:-1], outcomes[-1]
+            completed = [r for r in responses if isinstance(r, httpx.Response) and r.status_code == 200]
+            results.append(check(len(completed) == IN_FLIGHT,
+                                 f"In-flight queries completed: {len(completed)}/{IN_FLIGHT}"
+                                 + "".join(f"\n   {r!r}" for r in responses if r not in completed)))
+            results.append(check(streamed == len(batch), f"Batch stream completed: {streamed!r} lines"))
+
+        try:
+            code = process.wait(timeout=GRACE_PERIOD + 10)
+        except subprocess.TimeoutExpired:
+            code = None
+        elapsed = time.monotonic() - signal_sent
+        results.append(check(code == 0, f"Process exited with {code} {elapsed:.1f}s after SIGTERM"))
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+    # The history queue and memory-only cache entries are written during the lifespan shutdown
+    with sqlite3.connect(os.path.join(workdir, "benchmark.db")) as db:
+        rows = db.execute("SELECT COUNT(*) FROM query_history WHERE query LIKE ?", (f"%{run_id}-%",)).fetchone()[0]
+    results.append(check(rows >= IN_FLIGHT, f"Query history flushed: {rows} rows"))
+    answers = os.path.join(workdir, "cache", "answers.dat")
+    size = os.path.getsize(answers) if os.path.exists(answers) else 0
+    results.append(check(size > 0, f"Answer cache written to disk: {size} bytes"))
+    return all(results)
+
+
+def main() -> None:
+    print("🔍 Graceful Shutdown Test")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory(prefix="shutdown-test-") as workdir:
+        success = asyncio.run(run(workdir))
+    print("\n" + "=" * 50)
+    print("🎉 Graceful shutdown working correctly." if success else "⚠️  Graceful shutdown test failed.")
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Test script for the batch calculator
+
+Generates random expressions over a set of shapes, evaluates them as one
+batch (large groups go through NumPy) and checks every item against the
+scalar evaluator: the same error, or the same result to float64 precision
+(the scalar path keeps decimals exact). A few literals the shape alone
+cannot validate (leading zeros, underscores) are mixed into otherwise
+vectorized groups.
+"""
+import math
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import math_batch
+from app.services.math_batch import VECTORIZE_MIN_GROUP, evaluate_batch
+
+SHAPES = [
+    "{a} + {b} * {c}",
+    "{a} - {b} / {c}",
+    "{a} // {b}",
+    "{a} % {b}",
+    "-{a} // {b}",
+    "-{a} % {b}",
+    "{a} % -{b}",
+    "({a} - {b}) // {c}",
+    "({a} - {b}) % {c}",
+    "{a} ** {b}",
+    "{a} ** -{b}",
+    "sqrt({a}) + {b}",
+    "log({a}, {b})",
+    "min({a}, {b}) - max({b}, {c})",
+    "round({a} / {b})",
+    "abs({a} - {b} * {c})",
+]
+
+ODD_LITERALS = ["01 + 1", "007 * 2", "00 + 1", "1_000 + 1", "2.5e1_0 - 1"]
+
+
+def literal(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.1:
+        return "0"
+    if kind < 0.55:
+        return str(rng.randint(1, 50))
+    if kind < 0.9:
+        return f"{rng.uniform(0, 50):.{rng.randint(1, 3)}f}"
+    return str(rng.randint(10 ** 6, 10 ** 9))
+
+
+def generate(rng: random.Random, count: int):
+    expressions = [rng.choice(SHAPES).format(a=literal(rng), b=literal(rng), c=literal(rng))
+                   for _ in range(count)]
+    for odd in ODD_LITERALS:
+        expressions.insert(rng.randrange(len(expressions)), odd)
+    return expressions
+
+
+def outcome(item):
+    return item["error"] if item["error"] else item["formatted"]
+
+
+def agree(batch, scalar) -> bool:
+    if batch["error"] or scalar["error"]:
+        return batch["error"] == scalar["error"]
+    if isinstance(batch["result"], int) and isinstance(scalar["result"], int):
+        return batch["result"] == scalar["result"]
+    return math.isclose(batch["result"], scalar["result"], rel_tol=1e-12, abs_tol=1e-12)
+
+
+def check(passed: bool, message: str) -> bool:
+    print(f"{'✅' if passed else '❌'} {message}")
+    return passed
+
+
+def main() -> None:
+    print("🔍 Batch Calculator Test")
+    print("=" * 50)
+    rng = random.Random(int(sys.argv[1]) if len(sys.argv) > 1 else 7)
+    expressions = generate(rng, 3000)
+    batch = evaluate_batch(expressions)
+    mismatches = []
+    for expression, item in zip(expressions, batch):
+        scalar = math_batch._scalar_item(expression, math_batch.math_evaluator.normalize_expression(expression))
+        if not agree(item, scalar):
+            mismatches.append(f"{expression}: batch {outcome(item)!r}, scalar {outcome(scalar)!r}")
+    results = [check(not mismatches, f"{len(expressions)} expressions, {len(mismatches)} differ from the scalar path"
+                     + "".join(f"\n   {line}" for line in mismatches[:20]))]
+
+    # The same expression must not change with the number of its neighbours
+    for expression in ["-7.5 % 2", "-7.5 // 2", "7.5 % -2", "2 ** -3", "01 + 1"]:
+        alone = outcome(evaluate_batch([expression])[0])
+        grouped = {outcome(item) for item in evaluate_batch([expression] * VECTORIZE_MIN_GROUP)}
+        results.append(check(grouped == {alone}, f"{expression}: {alone!r} alone and in a group of "
+                                                 f"{VECTORIZE_MIN_GROUP} ({', '.join(map(repr, grouped))})"))
+
+    print("\n" + "=" * 50)
+    success = all(results)
+    print("🎉 Batch calculator working correctly." if success else "⚠️  Batch calculator test failed.")
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Test script for the local arithmetic evaluator
+
+Checks results against Python's own semantics where they are exact, in
+particular floor division and modulo with negative operands and powers with
+negative exponents, and that overflows come back as readable errors.
+"""
+import os
+import sys
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services import math_evaluator
+from app.services.math_evaluator import MathEvaluationError
+
+CASES = [
+    ("-7.5 // 2", -4),
+    ("-7.5 % 2", Decimal("0.5")),
+    ("7.5 // -2", -4),
+    ("7.5 % -2", Decimal("-0.5")),
+    ("-7.5 // -2", 3),
+    ("-7.5 % -2", Decimal("-1.5")),
+    ("7.5 % 2", Decimal("1.5")),
+    ("-6.0 % 2", 0),
+    ("-7 // 2", -4),
+    ("-7 % 2", 1),
+    ("0.3 % 0.1", 0),
+    ("2**-3", Decimal("0.125")),
+    ("(-2)**-3", Decimal("-0.125")),
+    ("10**-5", Decimal("0.00001")),
+    ("2.5**-3", Decimal("0.064")),
+]
+
+FORMATTED = [
+    ("2**-10000", "5.012372749206452009297555933742978E-3011"),
+    ("2**13000 // 2**12999", "2"),
+]
+
+ERRORS = [
+    ("e**1000", MathEvaluationError, "Result is too large"),
+    ("exp(1000)", MathEvaluationError, "Result is too large"),
+    ("2**100000", MathEvaluationError, "Result is too large"),
+    ("9**4000 * 9**4000", MathEvaluationError, "Result is too large"),
+    ("-7.5 // 0", ZeroDivisionError, "division by zero"),
+    ("-7.5 % 0", ZeroDivisionError, "division by zero"),
+    ("0**-1", ZeroDivisionError, "division by zero"),
+]
+
+
+def check(passed: bool, message: str) -> bool:
+    print(f"{'✅' if passed else '❌'} {message}")
+    return passed
+
+
+def evaluate(expression: str):
+    try:
+        return math_evaluator.evaluate(expression), None
+    except Exception as e:
+        return None, e
+
+
+def main() -> None:
+    print("🔍 Math Evaluator Test")
+    print("=" * 50)
+    results = []
+    for expression, expected in CASES:
+        value, error = evaluate(expression)
+        passed = error is None and value == expected and type(value) is type(expected)
+        results.append(check(passed, f"{expression} = {error or repr(value)} (expected {expected!r})"))
+    for expression, expected in FORMATTED:
+        value, error = evaluate(expression)
+        formatted = None if error else math_evaluator.format_number(value)
+        results.append(check(formatted == expected, f"{expression} formats as {error or formatted}"))
+    for expression, error_type, message in ERRORS:
+        _, error = evaluate(expression)
+        passed = isinstance(error, error_type) and str(error) == message
+        results.append(check(passed, f"{expression} fails with {type(error).__name__}: {error}"))
+
+    print("\n" + "=" * 50)
+    success = all(results)
+    print("🎉 Math evaluator working correctly." if success else "⚠️  Math evaluator test failed.")
+    sys.exit(0 if success else 1)
+
+
+if __name__ == "__main__":
+    main()